@@ -14,6 +14,104 @@ class Settings(BaseSettings):
     token_url: str = "https://accounts.spotify.com/api/token"
     api_base_url: str = "https://api.spotify.com/v1/"
 
+    # Client HTTP partagé vers Spotify (pool de connexions keep-alive)
+    SPOTIFY_HTTP_MAX_CONNECTIONS: int = 100
+    SPOTIFY_HTTP_MAX_KEEPALIVE: int = 20
+    SPOTIFY_HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    SPOTIFY_HTTP_TIMEOUT: float = 10.0
+    SPOTIFY_HTTP_CONNECT_TIMEOUT: float = 5.0
+    # Nécessite le paquet h2 (pip install httpx[http2])
+    SPOTIFY_HTTP2: bool = False
+
+    # Cache des réponses GET de Spotify (par token et URL)
+    SPOTIFY_CACHE_MAX_ENTRIES: int = 1024
+    SPOTIFY_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    # Durée de vie si Spotify n'envoie pas de Cache-Control
+    SPOTIFY_CACHE_TTL: float = 60.0
+
+    # Access tokens rafraîchis: resservis jusqu'à cette marge (secondes) avant
+    # expiration. Doit dépasser l'avance du frontend (il rafraîchit 7 min avant)
+    SPOTIFY_TOKEN_REFRESH_MARGIN: float = 600.0
+    SPOTIFY_TOKEN_CACHE_MAX_ENTRIES: int = 1024
+
+    # Nombre max de pages de tracks téléchargées en parallèle
+    SPOTIFY_PAGE_CONCURRENCY: int = 4
+
+    # Cache disque des repères de refrain par morceau (analyse audio faite une fois)
+    CLIP_CACHE_PATH: str = "clip_points.db"
+    # Nombre max d'analyses audio téléchargées en parallèle
+    CLIP_ANALYSIS_CONCURRENCY: int = 4
+
+    # Backplane entre workers: "none", "memory" ou "unix" (plusieurs workers sur
+    # une machine). Chaque room appartient au worker qui l'a créée (voir
+    # room_directory): les clients tombés sur un autre worker y restent connectés,
+    # leurs actions sont transmises au propriétaire et ses diffusions leur reviennent
+    WS_BACKPLANE: str = "none"
+    # Dossier des sockets Unix du backplane (partagé par les workers d'une machine)
+    WS_BACKPLANE_PATH: str = "/tmp/blindotesto-backplane"
+
+    # Regroupement des événements non urgents (chat, arrivées, listes de joueurs...):
+    # une trame par client toutes les WS_FLUSH_INTERVAL secondes au plus (10 à 20 ms
+    # conseillés). 0 = chaque événement part seul. Buzz et réponses ne sont jamais retardés
+    WS_FLUSH_INTERVAL: float = 0.0
+
+    # Intervalle (secondes) entre deux pings applicatifs (mesure du RTT des clients)
+    WS_PING_INTERVAL: float = 5.0
+
+    # Délai (secondes) sans aucun message (ni pong) avant de couper un client, 0 = jamais
+    WS_HEARTBEAT_TIMEOUT: float = 30.0
+
+    # Spectateurs (?role=spectator): servis après les joueurs, une trame par room
+    # toutes les SPECTATOR_INTERVAL secondes au plus; au-delà de SPECTATOR_MAX_BATCH
+    # événements en attente, l'état complet les remplace. Spectateurs servis entre
+    # deux passages de la boucle d'événements pendant un envoi
+    SPECTATOR_INTERVAL: float = 0.25
+    SPECTATOR_MAX_BATCH: int = 64
+    SPECTATOR_FAN_OUT_CHUNK: int = 64
+
+    # Reprise de session: délai (secondes) pendant lequel la place et le score d'un
+    # joueur déconnecté sont gardés (0 = départ immédiat), et nombre d'événements
+    # gardés par room pour renvoyer ceux manqués pendant la coupure
+    SESSION_GRACE_PERIOD: float = 30.0
+    ROOM_EVENT_LOG_SIZE: int = 256
+
+    # Lobby (GET /ws/rooms): taille par défaut et max d'une page, et intervalle
+    # (secondes) entre deux mises à jour de la liste, poussées aux abonnés du flux
+    LOBBY_PAGE_SIZE: int = 50
+    LOBBY_MAX_PAGE_SIZE: int = 200
+    LOBBY_PUSH_INTERVAL: float = 0.5
+
+    # Nettoyage en tâche de fond: intervalle (secondes) et éléments examinés par passage
+    REAPER_INTERVAL: float = 1.0
+    REAPER_BATCH_SIZE: int = 1000
+    # Une room sans activité depuis ROOM_IDLE_TTL secondes est fermée, ou depuis
+    # ROOM_EMPTY_TTL si plus aucun client n'y est connecté
+    ROOM_IDLE_TTL: float = 3600.0
+    ROOM_EMPTY_TTL: float = 300.0
+    # Mémoire estimée max de l'ensemble des rooms (octets): au-delà, les rooms
+    # sans client connecté les moins récemment actives sont fermées
+    ROOMS_MEMORY_BUDGET: int = 512 * 1024 * 1024
+
+    # Fenêtre d'arbitrage des buzz (secondes), 0 = le premier buzz reçu gagne
+    BUZZER_ARBITRATION_WINDOW: float = 0.05
+    # Avance max accordée à un client lent (moitié de son RTT, plafonnée)
+    BUZZER_MAX_COMPENSATION: float = 0.25
+
+    # Déroulement des parties: nombre de manches si la config de la room ne le
+    # précise pas ("rounds"), pause (secondes) entre deux manches
+    GAME_ROUNDS: int = 10
+    ROUND_INTERMISSION: float = 5.0
+    # Joueurs du classement final envoyé avec game_ended (les autres connaissent
+    # leur rang par la table des rangs de l'état de la room)
+    LEADERBOARD_TOP: int = 10
+
+    # Persistance des rooms et du chat: "none" (mémoire du processus uniquement),
+    # "memory" ou "sqlite" (survit aux redémarrages)
+    STATE_STORE: str = "none"
+    STATE_STORE_PATH: str = "blindotesto.db"
+    # Intervalle (secondes) entre deux écritures des modifications
+    STATE_FLUSH_INTERVAL: float = 1.0
+
 
 # init des settings pour etre accessible partout
 settings = Settings()
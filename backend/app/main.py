@@ -1,9 +1,81 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routers import spotify, oauth, websockets
+from app.config import settings
+from app.managers.backplane import create_backplane
+from app.managers.buzzer_manager import buzzer_manager
+from app.managers.chat_manager import chat_manager
+from app.managers.clip_selector import clip_selector
+from app.managers.game_loop import game_loop
+from app.managers.lobby import lobby
+from app.managers.playlist_prefetch import prefetcher
+from app.managers.reaper import Reaper
+from app.managers.room_manager import room_manager
+from app.managers.scheduler import scheduler
+from app.managers.state_store import StatePersistence, create_state_store
+from app.managers.ws_manager import connection_manager
+from app.routers import metrics, spotify, oauth, websockets
+from app.utils.spotify_requests import close_http_client, start_http_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Client HTTP partagé vers Spotify, réutilise les connexions entre les requêtes
+    start_http_client()
+    # Rooms et chat sauvegardés: rechargés avant d'accepter des connexions
+    persistence = None
+    store = create_state_store(settings.STATE_STORE, settings.STATE_STORE_PATH)
+    if store is not None:
+        persistence = StatePersistence(
+            store, room_manager, chat_manager, settings.STATE_FLUSH_INTERVAL
+        )
+        rooms, messages = await persistence.restore()
+        print(f"Persistance: {rooms} rooms et {messages} messages restaurés")
+        persistence.start()
+    # Backplane pour diffuser les messages des rooms entre workers et
+    # transmettre les actions des clients au worker de leur room
+    backplane = create_backplane(settings.WS_BACKPLANE, settings.WS_BACKPLANE_PATH)
+    if backplane is not None:
+        websockets.attach_backplane(backplane)
+        await connection_manager.start_backplane(backplane)
+    # Pings périodiques pour mesurer le RTT des clients (compensation des buzz)
+    connection_manager.start_pings(settings.WS_PING_INTERVAL)
+    # Nettoyage en tâche de fond: clients muets, rooms inactives, chats orphelins
+    reaper = Reaper(
+        room_manager,
+        chat_manager,
+        connection_manager,
+        buzzer_manager,
+        interval=settings.REAPER_INTERVAL,
+        batch_size=settings.REAPER_BATCH_SIZE,
+        heartbeat_timeout=settings.WS_HEARTBEAT_TIMEOUT,
+        room_idle_ttl=settings.ROOM_IDLE_TTL,
+        room_empty_ttl=settings.ROOM_EMPTY_TTL,
+        memory_budget=settings.ROOMS_MEMORY_BUDGET,
+        game_loop=game_loop,
+        prefetcher=prefetcher,
+    )
+    reaper.start()
+    # Changements de la liste des rooms poussés aux abonnés du lobby
+    lobby.start(settings.LOBBY_PUSH_INTERVAL)
+    yield
+    await lobby.close()
+    await reaper.close()
+    # Minuteries des parties en cours (manches, buzzer, extraits)
+    scheduler.close()
+    # Préparations des playlists en cours (avant la fermeture du client HTTP)
+    await prefetcher.close()
+    await connection_manager.stop_pings()
+    await connection_manager.stop_backplane()
+    if persistence is not None:
+        await persistence.close()
+    clip_selector.close()
+    await close_http_client()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:3000",  # Frontend Next.js
@@ -22,6 +94,7 @@ app.add_middleware(
 app.include_router(spotify.router, prefix="/spotify", tags=["spotify"])
 app.include_router(oauth.router, prefix="/auth", tags=["authentication"])
 app.include_router(websockets.router, prefix="/ws", tags=["websockets"])
+app.include_router(metrics.router, tags=["metrics"])
 
 
 @app.get("/hello")
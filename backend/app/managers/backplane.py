@@ -0,0 +1,342 @@
+"""
+Backplane entre workers.
+
+Chaque worker (processus uvicorn) ne connaît que ses propres sockets. Quand il
+diffuse un message dans une room, il le livre à ses clients locaux puis le publie
+sur le backplane; les autres workers le livrent à leurs propres clients de la room.
+
+Le backplane transporte aussi des messages adressés à un worker (send): c'est
+par eux qu'une room n'existe que sur un seul worker, son propriétaire (voir
+room_directory). Les autres workers lui transmettent les actions de leurs
+clients de la room; il leur renvoie les messages personnels, et ses
+diffusions leur parviennent par la publication ci-dessus.
+"""
+
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+import asyncio
+import os
+import uuid
+
+from app.utils.events import dumps, loads
+
+# (room_id, role ou None, exclude_client ou None, message, urgent) -> nombre de clients locaux
+DeliverCallback = Callable[[str, Optional[str], Optional[str], str, bool], int]
+# Message adressé à ce worker: {"type": ..., "worker": adresse de l'expéditeur, ...}
+MessageCallback = Callable[[dict], Awaitable[None]]
+# Adresse d'un pair qui rejoint le maillage
+PeerCallback = Callable[[str], Awaitable[None]]
+
+# Taille max d'une ligne lue sur une socket du backplane
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+# Trames en attente d'envoi vers un pair avant qu'il soit considéré comme bloqué
+PEER_QUEUE_SIZE = 1024
+# Délai (secondes) avant de se reconnecter à un pair perdu qui est peut-être encore là
+RECONNECT_DELAY = 1.0
+
+
+class Backplane:
+    """
+    Interface d'un backplane. deliver est appelé pour chaque message publié
+    par un autre worker, on_message pour chaque message adressé à ce worker.
+    """
+
+    def __init__(self, address: str):
+        # Adresse de ce worker, à donner à send pour lui écrire
+        self.address = address
+        self.on_message: Optional[MessageCallback] = None
+        # Pair arrivé (connexion établie) ou perdu (arrêté, injoignable, trop lent)
+        self.on_peer: Optional[PeerCallback] = None
+        self.on_peer_lost: Optional[Callable[[str], None]] = None
+
+    async def start(self, deliver: DeliverCallback):
+        raise NotImplementedError
+
+    async def publish(
+        self,
+        room_id: str,
+        role: Optional[str],
+        exclude_client: Optional[str],
+        message: str,
+        urgent: bool = False,
+    ):
+        """
+        Transmet un message aux autres workers (pas au worker local). urgent:
+        le message ne doit pas attendre l'envoi groupé des autres workers.
+        """
+        raise NotImplementedError
+
+    async def send(self, address: Optional[str], message: dict):
+        """
+        Envoie un message au worker d'adresse address (à tous les autres si
+        None), dans l'ordre des publications: un message personnel envoyé
+        avant une diffusion arrive avant elle.
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class InMemoryBus:
+    """Bus partagé par des backplanes en mémoire (un par worker simulé)."""
+
+    def __init__(self):
+        self.backplanes: List["InMemoryBackplane"] = []
+
+
+class InMemoryBackplane(Backplane):
+    """
+    Backplane dans le même processus. Avec un seul worker il ne transmet rien;
+    plusieurs ConnectionManager partageant un InMemoryBus simulent plusieurs workers.
+    """
+
+    def __init__(self, bus: InMemoryBus = None):
+        super().__init__(uuid.uuid4().hex[:8])
+        self.bus = bus or InMemoryBus()
+        self.deliver: Optional[DeliverCallback] = None
+
+    async def start(self, deliver: DeliverCallback):
+        self.deliver = deliver
+        peers = list(self.bus.backplanes)
+        self.bus.backplanes.append(self)
+        for peer in peers:
+            if self.on_peer is not None:
+                await self.on_peer(peer.address)
+            if peer.on_peer is not None:
+                await peer.on_peer(self.address)
+
+    async def publish(self, room_id, role, exclude_client, message, urgent=False):
+        for backplane in self.bus.backplanes:
+            if backplane is not self:
+                backplane.deliver(room_id, role, exclude_client, message, urgent)
+
+    async def send(self, address, message):
+        for backplane in list(self.bus.backplanes):
+            if backplane is self or (address is not None and backplane.address != address):
+                continue
+            if backplane.on_message is not None:
+                await backplane.on_message(message)
+
+    async def close(self):
+        if self in self.bus.backplanes:
+            self.bus.backplanes.remove(self)
+            for peer in self.bus.backplanes:
+                if peer.on_peer_lost is not None:
+                    peer.on_peer_lost(self.address)
+
+
+class PeerLink:
+    """Connexion sortante vers un pair: file d'envoi bornée vidée par sa tâche."""
+
+    __slots__ = ("writer", "queue", "task")
+
+    def __init__(self, writer: asyncio.StreamWriter, queue_size: int):
+        self.writer = writer
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task: Optional[asyncio.Task] = None
+
+    def put(self, frame: bytes) -> bool:
+        """Met une trame en file; False si la file du pair déborde."""
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+
+class UnixSocketBackplane(Backplane):
+    """
+    Backplane entre processus d'une même machine via des sockets Unix.
+
+    Chaque worker écoute sur {directory}/{worker_id}.sock, qui est aussi son
+    adresse. Au démarrage il se connecte aux sockets déjà présentes et
+    s'annonce; les pairs qui reçoivent l'annonce se connectent en retour, ce
+    qui forme un maillage complet. Un pair perdu est retenté après
+    RECONNECT_DELAY: s'il est encore là, le maillage se reforme.
+    Les trames sont des lignes JSON: diffusions [room_id, role, exclude_client,
+    message, urgent] (urgent absent des messages des workers d'une version
+    précédente), annonces ["hello", adresse] et messages adressés {"type": ...}.
+    """
+
+    def __init__(
+        self, directory: str, worker_id: str = None, queue_size: int = PEER_QUEUE_SIZE
+    ):
+        self.directory = directory
+        self.worker_id = worker_id or f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.path = os.path.join(directory, f"{self.worker_id}.sock")
+        super().__init__(self.path)
+        self.deliver: Optional[DeliverCallback] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        # {chemin de socket du pair: PeerLink}. Comme les clients WebSocket,
+        # chaque pair a sa file d'envoi bornée et sa tâche d'écriture: un pair
+        # lent ou bloqué ne retarde pas les diffusions
+        self.peers: Dict[str, "PeerLink"] = {}
+        self.queue_size = queue_size
+        self._reader_tasks: Set[asyncio.Task] = set()
+        # Reconnexions programmées: {chemin du pair: minuterie}
+        self._reconnects: Dict[str, asyncio.TimerHandle] = {}
+        self._closing = False
+
+    async def start(self, deliver: DeliverCallback):
+        self.deliver = deliver
+        os.makedirs(self.directory, exist_ok=True)
+        self.server = await asyncio.start_unix_server(
+            self._handle_peer, path=self.path, limit=MAX_FRAME_SIZE
+        )
+
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".sock") and path != self.path:
+                await self._connect(path)
+
+    async def _connect(self, path: str):
+        """Ouvre une connexion sortante vers un pair et s'annonce."""
+        if path in self.peers:
+            return
+        try:
+            _, writer = await asyncio.open_unix_connection(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            # Socket d'un worker arrêté sans nettoyage
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return
+        link = self.peers[path] = PeerLink(writer, self.queue_size)
+        link.put((dumps(["hello", self.path]) + "\n").encode())
+        link.task = asyncio.create_task(self._write_peer(path, link))
+        if self.on_peer is not None:
+            await self.on_peer(path)
+
+    def _lose_peer(self, path: str, link: Optional["PeerLink"] = None):
+        """
+        Retire un pair (le lien donné, ou le lien courant) et prévient on_peer_lost.
+        Une reconnexion est tentée plus tard: un pair seulement lent se réannonce.
+        """
+        current = self.peers.get(path)
+        if current is None or (link is not None and current is not link):
+            return
+        del self.peers[path]
+        if current.task is not asyncio.current_task():
+            current.task.cancel()
+        if self._closing:
+            return
+        if self.on_peer_lost is not None:
+            self.on_peer_lost(path)
+        if path not in self._reconnects:
+            self._reconnects[path] = asyncio.get_running_loop().call_later(
+                RECONNECT_DELAY, self._reconnect, path
+            )
+
+    def _reconnect(self, path: str):
+        del self._reconnects[path]
+        if self._closing or path in self.peers:
+            return
+        task = asyncio.create_task(self._connect(path))
+        self._reader_tasks.add(task)
+        task.add_done_callback(self._reader_tasks.discard)
+
+    async def _write_peer(self, path: str, link: "PeerLink"):
+        """Vide la file d'envoi d'un pair; le retire si la connexion tombe."""
+        writer = link.writer
+        try:
+            while True:
+                writer.write(await link.queue.get())
+                await writer.drain()
+        except ConnectionError:
+            print(f"Backplane: pair {path} injoignable, retiré")
+        finally:
+            self._lose_peer(path, link)
+            writer.close()
+
+    async def _handle_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Lit les messages envoyés par un pair (sa première trame l'annonce)."""
+        task = asyncio.current_task()
+        self._reader_tasks.add(task)
+        peer = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    frame = loads(line)
+                except ValueError:
+                    print("Backplane: trame illisible ignorée")
+                    continue
+                if isinstance(frame, dict):
+                    await self._receive(frame)
+                elif len(frame) == 2:  # ["hello", chemin de la socket du pair]
+                    peer = frame[1]
+                    await self._connect(peer)
+                else:
+                    self.deliver(*frame)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._reader_tasks.discard(task)
+            writer.close()
+            if peer is not None:
+                # Pair arrêté (ou qui nous a coupés): ses rooms et ses clients sont perdus
+                self._lose_peer(peer)
+
+    async def _receive(self, message: dict):
+        if self.on_message is None:
+            return
+        try:
+            await self.on_message(message)
+        except Exception as e:
+            print(f"Backplane: erreur dans le traitement d'un message {message.get('type')}: {e!r}")
+
+    async def publish(self, room_id, role, exclude_client, message, urgent=False):
+        if not self.peers:
+            return
+        self._put((dumps([room_id, role, exclude_client, message, urgent]) + "\n").encode())
+
+    async def send(self, address, message):
+        frame = (dumps(message) + "\n").encode()
+        if address is None:
+            self._put(frame)
+            return
+        link = self.peers.get(address)
+        if link is not None and not link.put(frame):
+            self._overflow(address, link)
+
+    def _put(self, frame: bytes):
+        """Met une trame en file pour tous les pairs."""
+        for path, link in list(self.peers.items()):
+            if not link.put(frame):
+                self._overflow(path, link)
+
+    def _overflow(self, path: str, link: "PeerLink"):
+        # Pair bloqué: coupé sans attendre, la reconnexion dira s'il est encore là
+        print(f"Backplane: pair {path} trop lent, retiré")
+        self._lose_peer(path, link)
+
+    async def close(self):
+        self._closing = True
+        for handle in self._reconnects.values():
+            handle.cancel()
+        self._reconnects.clear()
+        if self.server is not None:
+            self.server.close()
+        tasks = [link.task for link in self.peers.values()] + list(self._reader_tasks)
+        self.peers.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.server is not None:
+            await self.server.wait_closed()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def create_backplane(kind: str, directory: str = None) -> Optional[Backplane]:
+    """Crée le backplane configuré ("none", "memory" ou "unix")."""
+    if kind == "memory":
+        return InMemoryBackplane()
+    if kind == "unix":
+        return UnixSocketBackplane(directory)
+    return None
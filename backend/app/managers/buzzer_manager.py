@@ -0,0 +1,121 @@
+"""
+Arbitrage des buzz.
+
+Le premier buzz reçu pendant que le buzzer est actif ouvre une fenêtre
+d'arbitrage de quelques dizaines de millisecondes. Les buzz reçus pendant la
+fenêtre sont classés par heure d'appui estimée: heure de réception (horloge
+monotone) moins la moitié du RTT du client, plafonnée. Un joueur sur une
+connexion lente n'est donc pas battu par un joueur proche du serveur qui a
+appuyé après lui.
+"""
+
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.managers.room_manager import Room
+from app.managers.scheduler import Timer, TimerScheduler, scheduler as shared_scheduler
+
+# (room, gagnant, {joueur: heure d'appui estimée}) -> diffusion de la décision
+DecisionCallback = Callable[[Room, str, Dict[str, float]], Awaitable[None]]
+# (room, joueurs) -> refus des buzz d'une fenêtre close sans gagnant
+RejectionCallback = Callable[[Room, List[str]], Awaitable[None]]
+
+
+class BuzzWindow:
+    """Buzz en attente de décision dans une room."""
+
+    __slots__ = ("candidates", "timer")
+
+    def __init__(self):
+        self.candidates: Dict[str, float] = {}  # {player_id: heure d'appui estimée}
+        self.timer: Optional[Timer] = None  # Fin de la fenêtre
+
+
+class BuzzerManager:
+    def __init__(
+        self,
+        window: float = 0.05,
+        max_compensation: float = 0.25,
+        scheduler: Optional[TimerScheduler] = None,
+    ):
+        # Durée (secondes) de la fenêtre d'arbitrage, 0 = premier reçu gagne
+        self.window = window
+        # Compensation max (secondes): un client ne peut pas gonfler son RTT à l'infini
+        self.max_compensation = max_compensation
+        # Fenêtres ouvertes: {room_id: BuzzWindow}
+        self.pending: Dict[str, BuzzWindow] = {}
+        # Callback appelé avec la décision, avant tout message de chat
+        self.on_decision: Optional[DecisionCallback] = None
+        # Callback appelé si le buzzer n'est plus attribuable à la fin de la fenêtre
+        self.on_rejected: Optional[RejectionCallback] = None
+        # Fins de fenêtre sur les minuteries partagées (erreurs de on_decision journalisées)
+        self.scheduler = scheduler or shared_scheduler
+
+    def press_time(self, received_at: float, rtt: Optional[float]) -> float:
+        """Estime l'heure d'appui (horloge monotone) à partir de la réception et du RTT."""
+        if not rtt:
+            return received_at
+        return received_at - min(rtt / 2, self.max_compensation)
+
+    async def submit(
+        self, room: Room, player_id: str, received_at: float, rtt: Optional[float] = None
+    ) -> bool:
+        """
+        Propose un buzz. Retourne False si le buzz est refusé d'emblée
+        (partie non démarrée, buzzer déjà attribué, joueur inconnu).
+        La décision est annoncée par on_decision à la fin de la fenêtre, ou
+        le refus par on_rejected si la manche a changé entre-temps.
+        """
+        if (
+            room.game_state != "playing"
+            or room.buzzer_state != "active"
+            or player_id not in room.players
+        ):
+            return False
+
+        window = self.pending.get(room.room_id)
+        if window is None:
+            window = self.pending[room.room_id] = BuzzWindow()
+            window.candidates[player_id] = self.press_time(received_at, rtt)
+            if self.window <= 0:
+                await self._decide(room)
+            else:
+                window.timer = self.scheduler.schedule(self.window, self._decide, room)
+            return True
+
+        # Un second buzz du même joueur ne change pas son heure d'appui
+        window.candidates.setdefault(player_id, self.press_time(received_at, rtt))
+        return True
+
+    async def _decide(self, room: Room):
+        """Ferme la fenêtre et attribue le buzzer à l'appui le plus ancien."""
+        window = self.pending.pop(room.room_id, None)
+        if window is None:
+            return
+        # Les joueurs partis pendant la fenêtre ne peuvent pas gagner
+        candidates = {
+            player_id: pressed
+            for player_id, pressed in window.candidates.items()
+            if player_id in room.players
+        }
+        if not candidates:
+            return
+        winner = min(candidates, key=candidates.__getitem__)
+        if room.register_buzz(winner):
+            if self.on_decision is not None:
+                await self.on_decision(room, winner, candidates)
+        elif self.on_rejected is not None:
+            # Manche terminée ou buzzer désactivé pendant la fenêtre: personne ne gagne
+            await self.on_rejected(room, list(candidates))
+
+    def cancel(self, room_id: str):
+        """Abandonne la fenêtre d'une room (room supprimée)."""
+        window = self.pending.pop(room_id, None)
+        if window is not None and window.timer is not None:
+            window.timer.cancel()
+
+
+# Instance globale du gestionnaire de buzzer
+buzzer_manager = BuzzerManager(
+    settings.BUZZER_ARBITRATION_WINDOW, settings.BUZZER_MAX_COMPENSATION
+)
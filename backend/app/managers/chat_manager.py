@@ -1,9 +1,26 @@
-from typing import Dict, List
+from bisect import bisect_right
+from typing import Dict, Iterator, List, Optional, Set
 from datetime import datetime
+import time
 import uuid
 
+from app.utils.events import RawJSON, encode
+
 
 class ChatMessage:
+    __slots__ = (
+        "id",
+        "seq",
+        "sender_id",
+        "sender_name",
+        "content",
+        "room_id",
+        "sender_role",
+        "is_system",
+        "created_at",
+        "_json",
+    )
+
     def __init__(
         self,
         sender_id: str,
@@ -12,20 +29,33 @@ class ChatMessage:
         room_id: str,
         sender_role: str = "player",
         is_system: bool = False,
+        seq: int = 0,
+        created_at: Optional[int] = None,
+        message_id: Optional[str] = None,
     ):
-        self.id = str(uuid.uuid4())
+        self.id = message_id or str(uuid.uuid4())
+        self.seq = seq  # Numéro de séquence dans la room (croissant)
         self.sender_id = sender_id
         self.sender_name = sender_name
         self.content = content
         self.room_id = room_id
         self.sender_role = sender_role  # "host", "player", "spectator", "system"
         self.is_system = is_system
-        self.timestamp = datetime.now().isoformat()
+        # Horodatage en microsecondes depuis l'epoch (entier: comparaisons exactes)
+        self.created_at = time.time_ns() // 1000 if created_at is None else created_at
+        self._json = None  # Cache de l'encodage JSON (le message est immuable)
+
+    @property
+    def timestamp(self) -> str:
+        """Horodatage ISO du message (format historique de l'API)."""
+        seconds, micros = divmod(self.created_at, 1_000_000)
+        return datetime.fromtimestamp(seconds).replace(microsecond=micros).isoformat()
 
     def to_dict(self) -> dict:
         """Convertit le message en dictionnaire pour sérialisation JSON."""
         return {
             "id": self.id,
+            "seq": self.seq,
             "sender_id": self.sender_id,
             "sender_name": self.sender_name,
             "content": self.content,
@@ -35,12 +65,175 @@ class ChatMessage:
             "timestamp": self.timestamp,
         }
 
+    def to_json(self) -> RawJSON:
+        """Retourne le message encodé en JSON, encodé une seule fois."""
+        if self._json is None:
+            self._json = encode(self.to_dict())
+        return self._json
+
+    def to_record(self) -> dict:
+        """Retourne le message pour la persistance (horodatage entier exact)."""
+        return {
+            "id": self.id,
+            "seq": self.seq,
+            "sender_id": self.sender_id,
+            "sender_name": self.sender_name,
+            "content": self.content,
+            "room_id": self.room_id,
+            "sender_role": self.sender_role,
+            "is_system": self.is_system,
+            "created_at": self.created_at,
+        }
+
+    @classmethod
+    def from_record(cls, record: dict) -> "ChatMessage":
+        return cls(
+            record["sender_id"],
+            record["sender_name"],
+            record["content"],
+            record["room_id"],
+            sender_role=record["sender_role"],
+            is_system=record["is_system"],
+            seq=record["seq"],
+            created_at=record["created_at"],
+            message_id=record["id"],
+        )
+
+
+# Estimation de la mémoire d'un message hors texte (objet, id, JSON en cache...)
+MESSAGE_OVERHEAD_BYTES = 600
+
+
+def _estimated_size(message: ChatMessage) -> int:
+    # Le texte est compté deux fois: dans le message et dans son JSON en cache
+    return MESSAGE_OVERHEAD_BYTES + 2 * (len(message.content) + len(message.sender_name))
+
+
+class ChatHistory:
+    """
+    Historique d'une room dans un buffer circulaire de taille fixe.
+
+    Les messages gardent leur ordre d'arrivée: les numéros de séquence sont
+    contigus et les horodatages croissants, ce qui permet de retrouver les
+    messages "depuis" un seq en O(1) et "depuis" une date par bisection.
+    """
+
+    __slots__ = ("capacity", "buffer", "start", "next_seq", "last_time", "size")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.buffer: List[ChatMessage] = []
+        self.start = 0  # Index du plus ancien message une fois le buffer plein
+        self.next_seq = 1
+        self.last_time = 0
+        self.size = 0  # Mémoire estimée des messages (octets), tenue à jour à l'ajout
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def __getitem__(self, index: int) -> ChatMessage:
+        """Accès au index-ième message, du plus ancien au plus récent."""
+        return self.buffer[(self.start + index) % len(self.buffer)]
+
+    def __iter__(self) -> Iterator[ChatMessage]:
+        return iter(self.slice(0))
+
+    def append(self, message: ChatMessage):
+        """Ajoute un message en O(1), en écrasant le plus ancien si le buffer est plein."""
+        self.size += _estimated_size(message)
+        if len(self.buffer) < self.capacity:
+            self.buffer.append(message)
+        else:
+            self.size -= _estimated_size(self.buffer[self.start])
+            self.buffer[self.start] = message
+            self.start = (self.start + 1) % self.capacity
+
+    def new_message(self, **fields) -> ChatMessage:
+        """Crée un message avec le prochain seq et un horodatage croissant, et l'ajoute."""
+        # Horodatage jamais décroissant, même si l'horloge système recule
+        now = max(time.time_ns() // 1000, self.last_time)
+        message = ChatMessage(**fields, seq=self.next_seq, created_at=now)
+        self.next_seq += 1
+        self.last_time = now
+        self.append(message)
+        return message
+
+    def restore(self, message: ChatMessage):
+        """Ajoute un message sauvegardé (dans l'ordre des seq) en conservant son seq."""
+        self.append(message)
+        self.next_seq = message.seq + 1
+        self.last_time = max(self.last_time, message.created_at)
+
+    def slice(self, index: int) -> List[ChatMessage]:
+        """Retourne les messages à partir de la position logique index."""
+        size = len(self.buffer)
+        if index >= size:
+            return []
+        first = (self.start + max(index, 0)) % size
+        if first < self.start or self.start == 0:
+            end = self.start if self.start else size
+            return self.buffer[first:end]
+        return self.buffer[first:] + self.buffer[: self.start]
+
+    def last(self, count: int) -> List[ChatMessage]:
+        """Retourne les count derniers messages."""
+        return self.slice(len(self.buffer) - count)
+
+    def since_seq(self, seq: int) -> List[ChatMessage]:
+        """Retourne les messages de seq strictement supérieur (calcul direct)."""
+        first_seq = self.next_seq - len(self.buffer)
+        return self.slice(seq + 1 - first_seq)
+
+    def since_time(self, created_at: int) -> List[ChatMessage]:
+        """Retourne les messages postérieurs à created_at (bisection)."""
+        return self.slice(bisect_right(self, created_at, key=_created_at))
+
+
+def _created_at(message: ChatMessage) -> int:
+    return message.created_at
+
 
 class ChatManager:
     def __init__(self):
-        # Structure: {room_id: [messages]}
-        self.messages: Dict[str, List[ChatMessage]] = {}
+        # Structure: {room_id: ChatHistory}
+        self.messages: Dict[str, ChatHistory] = {}
         self.max_history = 100
+        # Suivi pour la persistance (None tant qu'elle est désactivée):
+        # messages pas encore sauvegardés par room, et chats supprimés
+        self.unsaved: Optional[Dict[str, List[ChatMessage]]] = None
+        self.deleted_chats: Optional[Set[str]] = None
+
+    def track_changes(self):
+        """Active le suivi des nouveaux messages et des chats supprimés (voir state_store)."""
+        if self.unsaved is None:
+            self.unsaved = {}
+            self.deleted_chats = set()
+
+    def restore_messages(self, records: List[dict]) -> int:
+        """Recharge les messages sauvegardés, triés par room puis par seq."""
+        room_id, history = None, None
+        for record in records:
+            if record["room_id"] != room_id:
+                room_id = record["room_id"]
+                history = self._history(room_id)
+            history.restore(ChatMessage.from_record(record))
+        return len(records)
+
+    def _saved(self, message: ChatMessage) -> ChatMessage:
+        """Note un nouveau message pour la persistance."""
+        if self.unsaved is not None:
+            pending = self.unsaved.get(message.room_id)
+            if pending is None:
+                pending = self.unsaved[message.room_id] = []
+            pending.append(message)
+        return message
+
+    def _history(self, room_id: str) -> ChatHistory:
+        """Retourne l'historique d'une room, en le créant si besoin."""
+        history = self.messages.get(room_id)
+        if history is None:
+            history = self.messages[room_id] = ChatHistory(self.max_history)
+        return history
 
     def add_message(
         self,
@@ -55,92 +248,74 @@ class ChatManager:
         Permet aux utilisateurs d'envoyer des messages dans une room (grâce à room_id)
         en fonction de leur sender_id
         """
-        # Initialiser la liste des messages pour cette room si elle n'existe pas encore
-        if room_id not in self.messages:
-            self.messages[room_id] = []
-
-        # Créer le message
-        message = ChatMessage(
-            sender_id=sender_id,
-            sender_name=sender_name,
-            content=content,
-            room_id=room_id,
-            sender_role=sender_role,
+        # Le buffer circulaire limite la taille de l'historique sans copie
+        return self._saved(
+            self._history(room_id).new_message(
+                sender_id=sender_id,
+                sender_name=sender_name,
+                content=content,
+                room_id=room_id,
+                sender_role=sender_role,
+            )
         )
 
-        # Ajouter le message à la liste de cette room
-        self.messages[room_id].append(message)
-
-        # Limiter la taille de l'historique
-        if len(self.messages[room_id]) > self.max_history:
-            self.messages[room_id] = self.messages[room_id][-self.max_history :]
-
-        return message
-
     def add_system_message(self, room_id: str, content: str) -> ChatMessage:
         """Ajoute un message système au chat d'une room."""
-        # Initialiser la liste des messages pour cette room si elle n'existe pas encore
-        if room_id not in self.messages:
-            self.messages[room_id] = []
-
-        # Créer le message système
-        message = ChatMessage(
-            sender_id="system",
-            sender_name="Système",
-            content=content,
-            room_id=room_id,
-            sender_role="system",
-            is_system=True,
+        return self._saved(
+            self._history(room_id).new_message(
+                sender_id="system",
+                sender_name="Système",
+                content=content,
+                room_id=room_id,
+                sender_role="system",
+                is_system=True,
+            )
         )
 
-        # Ajouter le message à la liste de cette room
-        self.messages[room_id].append(message)
-
-        # Limiter la taille de l'historique
-        if len(self.messages[room_id]) > self.max_history:
-            self.messages[room_id] = self.messages[room_id][-self.max_history :]
-
-        return message
-
     def get_chat_history(self, room_id: str, count: int = 50) -> List[dict]:
         """Récupère l'historique récent du chat d'une room."""
         if room_id not in self.messages:
             return []
 
         # Récupérer les X derniers messages
-        recent_messages = (
-            self.messages[room_id][-count:]
-            if count < len(self.messages[room_id])
-            else self.messages[room_id]
-        )
-        return [msg.to_dict() for msg in recent_messages]
+        return [msg.to_dict() for msg in self.messages[room_id].last(count)]
 
     def get_messages_since(self, room_id: str, timestamp: str) -> List[dict]:
         """Récupère les messages d'une room depuis un timestamp donné."""
         if room_id not in self.messages:
             return []
 
+        history = self.messages[room_id]
         try:
             dt = datetime.fromisoformat(timestamp)
-            # Filtrer les messages plus récents que le timestamp donné
-            recent_messages = [
-                msg
-                for msg in self.messages[room_id]
-                if datetime.fromisoformat(msg.timestamp) > dt
-            ]
-            return [msg.to_dict() for msg in recent_messages]
+            created_at = (
+                int(dt.replace(microsecond=0).timestamp()) * 1_000_000 + dt.microsecond
+            )
         except ValueError:
             # Si le timestamp n'est pas valide, retourner les 20 derniers messages
-            recent_messages = self.messages[room_id][-20:]
-            return [msg.to_dict() for msg in recent_messages]
+            return [msg.to_dict() for msg in history.last(20)]
+
+        # Filtrer les messages plus récents que le timestamp donné
+        return [msg.to_dict() for msg in history.since_time(created_at)]
+
+    def get_messages_since_seq(self, room_id: str, seq: int) -> List[dict]:
+        """Récupère les messages d'une room dont le numéro de séquence dépasse seq."""
+        if room_id not in self.messages:
+            return []
+
+        return [msg.to_dict() for msg in self.messages[room_id].since_seq(seq)]
 
     def delete_room_chat(self, room_id: str):
         """Supprime le chat d'une room."""
         if room_id in self.messages:
             del self.messages[room_id]
+        if self.unsaved is not None:
+            self.unsaved.pop(room_id, None)
+            self.deleted_chats.add(room_id)
 
     def cleanup_empty_chats(self, active_room_ids: List[str]):
         """Nettoie les chats des rooms qui n'existent plus."""
+        active_room_ids = set(active_room_ids)
         to_delete = [
             room_id for room_id in self.messages if room_id not in active_room_ids
         ]
@@ -0,0 +1,182 @@
+"""
+Choix des extraits: repères de refrain par morceau, calculés une seule fois.
+
+Les repères (voir app.utils.audio_analysis) sont gardés dans un cache SQLite
+par ID de morceau, partagé par toutes les parties et conservé entre les
+redémarrages. Seuls les morceaux absents du cache sont analysés: l'analyse
+audio est téléchargée (quelques requêtes en parallèle, une seule par morceau
+même si plusieurs rooms le demandent en même temps), analysée puis écrite.
+"""
+
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+import asyncio
+import sqlite3
+import threading
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.utils.audio_analysis import ANALYSIS_VERSION, ClipPoints, analyze, estimated_points
+from app.utils.spotify_requests import get_request_helper
+
+# (track_id, headers) -> analyse audio, ou None si Spotify n'en a pas
+AnalysisFetcher = Callable[[str, dict], Awaitable[Optional[dict]]]
+
+# Nombre max d'IDs par requête SQL (limite des paramètres de SQLite)
+_SQL_CHUNK = 500
+
+
+class ClipPointCache:
+    """Cache disque des repères par morceau. Méthodes bloquantes (appelées dans un thread)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db: Optional[sqlite3.Connection] = None
+        # Une seule connexion, utilisée depuis les threads de asyncio.to_thread
+        self.lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Ouverte au premier usage: importer le module ne crée pas de fichier
+        if self.db is None:
+            self.db = sqlite3.connect(self.path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS clip_points "
+                "(track_id TEXT PRIMARY KEY, version INTEGER NOT NULL, duration REAL NOT NULL, "
+                "refrain_start REAL NOT NULL, refrain_end REAL NOT NULL, "
+                "repeats INTEGER NOT NULL) WITHOUT ROWID"
+            )
+            self.db.commit()
+        return self.db
+
+    def get_many(self, track_ids: List[str]) -> Dict[str, ClipPoints]:
+        """Repères en cache (de la version courante) pour ces morceaux."""
+        found: Dict[str, ClipPoints] = {}
+        with self.lock:
+            db = self._connection()
+            for i in range(0, len(track_ids), _SQL_CHUNK):
+                chunk = track_ids[i : i + _SQL_CHUNK]
+                rows = db.execute(
+                    "SELECT track_id, version, duration, refrain_start, refrain_end, repeats "
+                    "FROM clip_points WHERE version = ? "
+                    f"AND track_id IN ({','.join('?' * len(chunk))})",
+                    (ANALYSIS_VERSION, *chunk),
+                )
+                for row in rows:
+                    found[row[0]] = ClipPoints.from_record(row)
+        return found
+
+    def put_many(self, points: Iterable[ClipPoints]):
+        with self.lock, self._connection() as db:
+            db.executemany(
+                "INSERT OR REPLACE INTO clip_points "
+                "(track_id, version, duration, refrain_start, refrain_end, repeats) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [point.to_record() for point in points],
+            )
+
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+
+
+async def fetch_audio_analysis(track_id: str, headers: dict) -> Optional[dict]:
+    """
+    Télécharge l'analyse audio d'un morceau. None si Spotify n'en fournit pas
+    (403/404: morceau local, accès restreint à l'application).
+    """
+    try:
+        return await get_request_helper(
+            f"{settings.api_base_url}audio-analysis/{track_id}",
+            headers,
+            use_cache=False,  # Réponses de plusieurs centaines de Ko: seuls les repères sont gardés
+            endpoint="audio_analysis",
+        )
+    except HTTPException as e:
+        if e.status_code in (403, 404):
+            return None
+        raise
+
+
+class ClipSelector:
+    def __init__(
+        self,
+        cache: ClipPointCache,
+        fetch: AnalysisFetcher = fetch_audio_analysis,
+        concurrency: int = 4,
+    ):
+        self.cache = cache
+        self.fetch = fetch
+        self.semaphore = asyncio.Semaphore(concurrency)
+        # Analyses en cours: {track_id: tâche}, partagées entre les rooms
+        self.in_flight: Dict[str, asyncio.Task] = {}
+        # Compteurs
+        self.hits = 0  # Repères lus dans le cache
+        self.analyzed = 0  # Morceaux analysés
+
+    async def points(
+        self,
+        track_ids: List[str],
+        headers: dict,
+        durations: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, ClipPoints]:
+        """
+        Repères de chaque morceau: lus dans le cache, sinon analysés et mis en
+        cache. durations (secondes, issues de la playlist) sert d'estimation
+        pour les morceaux sans analyse.
+        """
+        durations = durations or {}
+        found = await asyncio.to_thread(self.cache.get_many, list(dict.fromkeys(track_ids)))
+        self.hits += len(found)
+
+        missing = [track_id for track_id in dict.fromkeys(track_ids) if track_id not in found]
+        if missing:
+            tasks = []
+            for track_id in missing:
+                task = self.in_flight.get(track_id)
+                if task is None:
+                    task = self.in_flight[track_id] = asyncio.create_task(
+                        self._analyze(track_id, headers, durations.get(track_id, 0.0))
+                    )
+                tasks.append(task)
+            # shield: une room qui abandonne n'annule pas les analyses des autres
+            results = await asyncio.gather(
+                *(asyncio.shield(task) for task in tasks), return_exceptions=True
+            )
+            new_points = []
+            for track_id, result in zip(missing, results):
+                if isinstance(result, BaseException):
+                    if isinstance(result, HTTPException) and result.status_code == 401:
+                        raise result
+                    # Erreur passagère: estimation, sans cache (nouvel essai la prochaine fois)
+                    found[track_id] = estimated_points(track_id, durations.get(track_id, 0.0))
+                else:
+                    found[track_id] = result
+                    if result.repeats or result.duration:
+                        new_points.append(result)
+            if new_points:
+                await asyncio.to_thread(self.cache.put_many, new_points)
+        return found
+
+    async def _analyze(self, track_id: str, headers: dict, duration: float) -> ClipPoints:
+        try:
+            async with self.semaphore:
+                analysis = await self.fetch(track_id, headers)
+            self.analyzed += 1
+            if analysis is None:
+                return estimated_points(track_id, duration)
+            return analyze(track_id, analysis)
+        finally:
+            self.in_flight.pop(track_id, None)
+
+    def close(self):
+        self.cache.close()
+
+
+# Instance globale: le cache est partagé par toutes les rooms
+clip_selector = ClipSelector(
+    ClipPointCache(settings.CLIP_CACHE_PATH), concurrency=settings.CLIP_ANALYSIS_CONCURRENCY
+)
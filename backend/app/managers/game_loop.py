@@ -0,0 +1,214 @@
+"""
+Déroulement des parties côté serveur.
+
+Quand une partie démarre, le serveur enchaîne les manches: le buzzer est armé
+au début de chaque manche, l'extrait s'arrête après clipDuration secondes, un
+mauvais joueur bloque le buzzer pendant buzzerOffDuration secondes, puis une
+pause de quelques secondes précède la manche suivante. Toutes les échéances
+passent par le TimerScheduler partagé: aucune tâche endormie par room.
+
+Si la file des manches de la room est prête (voir playlist_prefetch), chaque
+manche prend le morceau suivant de la file; la partie se termine quand elle
+est épuisée.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import re
+
+from app.config import settings
+from app.managers.room_manager import Room
+from app.managers.scheduler import Timer, TimerScheduler, scheduler as shared_scheduler
+
+# (room, type d'événement, champs) -> diffusion aux clients de la room
+EventCallback = Callable[[Room, str, Dict[str, Any]], Awaitable[None]]
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def parse_seconds(value: Any, default: float) -> float:
+    """Lit une durée de la config ("15", "15 sec", 15...), default si illisible."""
+    if isinstance(value, bool):
+        return default
+    if isinstance(value, (int, float)):
+        return max(float(value), 0.0)
+    match = _NUMBER.search(value) if isinstance(value, str) else None
+    if match is None:
+        return default
+    return float(match.group().replace(",", "."))
+
+
+class RoundClock:
+    """Minuteries et temps d'extrait restant de la manche en cours d'une room."""
+
+    __slots__ = (
+        "room",
+        "clip_timer",
+        "clip_deadline",
+        "clip_remaining",
+        "clip_over",
+        "buzzer_timer",
+        "next_timer",
+        "track",
+    )
+
+    def __init__(self, room: Room):
+        self.room = room
+        self.clip_timer: Optional[Timer] = None
+        self.clip_deadline = 0.0  # Fin de l'extrait (loop.time()) tant qu'il joue
+        self.clip_remaining = 0.0  # Temps d'extrait restant quand il est coupé
+        self.clip_over = False  # Extrait terminé pendant qu'un joueur répondait
+        self.buzzer_timer: Optional[Timer] = None
+        self.next_timer: Optional[Timer] = None
+        self.track = None  # Morceau de la manche en cours (RoundTrack), s'il y en a un
+
+    def cancel(self):
+        for timer in (self.clip_timer, self.buzzer_timer, self.next_timer):
+            if timer is not None:
+                timer.cancel()
+        self.clip_timer = self.buzzer_timer = self.next_timer = None
+
+
+class GameLoop:
+    def __init__(
+        self,
+        scheduler: TimerScheduler,
+        rounds: int = 10,
+        intermission: float = 5.0,
+        top: int = 10,
+    ):
+        self.scheduler = scheduler
+        # Nombre de manches si la config de la room ne le précise pas ("rounds")
+        self.rounds = rounds
+        # Pause (secondes) entre la fin d'une manche et le début de la suivante
+        self.intermission = intermission
+        # Nombre de joueurs du classement final (game_ended)
+        self.top = top
+        # Parties en cours: {room_id: RoundClock}
+        self.clocks: Dict[str, RoundClock] = {}
+        # Callback de diffusion des événements du jeu (round_started, round_ended...)
+        self.on_event: Optional[EventCallback] = None
+
+    def round_count(self, room: Room) -> int:
+        rounds = int(parse_seconds(room.config.get("rounds"), 0))
+        return rounds if rounds > 0 else self.rounds
+
+    def start(self, room: Room):
+        """Lance la première manche d'une partie qui vient de démarrer."""
+        self.stop(room.room_id)
+        if room.round_queue is not None and not room.round_queue:
+            # Playlist déjà jouée en entier: nouvel ordre pour cette partie
+            room.round_queue.rewind()
+        clock = self.clocks[room.room_id] = RoundClock(room)
+        clock.next_timer = self.scheduler.schedule(0, self._start_round, clock)
+
+    def stop(self, room_id: str):
+        """Arrête le déroulement d'une partie (room supprimée, partie relancée)."""
+        clock = self.clocks.pop(room_id, None)
+        if clock is not None:
+            clock.cancel()
+
+    def buzzed(self, room: Room):
+        """Un joueur a obtenu le buzzer: l'extrait est coupé si la config le demande."""
+        clock = self.clocks.get(room.room_id)
+        if clock is not None and room.config.get("cutMusicAfterBuzz", True):
+            self._pause_clip(clock)
+
+    def answered(self, room: Room, is_correct: bool):
+        """
+        La réponse du joueur qui a buzzé vient d'être validée (room.validate_answer).
+        Appelé avant la diffusion du résultat: le delta diffusé contient déjà
+        le buzzer bloqué ou la fin de manche.
+        """
+        clock = self.clocks.get(room.room_id)
+        if clock is None:
+            return
+        if is_correct or clock.clip_over:
+            self._finish_round(clock, "found" if is_correct else "timeout")
+            return
+
+        lockout = parse_seconds(room.config.get("buzzerOffDuration"), 3.0)
+        if lockout > 0:
+            room.lock_buzzer()
+            clock.buzzer_timer = self.scheduler.schedule(lockout, self._rearm_buzzer, clock)
+        if clock.clip_timer is None:
+            self._run_clip(clock)
+
+    def _emit(self, room: Room, event_type: str, fields: Dict[str, Any]):
+        if self.on_event is not None:
+            return self.on_event(room, event_type, fields)
+
+    def _start_round(self, clock: RoundClock):
+        clock.next_timer = None
+        room = clock.room
+        if room.game_state != "playing":
+            return None
+        number = room.round_number + 1
+        track = None
+        if number <= self.round_count(room) and room.round_queue is not None:
+            track = room.round_queue.next()
+        if number > self.round_count(room) or (room.round_queue is not None and track is None):
+            self.stop(room.room_id)
+            room.end_game()
+            return self._emit(room, "game_ended", {"ranking": room.get_ranking(self.top)})
+
+        clock.track = track
+        room.start_round(number, track.song() if track is not None else None)
+        duration = parse_seconds(room.config.get("clipDuration"), 15.0)
+        clock.clip_remaining = duration
+        clock.clip_over = False
+        self._run_clip(clock)
+        return self._emit(
+            room, "round_started", {"round": number, "clip_duration": duration}
+        )
+
+    def _run_clip(self, clock: RoundClock):
+        loop = asyncio.get_running_loop()
+        clock.clip_deadline = loop.time() + clock.clip_remaining
+        clock.clip_timer = self.scheduler.schedule(
+            clock.clip_remaining, self._clip_ended, clock
+        )
+
+    def _pause_clip(self, clock: RoundClock):
+        if clock.clip_timer is not None:
+            clock.clip_timer.cancel()
+            clock.clip_timer = None
+            loop = asyncio.get_running_loop()
+            clock.clip_remaining = max(clock.clip_deadline - loop.time(), 0.0)
+
+    def _clip_ended(self, clock: RoundClock):
+        clock.clip_timer = None
+        if clock.room.buzzer_state == "buzzed":
+            # Un joueur répond encore: la manche se termine à la validation
+            clock.clip_over = True
+            return None
+        self._finish_round(clock, "timeout")
+
+    def _rearm_buzzer(self, clock: RoundClock):
+        clock.buzzer_timer = None
+        room = clock.room
+        if room.game_state == "playing" and room.buzzer_state == "inactive":
+            room.reset_buzzer()
+            return self._emit(room, "buzzer_active", {"round": room.round_number})
+
+    def _finish_round(self, clock: RoundClock, reason: str):
+        """Termine la manche, programme la suivante et annonce la fin (au tour suivant)."""
+        room = clock.room
+        clock.cancel()
+        clock.clip_over = False
+        room.end_round()
+        clock.next_timer = self.scheduler.schedule(
+            self.intermission, self._start_round, clock
+        )
+        fields = {"round": room.round_number, "reason": reason}
+        if clock.track is not None:
+            # Le morceau est dévoilé à la fin de la manche
+            fields["answer"] = clock.track.answer()
+            clock.track = None
+        self.scheduler.schedule(0, self._emit, room, "round_ended", fields)
+
+
+# Instance globale, sur les minuteries partagées
+game_loop = GameLoop(
+    shared_scheduler, settings.GAME_ROUNDS, settings.ROUND_INTERMISSION, settings.LEADERBOARD_TOP
+)
@@ -0,0 +1,308 @@
+"""
+Liste des rooms du lobby.
+
+Le lobby garde la fiche (get_room_info) de chaque room, encodée une fois, et
+ne la recalcule que pour les rooms signalées dans room_manager.listing_changes
+(création, suppression, arrivée ou départ d'un joueur, état de la partie):
+une requête ne parcourt jamais toutes les rooms. Chaque mise à jour qui
+change au moins une fiche incrémente la version du lobby et produit un diff
+{room_id: fiche ou null} (JSON merge patch, comme les deltas des rooms),
+gardé dans un historique borné et poussé aux abonnés du flux (Server-Sent
+Events).
+
+Les fiches sont rangées de la room la plus récente à la plus ancienne (date
+de création, puis ID) dans un index par (has_password, game_state): une page
+commence au curseur de la page précédente sans relire les rooms qui le
+précèdent, et les pages encodées restent en cache jusqu'à la version
+suivante.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, deque
+from heapq import merge
+from typing import AsyncIterator, Deque, Dict, Iterator, List, Optional, Set, Tuple
+import asyncio
+import base64
+import binascii
+
+from app.managers.room_manager import RoomManager, room_manager as shared_room_manager
+from app.utils.events import dumps, encode, loads
+
+# Clé de tri d'une room: (-date de création, room_id), les plus récentes d'abord
+SortKey = Tuple[float, str]
+# Filtres d'une page: (has_password, game_state, min_players, max_players)
+PageQuery = Tuple[Optional[bool], Optional[str], Optional[int], Optional[int]]
+
+
+def encode_cursor(key: SortKey) -> str:
+    """Curseur opaque de la page suivante (position de la dernière room lue)."""
+    return base64.urlsafe_b64encode(dumps(list(key)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    """Position encodée par encode_cursor. ValueError si le curseur est illisible."""
+    try:
+        created, room_id = loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, TypeError, ValueError):
+        raise ValueError("curseur invalide") from None
+    if not isinstance(created, (int, float)) or not isinstance(room_id, str):
+        raise ValueError("curseur invalide")
+    return (float(created), room_id)
+
+
+class ListedRoom:
+    """Fiche d'une room dans le lobby."""
+
+    __slots__ = ("info", "json", "key", "group")
+
+    def __init__(self, info: dict, key: SortKey):
+        self.info = info
+        self.json = encode(info)
+        self.key = key
+        self.group = (info["has_password"], info["game_state"])
+
+
+class LobbyPage:
+    __slots__ = ("body", "next_cursor")
+
+    def __init__(self, body: str, next_cursor: Optional[str]):
+        self.body = body  # Tableau JSON des fiches
+        self.next_cursor = next_cursor  # None sur la dernière page
+
+
+class Subscription:
+    """Abonné au flux du lobby: messages SSE déjà encodés, en attente d'envoi."""
+
+    __slots__ = ("queue", "closed")
+
+    def __init__(self, max_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(max_size)
+        self.closed = False
+
+
+class Lobby:
+    def __init__(
+        self,
+        room_manager: RoomManager,
+        history: int = 256,
+        page_cache_size: int = 128,
+        subscriber_queue_size: int = 64,
+    ):
+        self.room_manager = room_manager
+        self.version = 0
+        self.rooms: Dict[str, ListedRoom] = {}
+        # Clés triées des rooms par (has_password, game_state)
+        self.groups: Dict[Tuple[bool, str], List[SortKey]] = {}
+        # Derniers diffs: (version, message SSE)
+        self.history: Deque[Tuple[int, str]] = deque(maxlen=history)
+        # Pages encodées de la version courante: {(filtres, curseur, limite): page}
+        self.pages: "OrderedDict[tuple, LobbyPage]" = OrderedDict()
+        self.page_cache_size = page_cache_size
+        self.subscribers: Set[Subscription] = set()
+        self.subscriber_queue_size = subscriber_queue_size
+        self._task: Optional[asyncio.Task] = None
+
+    # --- Mise à jour ---
+
+    def refresh(self) -> Optional[dict]:
+        """
+        Recalcule les fiches des rooms signalées depuis le dernier appel.
+        Retourne le diff {room_id: fiche ou None} s'il y en a un.
+        """
+        changes = self.room_manager.listing_changes
+        if not changes:
+            return None
+        rooms = self.room_manager.rooms
+        diff = {}
+        for room_id in changes:
+            room = rooms.get(room_id)
+            info = room.get_room_info() if room is not None else None
+            listed = self.rooms.get(room_id)
+            if info == (listed.info if listed is not None else None):
+                continue
+            if listed is not None:
+                self._unlist(room_id, listed)
+            if info is not None:
+                self._list(room_id, ListedRoom(info, (-room.created_at.timestamp(), room_id)))
+            diff[room_id] = info
+        changes.clear()
+        if not diff:
+            return None
+
+        self.version += 1
+        self.pages.clear()
+        message = _sse("diff", {"version": self.version, "rooms": diff}, self.version)
+        self.history.append((self.version, message))
+        self._publish(message)
+        return diff
+
+    def _list(self, room_id: str, listed: ListedRoom):
+        self.rooms[room_id] = listed
+        insort(self.groups.setdefault(listed.group, []), listed.key)
+
+    def _unlist(self, room_id: str, listed: ListedRoom):
+        del self.rooms[room_id]
+        keys = self.groups[listed.group]
+        del keys[bisect_left(keys, listed.key)]
+        if not keys:
+            del self.groups[listed.group]
+
+    # --- Pages ---
+
+    def page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        has_password: Optional[bool] = None,
+        game_state: Optional[str] = None,
+        min_players: Optional[int] = None,
+        max_players: Optional[int] = None,
+    ) -> LobbyPage:
+        """
+        Page de fiches après le curseur (ValueError si le curseur est invalide).
+        Seuls les groupes qui correspondent aux filtres sont lus, à partir du
+        curseur; le nombre de joueurs est filtré pendant la lecture.
+        """
+        cache_key = (has_password, game_state, min_players, max_players, cursor, limit)
+        page = self.pages.get(cache_key)
+        if page is not None:
+            self.pages.move_to_end(cache_key)
+            return page
+
+        after = decode_cursor(cursor) if cursor else None
+        keys = merge(
+            *(
+                _keys_after(group_keys, after)
+                for (password, state), group_keys in self.groups.items()
+                if (has_password is None or password == has_password)
+                and (game_state is None or state == game_state)
+            )
+        )
+        found: List[ListedRoom] = []
+        next_cursor = None
+        for key in keys:
+            listed = self.rooms[key[1]]
+            count = listed.info["player_count"]
+            if (min_players is not None and count < min_players) or (
+                max_players is not None and count > max_players
+            ):
+                continue
+            if len(found) == limit:
+                next_cursor = encode_cursor(found[-1].key)
+                break
+            found.append(listed)
+
+        page = LobbyPage(f"[{','.join(listed.json for listed in found)}]", next_cursor)
+        self.pages[cache_key] = page
+        if len(self.pages) > self.page_cache_size:
+            self.pages.popitem(last=False)
+        return page
+
+    # --- Flux (Server-Sent Events) ---
+
+    def subscribe(self, since: Optional[int] = None) -> Subscription:
+        """
+        Abonne un client au flux. S'il donne la dernière version reçue (since,
+        ou l'en-tête Last-Event-ID d'EventSource) et que l'historique la couvre,
+        les diffs manqués lui sont renvoyés; sinon il reçoit un événement
+        "reset" et doit recharger la liste.
+        """
+        self.refresh()
+        subscription = Subscription(self.subscriber_queue_size)
+        missed = self._missed_since(since)
+        if missed is None or len(missed) >= self.subscriber_queue_size:
+            subscription.queue.put_nowait(self._reset_message())
+        else:
+            for message in missed:
+                subscription.queue.put_nowait(message)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+
+    def _missed_since(self, since: Optional[int]) -> Optional[List[str]]:
+        if since is None or since > self.version:
+            return None
+        if since == self.version:
+            return []
+        if not self.history or self.history[0][0] > since + 1:
+            return None  # Historique dépassé
+        return [message for version, message in self.history if version > since]
+
+    def _reset_message(self) -> str:
+        return _sse("reset", {"version": self.version}, self.version)
+
+    def _publish(self, message: str):
+        for subscription in list(self.subscribers):
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Abonné trop lent: ses messages sont remplacés par un reset et le
+                # flux se ferme; EventSource se reconnecte avec Last-Event-ID
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.queue.put_nowait(self._reset_message())
+                subscription.closed = True
+                self.subscribers.discard(subscription)
+
+    async def stream(
+        self, subscription: Subscription, keepalive: float = 15.0
+    ) -> AsyncIterator[str]:
+        """Messages SSE d'un abonné, avec un commentaire keepalive si le flux est calme."""
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscription.queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    if subscription.closed:
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                if subscription.closed and subscription.queue.empty():
+                    return
+        finally:
+            self.unsubscribe(subscription)
+
+    # --- Mises à jour périodiques ---
+
+    def start(self, interval: float):
+        """
+        Applique les changements toutes les interval secondes et pousse les
+        diffs aux abonnés. Sans abonné, la mise à jour vide quand même
+        room_manager.listing_changes, qui grandirait sinon avec chaque room
+        créée puis supprimée.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(interval))
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Lobby: erreur pendant la mise à jour: {e}")
+
+
+def _keys_after(keys: List[SortKey], after: Optional[SortKey]) -> Iterator[SortKey]:
+    """Clés d'un groupe qui suivent le curseur, sans copier la liste."""
+    start = bisect_right(keys, after) if after is not None else 0
+    return (keys[index] for index in range(start, len(keys)))
+
+
+def _sse(event: str, data: dict, version: int) -> str:
+    return f"id: {version}\nevent: {event}\ndata: {dumps(data)}\n\n"
+
+
+# Instance globale, sur les rooms du worker
+lobby = Lobby(shared_room_manager)
@@ -0,0 +1,312 @@
+"""
+Préparation des manches dès que l'hôte choisit une playlist.
+
+Un config_update qui touche la playlist (ou le moment/la durée des extraits,
+ou le nombre de manches) relance en tâche de fond la préparation de la file
+des manches de la room: toutes les pages de la playlist sont téléchargées,
+les morceaux injouables écartés, l'ordre mélangé et le début de chaque
+extrait calculé (repères de refrain, voir clip_selector). La préparation
+précédente est annulée. Quand la partie démarre, chaque manche prend
+simplement le morceau suivant de la file (O(1)): aucun appel à Spotify entre
+deux manches. Une config modifiée pendant la partie ne touche pas à la file
+en cours: la préparation est relancée à la fin de la partie.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+import asyncio
+import random
+import re
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.managers.clip_selector import ClipSelector, clip_selector as shared_clip_selector
+from app.managers.game_loop import GameLoop, game_loop as shared_game_loop, parse_seconds
+from app.managers.room_manager import Room
+from app.utils.audio_analysis import clip_offset, estimated_points
+from app.utils.spotify_requests import get_request_helper, iter_pages
+
+# (playlist_id, headers) -> items de la playlist ({"track": {...}})
+TracksFetcher = Callable[[str, dict], Awaitable[List[dict]]]
+# (room, type d'événement, champs) -> diffusion aux clients de la room
+EventCallback = Callable[[Room, str, Dict[str, Any]], Awaitable[None]]
+
+# Clés de la config dont dépend la file des manches
+QUEUE_CONFIG_KEYS = ("playlist", "clipDuration", "clipMoment", "rounds")
+
+# États où la file des manches est en cours de lecture
+GAME_IN_PROGRESS = ("playing", "paused")
+
+# Champs des tracks demandés à Spotify (le reste de la réponse est inutile ici)
+TRACK_FIELDS = (
+    "total,limit,items(track(id,uri,name,duration_ms,is_playable,is_local,type,"
+    "artists(name)))"
+)
+
+# ID, URI (spotify:playlist:ID) ou lien (open.spotify.com/playlist/ID) de playlist
+_PLAYLIST_ID = re.compile(r"(?:^|playlist[:/])([0-9A-Za-z]{22})(?:$|[?/])")
+
+
+def parse_playlist_id(value: Any) -> Optional[str]:
+    """ID Spotify de la playlist choisie, None si la config n'en désigne pas ("Pop"...)."""
+    if not isinstance(value, str):
+        return None
+    match = _PLAYLIST_ID.search(value.strip())
+    return match.group(1) if match else None
+
+
+class RoundTrack:
+    """Morceau d'une manche, avec le début de son extrait (secondes)."""
+
+    __slots__ = ("track_id", "uri", "name", "artists", "duration", "offset")
+
+    def __init__(
+        self,
+        track_id: str,
+        uri: str,
+        name: str,
+        artists: List[str],
+        duration: float,
+        offset: Optional[float] = None,
+    ):
+        self.track_id = track_id
+        self.uri = uri
+        self.name = name
+        self.artists = artists
+        self.duration = duration
+        self.offset = offset  # None tant que les repères du morceau ne sont pas calculés
+
+    def song(self) -> dict:
+        """Ce que les clients reçoivent au début de la manche (sans titre ni artistes)."""
+        return {"uri": self.uri, "offset": self.offset, "duration": self.duration}
+
+    def answer(self) -> dict:
+        """Réponse dévoilée à la fin de la manche."""
+        return {"id": self.track_id, "name": self.name, "artists": self.artists}
+
+
+def playable_tracks(items: Iterable[dict]) -> List[RoundTrack]:
+    """Morceaux jouables d'une playlist (sans fichiers locaux, épisodes, doublons)."""
+    tracks = []
+    seen = set()
+    for item in items:
+        track = item.get("track") if isinstance(item, dict) else None
+        if not track or not track.get("id") or track["id"] in seen:
+            continue
+        if track.get("is_local") or track.get("is_playable") is False:
+            continue
+        if track.get("type", "track") != "track":
+            continue
+        seen.add(track["id"])
+        tracks.append(
+            RoundTrack(
+                track["id"],
+                track.get("uri") or f"spotify:track:{track['id']}",
+                track.get("name", ""),
+                [artist.get("name", "") for artist in track.get("artists") or ()],
+                (track.get("duration_ms") or 0) / 1000,
+            )
+        )
+    return tracks
+
+
+class RoundQueue:
+    """File des manches d'une room: morceaux mélangés, lus dans l'ordre."""
+
+    __slots__ = ("playlist_id", "tracks", "position", "moment", "clip_duration")
+
+    def __init__(
+        self, playlist_id: str, tracks: List[RoundTrack], moment: str, clip_duration: float
+    ):
+        self.playlist_id = playlist_id
+        self.tracks = tracks
+        self.position = 0  # Prochain morceau à jouer
+        self.moment = moment
+        self.clip_duration = clip_duration
+
+    def __len__(self) -> int:
+        """Morceaux restants."""
+        return len(self.tracks) - self.position
+
+    def next(self) -> Optional[RoundTrack]:
+        """Morceau de la manche suivante, None si la file est épuisée."""
+        if self.position >= len(self.tracks):
+            return None
+        track = self.tracks[self.position]
+        self.position += 1
+        if track.offset is None:
+            # Repères pas encore calculés (fin de playlist): estimation
+            points = estimated_points(track.track_id, track.duration)
+            track.offset = clip_offset(points, self.moment, self.clip_duration)
+        return track
+
+    def rewind(self, rng: Optional[random.Random] = None):
+        """Nouvelle partie sur une file épuisée: les morceaux sont remélangés."""
+        (rng or random).shuffle(self.tracks)
+        self.position = 0
+
+
+async def fetch_playlist_tracks(playlist_id: str, headers: dict) -> List[dict]:
+    """Télécharge tous les items d'une playlist (pages en parallèle)."""
+    url = (
+        f"{settings.api_base_url}playlists/{playlist_id}/tracks"
+        f"?market=from_token&fields={TRACK_FIELDS}"
+    )
+    first_page = await get_request_helper(
+        f"{url}&offset=0&limit=100", headers, endpoint="playlist_tracks"
+    )
+    items: List[dict] = []
+    async for page in iter_pages(url, headers, first_page, endpoint="playlist_tracks"):
+        items.extend(page)
+    return items
+
+
+class PlaylistPrefetcher:
+    def __init__(
+        self,
+        selector: ClipSelector,
+        game_loop: GameLoop,
+        fetch_tracks: TracksFetcher = fetch_playlist_tracks,
+        rng: Optional[random.Random] = None,
+    ):
+        self.selector = selector
+        # Donne le nombre de manches d'une partie (repères calculés en priorité)
+        self.game_loop = game_loop
+        self.fetch_tracks = fetch_tracks
+        self.rng = rng or random.Random()
+        # Préparations en cours: {room_id: tâche}
+        self.tasks: Dict[str, asyncio.Task] = {}
+        # Dernier token Spotify de l'hôte par room (mémoire seulement, jamais persisté)
+        self.headers: Dict[str, dict] = {}
+        # Config (QUEUE_CONFIG_KEYS) de la dernière préparation lancée, par room
+        self.signatures: Dict[str, tuple] = {}
+        # Rooms dont la config a changé pendant la partie (préparation à la fin)
+        self.deferred: Set[str] = set()
+        # Callback de diffusion (round_queue_ready, round_queue_error)
+        self.on_event: Optional[EventCallback] = None
+
+    def config_changed(self, room: Room, token: Optional[str] = None):
+        """
+        À appeler après room.update_config. La préparation n'est relancée que
+        si la config dont dépend la file a changé (le frontend renvoie toute la
+        config à chaque modification) ou si aucune file n'est prête ni en cours.
+        Pendant une partie, elle est reportée à game_ended.
+        """
+        if token:
+            self.headers[room.room_id] = {
+                "Authorization": token if token.startswith("Bearer ") else f"Bearer {token}"
+            }
+        signature = tuple(room.config.get(key) for key in QUEUE_CONFIG_KEYS)
+        if signature == self.signatures.get(room.room_id) and (
+            room.room_id in self.tasks or room.round_queue is not None
+        ):
+            return
+        if room.game_state in GAME_IN_PROGRESS:
+            self.deferred.add(room.room_id)
+            return
+        self.prepare(room)
+
+    def game_ended(self, room: Room):
+        """Fin de partie: lance la préparation reportée, si la config a changé entre-temps."""
+        if room.room_id in self.deferred:
+            self.deferred.discard(room.room_id)
+            self.config_changed(room)
+
+    def prepare(self, room: Room):
+        """Annule la préparation en cours et en lance une nouvelle si possible."""
+        self.cancel(room.room_id)
+        room.round_queue = None
+        self.signatures.pop(room.room_id, None)
+        playlist_id = parse_playlist_id(room.config.get("playlist"))
+        headers = self.headers.get(room.room_id)
+        if playlist_id is None or headers is None:
+            return
+        self.signatures[room.room_id] = tuple(room.config.get(key) for key in QUEUE_CONFIG_KEYS)
+        task = self.tasks[room.room_id] = asyncio.create_task(
+            self._build(room, playlist_id, headers)
+        )
+        task.add_done_callback(lambda done: self._task_done(room.room_id, done))
+
+    def cancel(self, room_id: str):
+        task = self.tasks.pop(room_id, None)
+        if task is not None:
+            task.cancel()
+
+    def forget(self, room_id: str):
+        """Room supprimée: préparation annulée et token oublié."""
+        self.cancel(room_id)
+        self.headers.pop(room_id, None)
+        self.signatures.pop(room_id, None)
+        self.deferred.discard(room_id)
+
+    async def _build(self, room: Room, playlist_id: str, headers: dict):
+        moment = room.config.get("clipMoment") or "refrain"
+        clip_duration = parse_seconds(room.config.get("clipDuration"), 15.0)
+        try:
+            tracks = playable_tracks(await self.fetch_tracks(playlist_id, headers))
+            self.rng.shuffle(tracks)
+
+            # Repères des premières manches d'abord: la file est prête dès qu'ils sont là
+            first = max(self.game_loop.round_count(room), 1)
+            await self._compute_offsets(tracks[:first], headers, moment, clip_duration)
+        except HTTPException as e:
+            return await self._emit(
+                room, "round_queue_error", {"playlist": playlist_id, "error": e.detail}
+            )
+        except Exception as e:
+            # Réponse inattendue de Spotify...: l'hôte doit quand même être prévenu
+            print(f"Préparation de la playlist de {room.room_id}: erreur: {e!r}")
+            return await self._emit(
+                room,
+                "round_queue_error",
+                {"playlist": playlist_id, "error": "Préparation de la playlist impossible"},
+            )
+
+        room.round_queue = RoundQueue(playlist_id, tracks, moment, clip_duration)
+        await self._emit(
+            room, "round_queue_ready", {"playlist": playlist_id, "tracks": len(tracks)}
+        )
+
+        # Le reste de la playlist (parties suivantes), par tranches
+        for start in range(first, len(tracks), first):
+            try:
+                await self._compute_offsets(
+                    tracks[start : start + first], headers, moment, clip_duration
+                )
+            except HTTPException:
+                break  # Token expiré...: les morceaux restants auront une estimation
+
+    async def _compute_offsets(
+        self, tracks: List[RoundTrack], headers: dict, moment: str, clip_duration: float
+    ):
+        if not tracks:
+            return
+        points = await self.selector.points(
+            [track.track_id for track in tracks],
+            headers,
+            {track.track_id: track.duration for track in tracks},
+        )
+        for track in tracks:
+            if track.offset is None:
+                track.offset = clip_offset(points[track.track_id], moment, clip_duration, self.rng)
+
+    async def _emit(self, room: Room, event_type: str, fields: Dict[str, Any]):
+        if self.on_event is not None:
+            await self.on_event(room, event_type, fields)
+
+    def _task_done(self, room_id: str, task: asyncio.Task):
+        if self.tasks.get(room_id) is task:
+            del self.tasks[room_id]
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Préparation de la playlist de {room_id}: erreur: {task.exception()}")
+
+    async def close(self):
+        tasks = list(self.tasks.values())
+        self.tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Instance globale, sur le cache de repères partagé
+prefetcher = PlaylistPrefetcher(shared_clip_selector, shared_game_loop)
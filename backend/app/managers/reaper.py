@@ -0,0 +1,227 @@
+"""
+Nettoyage en tâche de fond.
+
+À chaque passage (REAPER_INTERVAL), le reaper:
+- coupe les clients qui n'ont rien envoyé (ni pong) depuis heartbeat_timeout,
+- ferme les rooms inactives (ni message d'un client, ni événement diffusé)
+  depuis room_idle_ttl, ou depuis room_empty_ttl quand plus aucun client n'y
+  est connecté,
+- met à jour l'estimation mémoire des rooms et ferme les moins récemment
+  actives (sans client connecté) si le budget global est dépassé,
+- supprime les chats dont la room n'existe plus.
+
+Chaque passage examine au plus batch_size éléments de chaque sorte et ne fait
+aucune attente: même avec des dizaines de milliers de rooms, la boucle
+d'événements n'est bloquée que quelques millisecondes.
+"""
+
+from typing import Dict, List, Optional
+import asyncio
+import time
+
+from app.managers.buzzer_manager import BuzzerManager
+from app.managers.chat_manager import ChatManager
+from app.managers.game_loop import GameLoop
+from app.managers.playlist_prefetch import PlaylistPrefetcher
+from app.managers.room_manager import Room, RoomManager
+from app.managers.ws_manager import ConnectionManager
+from app.utils.metrics import estimated_memory, reaper_evictions
+
+# Estimation de la mémoire d'une room hors chat (objet, config, état encodé...)
+ROOM_OVERHEAD_BYTES = 4096
+PLAYER_BYTES = 512
+
+_silent_clients = reaper_evictions.labels("heartbeat")
+_idle_rooms = reaper_evictions.labels("idle_room")
+_budget_rooms = reaper_evictions.labels("memory_budget")
+_orphan_chats = reaper_evictions.labels("orphan_chat")
+_estimated_memory = estimated_memory.labels()
+
+
+class SweepCursor:
+    """Parcourt les clés d'un dict par tranches, d'un passage à l'autre."""
+
+    __slots__ = ("keys", "position")
+
+    def __init__(self):
+        self.keys: List = []
+        self.position = 0
+
+    def next_batch(self, source: dict, count: int) -> List:
+        # Nouvelle photo des clés une fois la précédente entièrement parcourue
+        if self.position >= len(self.keys):
+            self.keys = list(source)
+            self.position = 0
+        batch = self.keys[self.position : self.position + count]
+        self.position += count
+        return batch
+
+
+class Reaper:
+    def __init__(
+        self,
+        room_manager: RoomManager,
+        chat_manager: ChatManager,
+        connection_manager: ConnectionManager,
+        buzzer_manager: BuzzerManager,
+        interval: float = 1.0,
+        batch_size: int = 1000,
+        heartbeat_timeout: float = 30.0,
+        room_idle_ttl: float = 3600.0,
+        room_empty_ttl: float = 300.0,
+        memory_budget: int = 512 * 1024 * 1024,
+        game_loop: Optional[GameLoop] = None,
+        prefetcher: Optional[PlaylistPrefetcher] = None,
+    ):
+        self.room_manager = room_manager
+        self.chat_manager = chat_manager
+        self.connection_manager = connection_manager
+        self.buzzer_manager = buzzer_manager
+        self.interval = interval
+        self.batch_size = batch_size
+        self.heartbeat_timeout = heartbeat_timeout
+        self.room_idle_ttl = room_idle_ttl
+        self.room_empty_ttl = room_empty_ttl
+        self.memory_budget = memory_budget
+        self.game_loop = game_loop
+        self.prefetcher = prefetcher
+        # Mémoire estimée par room, mise à jour par tranches, et son total
+        self.sizes: Dict[str, int] = {}
+        self.total_size = 0
+        self._clients = SweepCursor()
+        self._rooms = SweepCursor()
+        self._chats = SweepCursor()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Lance les passages périodiques."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Reaper: erreur pendant le nettoyage: {e}")
+
+    def sweep(self, now: float = None):
+        """Un passage de nettoyage (synchrone, borné par batch_size)."""
+        now = time.monotonic() if now is None else now
+        self.drop_silent_clients(now)
+        self.close_idle_rooms(now)
+        self.measure_rooms()
+        self.enforce_memory_budget()
+        self.drop_orphan_chats()
+
+    def drop_silent_clients(self, now: float):
+        """Coupe les clients dont le dernier message date de plus de heartbeat_timeout."""
+        if self.heartbeat_timeout <= 0:
+            return
+        connections = self.connection_manager.active_connections
+        deadline = now - self.heartbeat_timeout
+        for client_id in self._clients.next_batch(connections, self.batch_size):
+            data = connections.get(client_id)
+            if data is not None and data["last_seen"] < deadline:
+                _silent_clients.inc()
+                self.connection_manager.schedule_eviction(
+                    client_id, data["connection"], "heartbeat manqué"
+                )
+
+    def close_idle_rooms(self, now: float):
+        """
+        Ferme les rooms inactives. Les rooms sont rangées de la moins à la plus
+        récemment active: il suffit de regarder la tête jusqu'à la première
+        room encore récente.
+        """
+        threshold = min(self.room_idle_ttl, self.room_empty_ttl)
+        expired = []
+        for scanned, room in enumerate(self.room_manager.rooms.values()):
+            idle = now - room.last_activity
+            if idle < threshold or scanned >= self.batch_size:
+                break
+            if idle >= self.room_idle_ttl or (
+                idle >= self.room_empty_ttl
+                and self.connection_manager.is_room_empty(room.room_id)
+            ):
+                expired.append(room)
+        for room in expired:
+            _idle_rooms.inc()
+            self.close_room(room, "room inactive")
+
+    def measure_rooms(self):
+        """Met à jour l'estimation mémoire d'une tranche de rooms."""
+        rooms = self.room_manager.rooms
+        for room_id in self._rooms.next_batch(rooms, self.batch_size):
+            room = rooms.get(room_id)
+            if room is None:
+                self.total_size -= self.sizes.pop(room_id, 0)
+            else:
+                size = self.estimate(room)
+                self.total_size += size - self.sizes.get(room_id, 0)
+                self.sizes[room_id] = size
+        _estimated_memory.set(self.total_size)
+
+    def estimate(self, room: Room) -> int:
+        """Mémoire estimée d'une room et de son chat (octets)."""
+        history = self.chat_manager.messages.get(room.room_id)
+        chat_size = history.size if history is not None else 0
+        return ROOM_OVERHEAD_BYTES + PLAYER_BYTES * len(room.players) + chat_size
+
+    def enforce_memory_budget(self):
+        """
+        Au-delà du budget, ferme les rooms sans client connecté, des moins
+        récemment actives aux plus actives. Les rooms jouées ne sont jamais fermées.
+        """
+        if self.total_size <= self.memory_budget:
+            return
+        over_budget = []
+        excess = self.total_size - self.memory_budget
+        rooms = self.room_manager.rooms
+        for scanned, room in enumerate(rooms.values()):
+            if excess <= 0 or scanned >= self.batch_size:
+                break
+            if self.connection_manager.is_room_empty(room.room_id):
+                over_budget.append(room)
+                excess -= self.sizes.get(room.room_id) or self.estimate(room)
+        else:
+            # Toutes les rooms examinées: le reste est occupé par des parties en cours
+            if excess > 0:
+                print(f"Reaper: budget mémoire dépassé de {excess} octets (rooms actives)")
+        for room in over_budget:
+            _budget_rooms.inc()
+            self.close_room(room, "budget mémoire dépassé")
+
+    def drop_orphan_chats(self):
+        """Supprime les chats d'une tranche dont la room n'existe plus."""
+        rooms = self.room_manager.rooms
+        for room_id in self._chats.next_batch(self.chat_manager.messages, self.batch_size):
+            if room_id not in rooms and room_id in self.chat_manager.messages:
+                _orphan_chats.inc()
+                self.chat_manager.delete_room_chat(room_id)
+
+    def close_room(self, room: Room, reason: str):
+        """Supprime une room et son chat, et coupe ses clients encore connectés."""
+        room_id = room.room_id
+        print(f"Reaper: room {room_id} fermée ({reason})")
+        self.room_manager.delete_room(room_id)
+        self.chat_manager.delete_room_chat(room_id)
+        self.buzzer_manager.cancel(room_id)
+        if self.game_loop is not None:
+            self.game_loop.stop(room_id)
+        if self.prefetcher is not None:
+            self.prefetcher.forget(room_id)
+        self.total_size -= self.sizes.pop(room_id, 0)
+        for client_id in self.connection_manager.get_clients_in_room(room_id):
+            websocket = self.connection_manager.get_connection(client_id)
+            self.connection_manager.schedule_eviction(client_id, websocket, reason)
@@ -0,0 +1,118 @@
+"""
+Propriétaire de chaque room quand plusieurs workers partagent un backplane.
+
+Une room n'existe que sur un worker: celui qui l'a créée (premier client
+arrivé). Il l'annonce aux autres workers (claim) et la retire quand il la
+supprime (release); un worker qui rejoint le maillage reçoit la liste des
+rooms déjà créées. Un client d'une room arrivé sur un autre worker y reste
+connecté, mais ses actions sont traitées par le propriétaire (voir
+app.routers.websockets): tous les joueurs d'une room jouent la même partie.
+
+Deux workers qui créent la même room en même temps l'annoncent tous les
+deux: la room la plus ancienne l'emporte (puis la plus petite adresse), sur
+tous les workers. Le perdant abandonne sa copie (on_lost) et ses clients se
+reconnectent chez le gagnant.
+"""
+
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.managers.backplane import Backplane
+from app.managers.room_manager import RoomManager, room_manager as shared_room_manager
+from app.managers.scheduler import TimerScheduler, scheduler as shared_scheduler
+
+# (date de création, adresse du worker): la plus petite l'emporte
+Claim = Tuple[float, str]
+
+
+class RoomDirectory:
+    def __init__(self, room_manager: RoomManager, scheduler: Optional[TimerScheduler] = None):
+        self.room_manager = room_manager
+        self.backplane: Optional[Backplane] = None
+        # Rooms des autres workers: {room_id: (date de création, adresse du propriétaire)}
+        self.owners: Dict[str, Claim] = {}
+        # Callback: room de ce worker cédée à un autre (ses clients doivent s'y reconnecter)
+        self.on_lost: Optional[Callable[[str], Awaitable[None]]] = None
+        # Callback: room d'un autre worker supprimée ou passée à un troisième
+        # (les clients de ce worker qui la suivaient doivent partir)
+        self.on_released: Optional[Callable[[str], Awaitable[None]]] = None
+        # Les suppressions (synchrones) sont annoncées par les minuteries partagées
+        self.scheduler = scheduler or shared_scheduler
+
+    def attach(self, backplane: Backplane):
+        """Annonce les rooms de ce worker sur le backplane et suit celles des autres."""
+        self.backplane = backplane
+        backplane.on_peer = self.peer_joined
+        self.room_manager.on_delete = self.release
+
+    def owner(self, room_id: str) -> Optional[str]:
+        """Adresse du worker qui a la room, None si elle est ici ou inconnue."""
+        claim = self.owners.get(room_id)
+        return claim[1] if claim is not None else None
+
+    async def claim(self, room_id: str):
+        """Annonce une room créée par ce worker."""
+        room = self.room_manager.get_room(room_id)
+        if self.backplane is not None and room is not None:
+            await self._send(None, "claim", rooms=[[room_id, room.created_at.timestamp()]])
+
+    def release(self, room_id: str):
+        """Annonce la suppression d'une room de ce worker (appelé par room_manager)."""
+        if self.backplane is not None:
+            self.scheduler.schedule(0, self._announce_release, room_id)
+
+    async def _announce_release(self, room_id: str):
+        await self._send(None, "release", room=room_id)
+
+    async def peer_joined(self, address: str):
+        """Un worker rejoint le maillage: il reçoit les rooms de ce worker."""
+        rooms = [
+            [room_id, room.created_at.timestamp()]
+            for room_id, room in self.room_manager.rooms.items()
+        ]
+        if rooms:
+            await self._send(address, "claim", rooms=rooms)
+
+    def peer_lost(self, address: str) -> List[str]:
+        """Worker perdu: ses rooms sont oubliées. Retourne leurs IDs."""
+        lost = [room_id for room_id, (_, owner) in self.owners.items() if owner == address]
+        for room_id in lost:
+            del self.owners[room_id]
+        return lost
+
+    async def claimed(self, message: dict):
+        """Rooms annoncées par un autre worker (claim)."""
+        worker = message["worker"]
+        for room_id, created in message["rooms"]:
+            claim = (created, worker)
+            room = self.room_manager.get_room(room_id)
+            if room is not None:
+                if claim < (room.created_at.timestamp(), self.backplane.address):
+                    # Room créée ailleurs avant celle-ci: la copie locale est abandonnée
+                    self.owners[room_id] = claim
+                    if self.on_lost is not None:
+                        await self.on_lost(room_id)
+                continue
+            current = self.owners.get(room_id)
+            if current is None or claim < current:
+                self.owners[room_id] = claim
+                if current is not None and self.on_released is not None:
+                    await self.on_released(room_id)
+
+    async def released(self, message: dict):
+        """Room supprimée par son propriétaire (release)."""
+        room_id = message["room"]
+        claim = self.owners.get(room_id)
+        if claim is not None and claim[1] == message["worker"]:
+            del self.owners[room_id]
+            if self.on_released is not None:
+                await self.on_released(room_id)
+
+    async def _send(self, address: Optional[str], message_type: str, **fields):
+        if self.backplane is not None:
+            await self.backplane.send(
+                address, {"type": message_type, "worker": self.backplane.address, **fields}
+            )
+
+
+# Instance globale, sur les rooms du worker
+room_directory = RoomDirectory(shared_room_manager)
@@ -1,8 +1,18 @@
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Set
+import time
 import uuid
 from datetime import datetime
 from fastapi import WebSocket
 
+from app.managers.sessions import EventLog
+from app.utils.events import RawJSON, encode
+from app.utils.leaderboard import Leaderboard
+
+
+# Précision (secondes) de Room.last_activity: une room n'est déplacée dans
+# l'ordre d'activité de RoomManager qu'une fois par intervalle
+ACTIVITY_RESOLUTION = 1.0
+
 
 class Room:
     def __init__(self, room_id: str, room_name: str = None, password: str = None):
@@ -15,11 +25,18 @@ class Room:
             str, dict
         ] = {}  # {player_id: {"connection": WebSocket, "name": str, "score": int}}
         self.spectators: Dict[str, WebSocket] = {}  # Connexions qui regardent seulement
+        # Classement tenu à jour à chaque changement de score (voir utils.leaderboard)
+        self.leaderboard = Leaderboard()
+        self._player_list: Optional[dict] = None  # Cache de get_player_list
         self.current_song = None
         self.game_state = "waiting"  # waiting, playing, paused, ended
         self.buzzer_state = "inactive"  # inactive, active, buzzed
         self.current_buzzer = None  # ID du joueur qui a buzzé
         self.buzzer_timestamp = None  # Horodatage du dernier buzz
+        self.round_number = 0  # Manche en cours (0 = aucune)
+        # File des manches préparée dès le choix de la playlist (RoundQueue de
+        # playlist_prefetch), None tant qu'elle n'est pas prête. Jamais persistée.
+        self.round_queue = None
         self.created_at = datetime.now()
         self.config = {
             "playlist": "Pop",
@@ -29,6 +46,55 @@ class Room:
             "cutMusicAfterBuzz": True,
         }
         self.messages = []  # Historique du chat
+        # Derniers événements diffusés, numérotés (reprise de session). Jamais persisté
+        self.events = EventLog()
+        self._state_json: Optional[RawJSON] = None  # Cache de get_full_state encodé
+        # Version de l'état, incrémentée à chaque modification visible par les clients
+        self.version = 0
+        # Modifications pas encore diffusées (JSON merge patch depuis _pending_from)
+        self._pending_patch: dict = {}
+        self._pending_from = 0
+        # Ensemble partagé des rooms à sauvegarder (None si pas de persistance)
+        self.dirty: Optional[Set[str]] = None
+        # Ensemble partagé des rooms dont la fiche du lobby a pu changer (voir lobby)
+        self.listing: Optional[Set[str]] = None
+        # Dernière activité (time.monotonic, à ACTIVITY_RESOLUTION près)
+        self.last_activity = time.monotonic()
+
+    def _changed(self, patch: dict):
+        """
+        Enregistre une modification de l'état: incrémente la version, invalide
+        le cache de l'état encodé et fusionne le patch dans le delta en attente.
+        """
+        self.version += 1
+        self._state_json = None
+        if "players" in patch:
+            self._player_list = None
+        if self.listing is not None and ("players" in patch or "game_state" in patch):
+            self.listing.add(self.room_id)
+        _merge_patch(self._pending_patch, patch)
+        if self.dirty is not None:
+            self.dirty.add(self.room_id)
+
+    def pop_delta(self) -> Optional[dict]:
+        """
+        Retourne le delta accumulé depuis la dernière diffusion, ou None.
+
+        Le delta est un JSON merge patch (null = suppression) à appliquer sur
+        l'état de version from_version pour obtenir l'état de version version.
+        Un client dont la version locale diffère de from_version doit
+        redemander l'état complet (get_room_state).
+        """
+        if not self._pending_patch:
+            return None
+        delta = {
+            "from_version": self._pending_from,
+            "version": self.version,
+            "patch": self._pending_patch,
+        }
+        self._pending_patch = {}
+        self._pending_from = self.version
+        return delta
 
     def set_host(self, host_connection: WebSocket, host_id: str):
         """Définit ou met à jour la connexion hôte."""
@@ -36,12 +102,23 @@ class Room:
         self.host_id = host_id
 
     def add_player(self, player_id: str, connection: WebSocket, name: str = None):
-        """Ajoute un joueur à la room."""
+        """Ajoute un joueur à la room (un joueur déjà présent garde son score)."""
+        existing = self.players.get(player_id)
+        score = existing["score"] if existing else 0
         self.players[player_id] = {
             "connection": connection,
             "name": name or player_id,
-            "score": 0,
+            "score": score,
         }
+        patch = {"players": {player_id: {"name": name or player_id, "score": score}}}
+        ranks = self.leaderboard.add(player_id, score)
+        if ranks:
+            patch["ranks"] = ranks
+        self._changed(patch)
+
+    def add_spectator(self, client_id: str, connection: WebSocket):
+        """Ajoute un spectateur: il reçoit la partie sans y jouer (pas de delta d'état)."""
+        self.spectators[client_id] = connection
 
     def remove_connection(self, client_id: str):
         """Supprime une connexion de la room."""
@@ -52,6 +129,11 @@ class Room:
 
         if client_id in self.players:
             del self.players[client_id]
+            patch = {"players": {client_id: None}}
+            ranks = self.leaderboard.remove(client_id)
+            if ranks:
+                patch["ranks"] = ranks
+            self._changed(patch)
             return "player"
 
         if client_id in self.spectators:
@@ -61,35 +143,88 @@ class Room:
         return None
 
     def get_player_list(self):
-        """Retourne la liste des joueurs avec leurs scores."""
-        return {
-            player_id: {"name": player["name"], "score": player["score"]}
-            for player_id, player in self.players.items()
-        }
+        """
+        Retourne les joueurs avec leurs scores, du premier au dernier du
+        classement. Le dict est mis en cache jusqu'au prochain changement de
+        joueur ou de score: ne pas le modifier.
+        """
+        if self._player_list is None:
+            players = self.players
+            self._player_list = {
+                player_id: {"name": players[player_id]["name"], "score": score}
+                for player_id, score, _ in self.leaderboard.ranked()
+            }
+        return self._player_list
+
+    def get_ranking(self, count: int) -> List[dict]:
+        """Les count premiers du classement (top-K, sans parcourir tous les joueurs)."""
+        return [
+            {"id": player_id, "name": self.players[player_id]["name"], "score": score, "rank": rank}
+            for player_id, score, rank in self.leaderboard.top(count)
+        ]
 
     def update_config(self, new_config: dict):
-        """Met à jour la configuration de la room."""
-        self.config.update(new_config)
+        """
+        Met à jour la configuration de la room. Une valeur None supprime la
+        clé, comme null dans le delta (JSON merge patch) que reçoivent les clients.
+        """
+        for key, value in new_config.items():
+            if value is None:
+                self.config.pop(key, None)
+            else:
+                self.config[key] = value
+        self._changed({"config": new_config})
 
     def start_game(self):
         """Démarre le jeu."""
+        patch = {"game_state": "playing", "buzzer_state": "inactive"}
+        if self.round_number:
+            # Partie relancée: les manches repartent de zéro
+            patch["round_number"] = self.round_number = 0
         self.game_state = "playing"
         self.buzzer_state = "inactive"
+        self._changed(patch)
+
+    def start_round(self, number: int, song: Optional[dict] = None):
+        """Commence une manche: le buzzer est armé et l'extrait à jouer annoncé."""
+        self.round_number = number
+        self.buzzer_state = "active"
+        self.current_buzzer = None
+        self.buzzer_timestamp = None
+        patch = {"round_number": number, "buzzer_state": "active", "current_buzzer": None}
+        if song is not None or self.current_song is not None:
+            self.current_song = song
+            patch["current_song"] = song
+        self._changed(patch)
+
+    def end_round(self):
+        """Termine la manche en cours: plus personne ne peut buzzer."""
+        self.buzzer_state = "inactive"
+        self.current_buzzer = None
+        self._changed({"buzzer_state": "inactive", "current_buzzer": None})
+
+    def lock_buzzer(self):
+        """Désactive le buzzer (pénalité après une mauvaise réponse)."""
+        self.buzzer_state = "inactive"
+        self._changed({"buzzer_state": "inactive"})
 
     def pause_game(self):
         """Met le jeu en pause."""
         self.game_state = "paused"
+        self._changed({"game_state": "paused"})
 
     def end_game(self):
         """Termine le jeu."""
         self.game_state = "ended"
         self.buzzer_state = "inactive"
+        self._changed({"game_state": "ended", "buzzer_state": "inactive"})
 
     def reset_buzzer(self):
         """Réinitialise le buzzer."""
         self.buzzer_state = "active"
         self.current_buzzer = None
         self.buzzer_timestamp = None
+        self._changed({"buzzer_state": "active", "current_buzzer": None})
 
     def register_buzz(self, player_id: str):
         """Enregistre un buzz d'un joueur."""
@@ -97,19 +232,35 @@ class Room:
             self.buzzer_state = "buzzed"
             self.current_buzzer = player_id
             self.buzzer_timestamp = datetime.now().isoformat()
+            self._changed({"buzzer_state": "buzzed", "current_buzzer": player_id})
             return True
         return False
 
     def validate_answer(self, is_correct: bool):
         """Valide la réponse du joueur qui a buzzé."""
         if self.current_buzzer and self.buzzer_state == "buzzed":
-            if is_correct and self.current_buzzer in self.players:
-                self.players[self.current_buzzer]["score"] += 1
-
+            player = self.players.get(self.current_buzzer)
+            rank = self.leaderboard.rank(self.current_buzzer) if player is not None else None
+            previous_rank = rank
+            if is_correct and player is not None:
+                player["score"] += 1
+                # Seuls les rangs qui changent partent dans le delta ({score: rang})
+                ranks = self.leaderboard.set_score(self.current_buzzer, player["score"])
+                rank = self.leaderboard.rank(self.current_buzzer)
+                self._changed(
+                    {
+                        "players": {self.current_buzzer: {"score": player["score"]}},
+                        "ranks": ranks,
+                    }
+                )
+
+            # Seul le score du joueur concerné est envoyé, le reste passe par le delta
             result = {
                 "player_id": self.current_buzzer,
                 "is_correct": is_correct,
-                "scores": self.get_player_list(),
+                "score": player["score"] if player is not None else None,
+                "rank": rank,
+                "previous_rank": previous_rank,
             }
 
             self.reset_buzzer()
@@ -135,21 +286,136 @@ class Room:
     def get_full_state(self):
         """Retourne l'état complet de la room."""
         return {
+            "version": self.version,
             "id": self.room_id,
             "name": self.name,
             "has_password": bool(self.password),
             "game_state": self.game_state,
             "buzzer_state": self.buzzer_state,
             "current_buzzer": self.current_buzzer,
+            "round_number": self.round_number,
             "players": self.get_player_list(),
+            "ranks": self.leaderboard.rank_table(),
             "config": self.config,
             "current_song": self.current_song,
         }
 
+    def get_full_state_json(self) -> RawJSON:
+        """
+        Retourne l'état complet de la room encodé en JSON.
+        L'encodage est mis en cache jusqu'à la prochaine modification de la room.
+        """
+        if self._state_json is None:
+            self._state_json = encode(self.get_full_state())
+        return self._state_json
+
+    def to_record(self) -> dict:
+        """
+        Retourne l'état persistant de la room (sans les connexions).
+        Le dict est indépendant de la room: il peut être écrit depuis un autre thread.
+        """
+        return {
+            "id": self.room_id,
+            "name": self.name,
+            "password": self.password,
+            "created_at": self.created_at.isoformat(),
+            "version": self.version,
+            "game_state": self.game_state,
+            "buzzer_state": self.buzzer_state,
+            "current_buzzer": self.current_buzzer,
+            "buzzer_timestamp": self.buzzer_timestamp,
+            "round_number": self.round_number,
+            "current_song": self.current_song,
+            "config": dict(self.config),
+            "players": self.get_player_list(),
+        }
+
+    @classmethod
+    def from_record(cls, record: dict) -> "Room":
+        """
+        Recrée une room depuis son état persistant. Les joueurs sont restaurés
+        sans connexion: ils retrouvent leur score en se reconnectant.
+        """
+        room = cls(record["id"], record["name"], record["password"])
+        room.created_at = datetime.fromisoformat(record["created_at"])
+        room.version = room._pending_from = record["version"]
+        room.game_state = record["game_state"]
+        room.buzzer_state = record["buzzer_state"]
+        room.current_buzzer = record["current_buzzer"]
+        room.buzzer_timestamp = record["buzzer_timestamp"]
+        room.round_number = record.get("round_number", 0)
+        room.current_song = record["current_song"]
+        room.config = record["config"]
+        room.players = {
+            player_id: {"connection": None, "name": player["name"], "score": player["score"]}
+            for player_id, player in record["players"].items()
+        }
+        for player_id, player in room.players.items():
+            room.leaderboard.add(player_id, player["score"])
+        return room
+
+
+def _merge_patch(target: dict, patch: dict):
+    """Fusionne un JSON merge patch dans un autre (les dicts sont copiés)."""
+    for key, value in patch.items():
+        if isinstance(value, dict):
+            current = target.get(key)
+            if not isinstance(current, dict):
+                current = target[key] = {}
+            _merge_patch(current, value)
+        else:
+            target[key] = value
+
 
 class RoomManager:
     def __init__(self):
         self.rooms: Dict[str, Room] = {}
+        # Suivi des modifications pour la persistance (None tant qu'elle est désactivée)
+        self.dirty_rooms: Optional[Set[str]] = None
+        self.deleted_rooms: Optional[Set[str]] = None
+        # Rooms créées, supprimées ou dont la fiche (get_room_info) a pu changer
+        # depuis la dernière mise à jour du lobby
+        self.listing_changes: Set[str] = set()
+        # Callback appelé après la suppression d'une room (annonce aux autres workers)
+        self.on_delete: Optional[Callable[[str], None]] = None
+
+    def track_changes(self):
+        """Active le suivi des rooms modifiées et supprimées (voir state_store)."""
+        if self.dirty_rooms is None:
+            self.dirty_rooms = set()
+            self.deleted_rooms = set()
+        for room in self.rooms.values():
+            room.dirty = self.dirty_rooms
+
+    def restore_rooms(self, records: List[dict]) -> int:
+        """Recrée les rooms sauvegardées (au démarrage, avant toute connexion)."""
+        for record in records:
+            room = Room.from_record(record)
+            room.dirty = self.dirty_rooms
+            room.listing = self.listing_changes
+            self.rooms[room.room_id] = room
+            self.listing_changes.add(room.room_id)
+        return len(records)
+
+    def touch(self, room: Room, now: float):
+        """
+        Note l'activité d'une room. Les rooms restent rangées dans self.rooms de
+        la moins à la plus récemment active: les rooms inactives sont en tête.
+        """
+        if now - room.last_activity >= ACTIVITY_RESOLUTION:
+            room.last_activity = now
+            rooms = self.rooms
+            if rooms.get(room.room_id) is room:
+                rooms[room.room_id] = rooms.pop(room.room_id)
+
+    def _forget(self, room_id: str):
+        """Note la suppression d'une room pour le lobby, la persistance et les autres workers."""
+        self.listing_changes.add(room_id)
+        if self.deleted_rooms is not None:
+            self.dirty_rooms.discard(room_id)
+            self.deleted_rooms.add(room_id)
+        if self.on_delete is not None:
+            self.on_delete(room_id)
 
     def create_room(
         self, room_id: str = None, room_name: str = None, password: str = None
@@ -166,7 +432,12 @@ class RoomManager:
             return room_id
 
         # Créer la room avec l'ID spécifié ou généré
-        self.rooms[room_id] = Room(room_id, room_name, password)
+        room = self.rooms[room_id] = Room(room_id, room_name, password)
+        room.listing = self.listing_changes
+        self.listing_changes.add(room_id)
+        if self.dirty_rooms is not None:
+            room.dirty = self.dirty_rooms
+            self.dirty_rooms.add(room_id)
         return room_id
 
     def get_room(self, room_id: str) -> Optional[Room]:
@@ -177,6 +448,7 @@ class RoomManager:
         """Supprime une room."""
         if room_id in self.rooms:
             del self.rooms[room_id]
+            self._forget(room_id)
             return True
         return False
 
@@ -206,6 +478,7 @@ class RoomManager:
         ]
         for room_id in empty_rooms:
             del self.rooms[room_id]
+            self._forget(room_id)
 
         return len(empty_rooms)
 
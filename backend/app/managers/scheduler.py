@@ -0,0 +1,137 @@
+"""
+Minuteries partagées par toutes les rooms.
+
+Un seul tas (heapq) de minuteries, ordonné par échéance, et un seul rappel
+programmé sur la boucle d'événements (loop.call_at) pour la plus proche:
+pas de tâche endormie par room. Programmer une minuterie coûte O(log n),
+l'annuler O(1) (elle est marquée et ignorée à sa sortie du tas, qui est
+compacté quand les minuteries annulées y deviennent majoritaires).
+"""
+
+from typing import Callable, List, Optional, Set, Tuple
+import asyncio
+import heapq
+import itertools
+
+from app.utils.metrics import timer_lag_seconds
+
+_timer_lag = timer_lag_seconds.labels()
+
+
+class Timer:
+    """Minuterie programmée; cancel() l'annule si elle n'a pas encore expiré."""
+
+    __slots__ = ("deadline", "seq", "callback", "args", "cancelled", "scheduler")
+
+    def __init__(self, deadline: float, seq: int, callback: Callable, args: tuple,
+                 scheduler: "TimerScheduler"):
+        self.deadline = deadline  # Échéance (horloge de la boucle, loop.time())
+        self.seq = seq  # Départage les échéances égales: ordre de programmation
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self.scheduler = scheduler
+
+    def cancel(self):
+        if not self.cancelled:
+            self.cancelled = True
+            if self.scheduler is not None:
+                self.scheduler._timer_cancelled()
+
+
+class TimerScheduler:
+    def __init__(self):
+        # (échéance, numéro, minuterie): comparaisons de tuples faites en C
+        self.heap: List[Tuple[float, int, Timer]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._seq = itertools.count()
+        self._cancelled = 0  # Minuteries annulées encore dans le tas
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._armed_at: Optional[float] = None  # Échéance du rappel programmé
+        # Tâches lancées par des rappels asynchrones (gardées jusqu'à leur fin)
+        self._tasks: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self.heap) - self._cancelled
+
+    def schedule(self, delay: float, callback: Callable, *args) -> Timer:
+        """
+        Programme callback(*args) dans delay secondes. Un callback qui retourne
+        une coroutine est exécuté dans une tâche.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Nouvelle boucle (tests, redémarrage): les minuteries de l'ancienne sont perdues
+            self.close()
+            self._loop = loop
+        seq = next(self._seq)
+        timer = Timer(loop.time() + max(delay, 0.0), seq, callback, args, self)
+        heapq.heappush(self.heap, (timer.deadline, seq, timer))
+        if self._armed_at is None or timer.deadline < self._armed_at:
+            self._arm(loop, timer.deadline)
+        return timer
+
+    def _arm(self, loop: asyncio.AbstractEventLoop, deadline: float):
+        if self._handle is not None:
+            self._handle.cancel()
+        self._armed_at = deadline
+        self._handle = loop.call_at(deadline, self._fire)
+
+    def _timer_cancelled(self):
+        self._cancelled += 1
+        if self._cancelled > 64 and self._cancelled * 2 > len(self.heap):
+            self._compact()
+
+    def _fire(self):
+        loop = asyncio.get_running_loop()
+        self._handle = self._armed_at = None
+        now = loop.time()
+        # self.heap est relu à chaque tour: un rappel peut annuler (et compacter)
+        while self.heap and self.heap[0][0] <= now:
+            timer = heapq.heappop(self.heap)[2]
+            if timer.cancelled:
+                self._cancelled -= 1
+                continue
+            timer.scheduler = None  # Expirée: cancel() ne compte plus
+            _timer_lag.observe(now - timer.deadline)
+            try:
+                result = timer.callback(*timer.args)
+                if asyncio.iscoroutine(result):
+                    task = loop.create_task(result)
+                    self._tasks.add(task)
+                    task.add_done_callback(self._task_done)
+            except Exception as e:
+                print(f"Minuterie: erreur dans {timer.callback.__name__}: {e}")
+
+        while self.heap and self.heap[0][2].cancelled:
+            heapq.heappop(self.heap)
+            self._cancelled -= 1
+        if self.heap:
+            self._arm(loop, self.heap[0][0])
+
+    def _compact(self):
+        """Retire les minuteries annulées du tas (O(n), amorti sur les annulations)."""
+        self.heap = [entry for entry in self.heap if not entry[2].cancelled]
+        heapq.heapify(self.heap)
+        self._cancelled = 0
+
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Minuterie: erreur dans une tâche: {task.exception()}")
+
+    def close(self):
+        """Annule toutes les minuteries et le rappel programmé."""
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = self._armed_at = None
+        for _, _, timer in self.heap:
+            timer.scheduler = None
+        self.heap = []
+        self._cancelled = 0
+        for task in self._tasks:
+            task.cancel()
+
+
+# Instance globale, partagée par toutes les rooms
+scheduler = TimerScheduler()
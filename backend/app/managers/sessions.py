@@ -0,0 +1,137 @@
+"""
+Reprise de session après une coupure réseau.
+
+Quand la connexion d'un joueur tombe, sa place (et son score) est gardée
+pendant SESSION_GRACE_PERIOD secondes sans rien diffuser: s'il revient à
+temps, les autres joueurs ne voient ni départ ni arrivée. Passé ce délai, le
+départ suit le chemin normal (player_disconnected).
+
+Chaque room garde aussi un journal borné de ses derniers événements diffusés,
+numérotés (champs "seq" et "epoch" ajoutés à l'événement). Seul le worker
+propriétaire de la room a un journal (voir room_directory): les clients
+connectés à d'autres workers reçoivent les mêmes numéros, et leur reprise
+est traitée par lui. Un client qui se reconnecte donne le dernier numéro reçu et l'epoch du journal (room_state les
+fournit): il ne reçoit que les événements manqués, dans l'ordre. L'état
+complet n'est renvoyé que si le journal ne remonte plus jusque-là (ou s'il a
+été recréé, après un redémarrage: l'epoch a changé).
+"""
+
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+import uuid
+
+from app.config import settings
+from app.managers.scheduler import Timer, TimerScheduler, scheduler as shared_scheduler
+from app.utils.events import add_fields
+
+
+class EventLog:
+    """Derniers événements diffusés dans une room, numérotés à partir de 1."""
+
+    __slots__ = ("entries", "seq", "epoch")
+
+    def __init__(self, capacity: int = settings.ROOM_EVENT_LOG_SIZE):
+        # (numéro, événement encodé, client exclu de la diffusion, sa propre version)
+        self.entries: Deque[Tuple[int, str, Optional[str], Optional[str]]] = deque(
+            maxlen=capacity
+        )
+        self.seq = 0  # Numéro du dernier événement
+        # Identifie ce journal: un numéro d'un autre journal (avant un
+        # redémarrage...) ne désigne pas les mêmes événements
+        self.epoch = uuid.uuid4().hex[:8]
+
+    def append(
+        self,
+        message: str,
+        exclude_client: Optional[str] = None,
+        personal: Optional[str] = None,
+    ) -> str:
+        """
+        Numérote un événement encodé, le garde et le retourne avec son numéro
+        et l'epoch du journal (le client ne suit que les numéros de son epoch).
+        personal est la version reçue par le client exclu (is_self...): elle
+        lui est renvoyée à la reprise, sous le même numéro.
+        """
+        self.seq += 1
+        message = self.stamp(message)
+        if personal is not None:
+            personal = self.stamp(personal)
+        self.entries.append((self.seq, message, exclude_client, personal))
+        return message
+
+    def stamp(self, message: str) -> str:
+        """Ajoute le numéro du dernier événement et l'epoch à un message encodé."""
+        # Texte ordinaire, comme encode_event
+        return str(add_fields(message, seq=self.seq, epoch=self.epoch))
+
+    def since(
+        self, seq: Optional[int], epoch: Optional[str], client_id: str
+    ) -> Optional[List[str]]:
+        """
+        Événements postérieurs à seq pour ce client: sa propre version de ceux
+        dont il était exclu, s'il en avait reçu une, sinon rien (il avait reçu
+        l'état complet...). None si le journal ne permet pas la reprise:
+        l'état complet doit être renvoyé.
+        """
+        if seq is None or epoch != self.epoch or seq > self.seq:
+            return None
+        if seq == self.seq:
+            return []
+        if not self.entries or self.entries[0][0] > seq + 1:
+            return None  # Journal dépassé
+        start = seq + 1 - self.entries[0][0]
+        missed = []
+        for index, (_, message, excluded, personal) in enumerate(self.entries):
+            if index < start:
+                continue
+            if excluded != client_id:
+                missed.append(message)
+            elif personal is not None:
+                missed.append(personal)
+        return missed
+
+
+# (client_id, room_id) -> départ définitif du joueur (player_disconnected...)
+ExpireCallback = Callable[[str, str], Awaitable[None]]
+
+
+class SessionManager:
+    def __init__(self, scheduler: TimerScheduler, grace_period: float = 30.0):
+        self.scheduler = scheduler
+        # Délai (secondes) pendant lequel la place d'un joueur déconnecté est gardée
+        self.grace_period = grace_period
+        # Places gardées: {client_id: (room_id, minuterie d'expiration)}
+        self.held: Dict[str, Tuple[str, Timer]] = {}
+        # Callback du départ définitif, à la fin du délai de grâce
+        self.on_expire: Optional[ExpireCallback] = None
+
+    async def hold(self, client_id: str, room_id: str):
+        """Connexion perdue: garde la place du joueur, ou le fait partir sans délai de grâce."""
+        self.release(client_id)
+        if self.grace_period <= 0:
+            return await self._expire(client_id, room_id)
+        timer = self.scheduler.schedule(self.grace_period, self._expire, client_id, room_id)
+        self.held[client_id] = (room_id, timer)
+
+    def resume(self, client_id: str, room_id: str) -> bool:
+        """Reconnexion: True si la place du joueur dans cette room était gardée."""
+        held = self.held.get(client_id)
+        if held is None or held[0] != room_id:
+            return False
+        self.release(client_id)
+        return True
+
+    def release(self, client_id: str):
+        """Oublie la place gardée d'un client (sans le faire partir)."""
+        held = self.held.pop(client_id, None)
+        if held is not None:
+            held[1].cancel()
+
+    async def _expire(self, client_id: str, room_id: str):
+        self.held.pop(client_id, None)
+        if self.on_expire is not None:
+            await self.on_expire(client_id, room_id)
+
+
+# Instance globale, sur les minuteries partagées
+sessions = SessionManager(shared_scheduler, settings.SESSION_GRACE_PERIOD)
@@ -0,0 +1,273 @@
+"""
+Persistance des rooms et du chat.
+
+Les rooms vivent en mémoire dans RoomManager/ChatManager; un StateStore en garde
+une copie pour survivre à un redémarrage. StatePersistence écrit périodiquement
+uniquement ce qui a changé (rooms modifiées, nouveaux messages, suppressions),
+recharge tout au démarrage et écrit les dernières modifications à l'arrêt.
+"""
+
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import gc
+import sqlite3
+
+from app.managers.chat_manager import ChatManager
+from app.managers.room_manager import RoomManager
+from app.utils.events import dumps, loads
+
+
+class StateBatch:
+    """Modifications à écrire en une fois (dicts indépendants des rooms en mémoire)."""
+
+    __slots__ = ("rooms", "deleted_rooms", "messages", "deleted_chats", "history_limit")
+
+    def __init__(
+        self,
+        rooms: List[dict],
+        deleted_rooms: List[str],
+        messages: List[dict],
+        deleted_chats: List[str],
+        history_limit: int,
+    ):
+        self.rooms = rooms
+        self.deleted_rooms = deleted_rooms
+        self.messages = messages  # Triés par room puis par seq
+        self.deleted_chats = deleted_chats
+        self.history_limit = history_limit  # Messages gardés par room
+
+
+class StateStore:
+    """Interface d'un stockage. Les méthodes sont bloquantes (appelées dans un thread)."""
+
+    def load(self) -> Tuple[List[dict], List[dict]]:
+        """Retourne (rooms, messages triés par room puis par seq)."""
+        raise NotImplementedError
+
+    def write(self, batch: StateBatch):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InMemoryStateStore(StateStore):
+    """Stockage en mémoire: ne survit pas au processus, utile pour les tests."""
+
+    def __init__(self):
+        self.rooms: Dict[str, dict] = {}
+        # {room_id: {seq: message}}
+        self.messages: Dict[str, Dict[int, dict]] = {}
+
+    def load(self):
+        messages = []
+        for room_id in sorted(self.messages):
+            chat = self.messages[room_id]
+            messages.extend(chat[seq] for seq in sorted(chat))
+        return list(self.rooms.values()), messages
+
+    def write(self, batch: StateBatch):
+        for room_id in batch.deleted_rooms:
+            self.rooms.pop(room_id, None)
+        for room_id in batch.deleted_chats:
+            self.messages.pop(room_id, None)
+        for record in batch.rooms:
+            self.rooms[record["id"]] = record
+        for record in batch.messages:
+            chat = self.messages.setdefault(record["room_id"], {})
+            chat[record["seq"]] = record
+            oldest = record["seq"] - batch.history_limit
+            if oldest in chat:
+                del chat[oldest]
+
+
+class SQLiteStateStore(StateStore):
+    """
+    Stockage durable dans un fichier SQLite (une ligne JSON par room et par message).
+
+    Chaque écriture est une seule transaction; en mode WAL elle ne coûte qu'un
+    ajout au journal, et le chargement au démarrage lit deux tables d'un bloc.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # Utilisé depuis les threads de asyncio.to_thread, jamais en parallèle
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS rooms "
+            "(room_id TEXT PRIMARY KEY, data TEXT NOT NULL) WITHOUT ROWID"
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS messages "
+            "(room_id TEXT NOT NULL, seq INTEGER NOT NULL, data TEXT NOT NULL, "
+            "PRIMARY KEY (room_id, seq)) WITHOUT ROWID"
+        )
+        self.db.commit()
+
+    def load(self):
+        rooms = [loads(data) for (data,) in self.db.execute("SELECT data FROM rooms")]
+        messages = [
+            loads(data)
+            for (data,) in self.db.execute(
+                "SELECT data FROM messages ORDER BY room_id, seq"
+            )
+        ]
+        return rooms, messages
+
+    def write(self, batch: StateBatch):
+        # Seq le plus récent par room: les messages plus anciens que l'historique sont purgés
+        last_seq: Dict[str, int] = {}
+        for record in batch.messages:
+            last_seq[record["room_id"]] = record["seq"]
+
+        with self.db:
+            self.db.executemany(
+                "DELETE FROM rooms WHERE room_id = ?",
+                [(room_id,) for room_id in batch.deleted_rooms],
+            )
+            self.db.executemany(
+                "DELETE FROM messages WHERE room_id = ?",
+                [(room_id,) for room_id in batch.deleted_chats],
+            )
+            self.db.executemany(
+                "INSERT OR REPLACE INTO rooms (room_id, data) VALUES (?, ?)",
+                [(record["id"], dumps(record)) for record in batch.rooms],
+            )
+            self.db.executemany(
+                "INSERT OR REPLACE INTO messages (room_id, seq, data) VALUES (?, ?, ?)",
+                [
+                    (record["room_id"], record["seq"], dumps(record))
+                    for record in batch.messages
+                ],
+            )
+            self.db.executemany(
+                "DELETE FROM messages WHERE room_id = ? AND seq <= ?",
+                [
+                    (room_id, seq - batch.history_limit)
+                    for room_id, seq in last_seq.items()
+                    if seq > batch.history_limit
+                ],
+            )
+
+    def close(self):
+        self.db.close()
+
+
+class StatePersistence:
+    """Relie RoomManager et ChatManager à un StateStore."""
+
+    def __init__(
+        self,
+        store: StateStore,
+        room_manager: RoomManager,
+        chat_manager: ChatManager,
+        interval: float = 1.0,
+    ):
+        self.store = store
+        self.room_manager = room_manager
+        self.chat_manager = chat_manager
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        # Lots dont l'écriture a échoué, réessayés avant les suivants
+        self._failed: List[StateBatch] = []
+
+    async def restore(self) -> Tuple[int, int]:
+        """
+        Recharge les rooms et les messages sauvegardés puis active le suivi des
+        modifications. Retourne (nombre de rooms, nombre de messages).
+        """
+        # Des centaines de milliers d'objets sont créés d'un coup: sans le GC
+        # cyclique, qui les parcourrait plusieurs fois, le chargement va deux fois plus vite
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            rooms, messages = await asyncio.to_thread(self.store.load)
+            self.room_manager.restore_rooms(rooms)
+            self.chat_manager.restore_messages(messages)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        self.room_manager.track_changes()
+        self.chat_manager.track_changes()
+        return len(rooms), len(messages)
+
+    def collect(self) -> Optional[StateBatch]:
+        """Prend les modifications en attente (dans la boucle, sans I/O)."""
+        room_manager, chat_manager = self.room_manager, self.chat_manager
+        if not (
+            room_manager.dirty_rooms
+            or room_manager.deleted_rooms
+            or chat_manager.unsaved
+            or chat_manager.deleted_chats
+        ):
+            return None
+
+        rooms = room_manager.rooms
+        batch = StateBatch(
+            rooms=[
+                rooms[room_id].to_record()
+                for room_id in room_manager.dirty_rooms
+                if room_id in rooms
+            ],
+            deleted_rooms=list(room_manager.deleted_rooms),
+            messages=[
+                message.to_record()
+                for pending in chat_manager.unsaved.values()
+                for message in pending
+            ],
+            deleted_chats=list(chat_manager.deleted_chats),
+            history_limit=chat_manager.max_history,
+        )
+        room_manager.dirty_rooms.clear()
+        room_manager.deleted_rooms.clear()
+        chat_manager.unsaved.clear()
+        chat_manager.deleted_chats.clear()
+        return batch
+
+    async def flush(self):
+        """Écrit les modifications en attente dans le stockage."""
+        batch = self.collect()
+        async with self._lock:
+            if batch is not None:
+                self._failed.append(batch)
+            while self._failed:
+                try:
+                    await asyncio.to_thread(self.store.write, self._failed[0])
+                except Exception as e:
+                    print(f"Persistance: échec de l'écriture ({e}), nouvel essai plus tard")
+                    return
+                self._failed.pop(0)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def start(self):
+        """Lance l'écriture périodique."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Arrête l'écriture périodique, écrit les dernières modifications et ferme le stockage."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        await asyncio.to_thread(self.store.close)
+
+
+def create_state_store(kind: str, path: str = None) -> Optional[StateStore]:
+    """Crée le stockage configuré ("none", "memory" ou "sqlite")."""
+    if kind == "memory":
+        return InMemoryStateStore()
+    if kind == "sqlite":
+        return SQLiteStateStore(path)
+    return None
@@ -1,36 +1,168 @@
-from typing import Dict, Optional, List
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional, List, Set, Tuple
 from fastapi import WebSocket
 
+from app.config import settings
+from app.managers.backplane import Backplane
+from app.managers.scheduler import Timer, TimerScheduler, scheduler as shared_scheduler
+from app.utils.binary_protocol import SUBPROTOCOL, BinaryCodec, pack_batch
+from app.utils.events import encode_batch, encode_event
+from app.utils.metrics import (
+    broadcast_recipients,
+    broadcast_seconds,
+    spectator_fan_out_seconds,
+    ws_batch_size,
+    ws_frames_sent,
+    ws_send_failures,
+)
+
+# Métriques liées une fois pour toutes (pas de formatage de labels par événement)
+_broadcast_recipients = broadcast_recipients.labels()
+_broadcast_seconds = broadcast_seconds.labels()
+_send_timeouts = ws_send_failures.labels("timeout")
+_send_errors = ws_send_failures.labels("error")
+_queue_overflows = ws_send_failures.labels("queue_full")
+_frames_sent = ws_frames_sent.labels()
+_batch_size = ws_batch_size.labels()
+_spectator_fan_out = spectator_fan_out_seconds.labels()
+
+# Rôle servi par le tier des spectateurs (voir deliver_local)
+SPECTATOR = "spectator"
+
 
 class ConnectionManager:
-    def __init__(self):
-        # Structure: {client_id: {"connection": WebSocket, "room_id": str, "role": str}}
+    def __init__(
+        self,
+        max_queue_size: int = 256,
+        send_timeout: float = 5.0,
+        flush_interval: float = 0.0,
+        scheduler: Optional[TimerScheduler] = None,
+        spectator_interval: float = 0.25,
+        spectator_max_batch: int = 64,
+        fan_out_chunk: int = 64,
+    ):
+        # Structure: {client_id: {"connection": WebSocket, "room_id": str, "role": str,
+        #                         "queue": asyncio.Queue, "writer": asyncio.Task,
+        #                         "rtt": float | None, "ping_id": int | None,
+        #                         "ping": str | None, "ping_sent": float | None,
+        #                         "last_seen": float, "binary": bool,
+        #                         "pending": list}}
         self.active_connections: Dict[str, dict] = {}
+        # Index secondaire: {room_id: {role: {client_id}}}
+        # Permet de cibler une room sans parcourir toutes les connexions.
+        self.room_index: Dict[str, Dict[str, Set[str]]] = {}
+        # Taille max de la file d'envoi d'un client avant éviction
+        self.max_queue_size = max_queue_size
+        # Délai max (secondes) pour qu'un envoi aboutisse avant éviction
+        self.send_timeout = send_timeout
+        # Callback appelé après l'éviction d'un client lent: (client_id, room_id)
+        self.on_evict: Optional[Callable[[str, str], Awaitable[None]]] = None
+        # Références fortes vers les tâches d'éviction en cours
+        self._eviction_tasks: Set[asyncio.Task] = set()
+        # Backplane optionnel pour diffuser aux clients des autres workers
+        self.backplane: Optional[Backplane] = None
+        # Clients des rooms de ce worker connectés à un autre worker (voir
+        # room_directory): {client_id: {"room_id": str, "role": str,
+        #                               "worker": adresse, "rtt": float | None}}
+        self.remote_clients: Dict[str, dict] = {}
+        # Index secondaire: {room_id: {client_id}}
+        self.remote_index: Dict[str, Set[str]] = {}
+        # Mesure du RTT par ping/pong applicatif (moyenne mobile exponentielle)
+        self.rtt_smoothing = 0.2
+        self._ping_id = 0
+        self._ping_task: Optional[asyncio.Task] = None
+        # Trames MessagePack des clients qui ont négocié le protocole binaire
+        self.codec = BinaryCodec()
+        # Regroupement des événements non urgents (0 = chaque événement part seul):
+        # ils attendent dans data["pending"] et partent en une trame par client
+        # flush_interval secondes après le premier événement en attente de la room
+        self.flush_interval = flush_interval
+        self.scheduler = scheduler or shared_scheduler
+        # Rooms dont un envoi groupé est programmé: {room_id: minuterie}
+        self._flush_timers: Dict[str, Timer] = {}
+        # Tier des spectateurs: les événements d'une room s'accumulent et partent
+        # en une seule trame, la même pour tous ses spectateurs, toutes les
+        # spectator_interval secondes au plus. Au-delà de spectator_max_batch
+        # événements, l'état complet (spectator_snapshot) les remplace
+        self.spectator_interval = spectator_interval
+        self.spectator_max_batch = spectator_max_batch
+        # Spectateurs servis entre deux passages de la boucle d'événements
+        self.fan_out_chunk = fan_out_chunk
+        self._spectator_pending: Dict[str, List[str]] = {}
+        self._spectator_timers: Dict[str, Timer] = {}
+        # Callback: room_id -> état complet encodé (room_state), ou None
+        self.spectator_snapshot: Optional[Callable[[str], Optional[str]]] = None
+
+    async def start_backplane(self, backplane: Backplane):
+        """Branche un backplane: les diffusions seront aussi publiées aux autres workers."""
+        await backplane.start(self.deliver_local)
+        self.backplane = backplane
+
+    async def stop_backplane(self):
+        """Débranche et ferme le backplane."""
+        if self.backplane is not None:
+            backplane, self.backplane = self.backplane, None
+            await backplane.close()
 
     async def connect(
-        self, websocket: WebSocket, client_id: str, room_id: str, role: str = "player"
+        self,
+        websocket: WebSocket,
+        client_id: str,
+        room_id: str,
+        role: str = "player",
+        subprotocol: Optional[str] = None,
     ) -> bool:
         """
         Établit une connexion WebSocket avec un client.
 
+        Chaque connexion reçoit une file d'envoi bornée vidée par sa propre tâche
+        d'écriture, pour qu'un client lent ne bloque pas les autres.
+
         Args:
             websocket: La connexion WebSocket
             client_id: L'identifiant unique du client
             room_id: L'identifiant de la room associée
             role: Le rôle du client ("host", "player", "spectator")
+            subprotocol: Sous-protocole négocié (SUBPROTOCOL: trames MessagePack)
 
         Returns:
             bool: True si la connexion a été établie avec succès
         """
         try:
-            await websocket.accept()
+            if subprotocol is None:
+                await websocket.accept()
+            else:
+                await websocket.accept(subprotocol=subprotocol)
+
+            # Si le client était déjà connecté (reconnexion), fermer l'ancienne entrée
+            if client_id in self.active_connections:
+                self.disconnect(client_id)
+            self.remove_remote(client_id)
 
             # Enregistrer la connexion
-            self.active_connections[client_id] = {
+            data = self.active_connections[client_id] = {
                 "connection": websocket,
                 "room_id": room_id,
                 "role": role,
+                "queue": asyncio.Queue(maxsize=self.max_queue_size),
+                "rtt": None,
+                "ping_id": None,
+                "ping": None,
+                "ping_sent": None,
+                "last_seen": time.monotonic(),  # Dernier message reçu (heartbeat)
+                "binary": subprotocol == SUBPROTOCOL,
+                "pending": [],  # Événements non urgents en attente du prochain envoi groupé
             }
+            data["writer"] = asyncio.create_task(self._writer(client_id, data))
+            self.room_index.setdefault(room_id, {}).setdefault(role, set()).add(
+                client_id
+            )
+            if data["binary"]:
+                # IDs de joueurs déjà numérotés dans la room
+                hello = self.codec.hello(room_id)
+                if hello is not None:
+                    self._enqueue(client_id, data, hello)
 
             return True
         except Exception as e:
@@ -48,11 +180,294 @@ class ConnectionManager:
             Optional[str]: L'ID de la room à laquelle le client était connecté, ou None
         """
         if client_id in self.active_connections:
-            room_id = self.active_connections[client_id]["room_id"]
-            del self.active_connections[client_id]
+            room_id = self._unindex(client_id)
+            data = self.active_connections.pop(client_id)
+            data["writer"].cancel()
             return room_id
         return None
 
+    def add_remote(self, client_id: str, room_id: str, role: str, worker: str):
+        """
+        Enregistre un client d'une room de ce worker connecté au worker
+        d'adresse worker: ses messages personnels lui sont transmis par le
+        backplane, et il compte parmi les clients de la room.
+        """
+        if client_id in self.active_connections:
+            self.disconnect(client_id)  # Reconnecté sur un autre worker
+        self.remove_remote(client_id)
+        self.remote_clients[client_id] = {
+            "room_id": room_id,
+            "role": role,
+            "worker": worker,
+            "rtt": None,  # Mesuré par son worker, transmis avec ses actions
+        }
+        self.remote_index.setdefault(room_id, set()).add(client_id)
+
+    def remove_remote(self, client_id: str, worker: str = None) -> Optional[str]:
+        """
+        Oublie un client distant (seulement s'il passe par ce worker, si
+        worker est donné). Retourne l'ID de sa room, None s'il n'était pas là.
+        """
+        data = self.remote_clients.get(client_id)
+        if data is None or (worker is not None and data["worker"] != worker):
+            return None
+        del self.remote_clients[client_id]
+        room_id = data["room_id"]
+        clients = self.remote_index.get(room_id)
+        if clients is not None:
+            clients.discard(client_id)
+            if not clients:
+                del self.remote_index[room_id]
+        return room_id
+
+    def remove_worker(self, worker: str) -> List[Tuple[str, str]]:
+        """Worker perdu: oublie ses clients distants. Retourne leurs (client_id, room_id)."""
+        clients = [
+            (client_id, data["room_id"])
+            for client_id, data in self.remote_clients.items()
+            if data["worker"] == worker
+        ]
+        for client_id, _ in clients:
+            self.remove_remote(client_id)
+        return clients
+
+    def _unindex(self, client_id: str) -> str:
+        """Retire un client de l'index des rooms et retourne l'ID de sa room."""
+        data = self.active_connections[client_id]
+        room_id, role = data["room_id"], data["role"]
+        roles = self.room_index.get(room_id)
+        if roles is not None:
+            clients = roles.get(role)
+            if clients is not None:
+                clients.discard(client_id)
+                if not clients:
+                    del roles[role]
+            if not roles:
+                del self.room_index[room_id]
+                self.codec.forget(room_id)
+        return room_id
+
+    async def _writer(self, client_id: str, data: dict):
+        """Vide la file d'envoi d'un client; évince le client si un envoi échoue ou traîne."""
+        websocket, queue = data["connection"], data["queue"]
+        while True:
+            message = await queue.get()
+            _frames_sent.inc()
+            try:
+                async with asyncio.timeout(self.send_timeout):
+                    if type(message) is bytes:
+                        await websocket.send_bytes(message)
+                    else:
+                        await websocket.send_text(message)
+                # Le ping est horodaté à l'envoi effectif, pas à la mise en file:
+                # l'attente dans la file ne compte pas dans le RTT
+                if message is data["ping"]:
+                    data["ping_sent"] = time.monotonic()
+            except TimeoutError:
+                _send_timeouts.inc()
+                self.schedule_eviction(client_id, websocket, "envoi trop lent")
+                return
+            except Exception as e:
+                _send_errors.inc()
+                self.schedule_eviction(client_id, websocket, f"erreur d'envoi: {e}")
+                return
+
+    def _send(self, client_id: str, data: dict, message, urgent: bool) -> bool:
+        """
+        Envoie un message à un client: tout de suite s'il est urgent (buzz,
+        réponses, manches) ou si le regroupement est désactivé, sinon au
+        prochain envoi groupé de sa room. Un message urgent part après les
+        messages déjà en attente du client: l'ordre des événements est gardé.
+        """
+        pending = data["pending"]
+        # Les spectateurs n'ont pas d'envoi groupé propre: seuls leurs messages
+        # personnels (état initial, réponses) passent ici
+        if urgent or not self.flush_interval or data["role"] == SPECTATOR:
+            if pending:
+                self._flush_client(client_id, data)
+            return self._enqueue(client_id, data, message)
+
+        pending.append(message)
+        if len(pending) >= self.max_queue_size:
+            # Rafale: inutile d'attendre la fin de l'intervalle
+            self._flush_client(client_id, data)
+        elif data["room_id"] not in self._flush_timers:
+            room_id = data["room_id"]
+            self._flush_timers[room_id] = self.scheduler.schedule(
+                self.flush_interval, self._flush_room, room_id
+            )
+        return True
+
+    def _flush_client(self, client_id: str, data: dict, batches: Optional[dict] = None):
+        """
+        Envoie en une trame les messages en attente d'un client. batches
+        partage les trames déjà assemblées entre les clients d'une room qui
+        attendent les mêmes messages (cas général d'une diffusion).
+        """
+        pending = data["pending"]
+        if not pending:
+            return
+        data["pending"] = []
+        if len(pending) == 1:
+            self._enqueue(client_id, data, pending[0])
+            return
+        key = tuple(pending)
+        frame = batches.get(key) if batches is not None else None
+        if frame is None:
+            frame = pack_batch(pending) if data["binary"] else encode_batch(pending)
+            if batches is not None:
+                batches[key] = frame
+        _batch_size.observe(len(pending))
+        self._enqueue(client_id, data, frame)
+
+    def _flush_room(self, room_id: str):
+        """Envoi groupé d'une room: une trame par client qui a des messages en attente."""
+        self._flush_timers.pop(room_id, None)
+        batches: dict = {}
+        for client_id in self._direct_clients(room_id, None):
+            data = self.active_connections.get(client_id)
+            if data is not None and data["pending"]:
+                self._flush_client(client_id, data, batches)
+
+    def _enqueue(self, client_id: str, data: dict, message: str) -> bool:
+        """Place un message dans la file d'un client; évince le client si elle déborde."""
+        try:
+            data["queue"].put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            _queue_overflows.inc()
+            self.schedule_eviction(client_id, data["connection"], "file d'envoi pleine")
+            return False
+
+    def _binary_frame(self, room_id: str, message: str, urgent: bool) -> bytes:
+        """
+        Trame binaire d'un événement pour les clients MessagePack d'une room.
+        Les IDs de joueurs qu'elle numérote pour la première fois sont d'abord
+        annoncés à tous les clients binaires de la room.
+        """
+        frame, ids_frame = self.codec.encode(room_id, message)
+        if ids_frame is not None:
+            # Spectateurs compris, tout de suite: la table des IDs doit précéder
+            # leur prochaine trame
+            for client_id in self.get_clients_in_room(room_id):
+                data = self.active_connections.get(client_id)
+                if data is not None and data["binary"]:
+                    self._send(client_id, data, ids_frame, urgent)
+        return frame
+
+    def _send_ping(self, client_id: str, data: dict, ping_id: int, frame):
+        """Met un ping en file; le pong d'un ping précédent sera ignoré."""
+        data["ping_id"] = ping_id
+        data["ping"] = frame
+        data["ping_sent"] = None
+        # Jamais regroupé: le RTT mesuré ne doit pas inclure l'attente de l'envoi groupé
+        self._send(client_id, data, frame, urgent=True)
+
+    def ping(self, client_id: str) -> bool:
+        """Envoie un ping à un client (ex: juste après la connexion)."""
+        data = self.active_connections.get(client_id)
+        if data is None:
+            return False
+        self._ping_id += 1
+        frame = encode_event("ping", id=self._ping_id)
+        if data["binary"]:
+            frame = self.codec.encode(None, frame)[0]
+        self._send_ping(client_id, data, self._ping_id, frame)
+        return True
+
+    def ping_all(self) -> int:
+        """Envoie un ping à tous les clients de ce worker. Retourne le nombre de clients."""
+        self._ping_id += 1
+        frame = encode_event("ping", id=self._ping_id)
+        binary = None
+        for client_id, data in list(self.active_connections.items()):
+            if data["binary"]:
+                if binary is None:
+                    binary = self.codec.encode(None, frame)[0]
+                self._send_ping(client_id, data, self._ping_id, binary)
+            else:
+                self._send_ping(client_id, data, self._ping_id, frame)
+        return len(self.active_connections)
+
+    def record_pong(self, client_id: str, ping_id: int) -> Optional[float]:
+        """
+        Enregistre la réponse d'un client à un ping et retourne son RTT lissé
+        (secondes), ou None si le pong ne correspond pas au dernier ping envoyé.
+        """
+        data = self.active_connections.get(client_id)
+        if data is None or data["ping_id"] != ping_id or data["ping_sent"] is None:
+            return None
+        now = time.monotonic()
+        sample = now - data["ping_sent"]
+        data["ping_sent"] = None
+        data["last_seen"] = now
+        rtt = data["rtt"]
+        data["rtt"] = sample if rtt is None else rtt + self.rtt_smoothing * (sample - rtt)
+        return data["rtt"]
+
+    def touch(self, client_id: str, now: float):
+        """Note qu'un message vient d'être reçu du client (il est vivant)."""
+        data = self.active_connections.get(client_id)
+        if data is not None:
+            data["last_seen"] = now
+
+    def get_rtt(self, client_id: str) -> Optional[float]:
+        """RTT lissé d'un client (secondes), None tant qu'aucun pong n'a été reçu."""
+        data = self.active_connections.get(client_id) or self.remote_clients.get(client_id)
+        return data["rtt"] if data is not None else None
+
+    async def _ping_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.ping_all()
+
+    def start_pings(self, interval: float):
+        """Lance l'envoi périodique des pings."""
+        if self._ping_task is None:
+            self._ping_task = asyncio.create_task(self._ping_loop(interval))
+
+    async def stop_pings(self):
+        if self._ping_task is not None:
+            self._ping_task.cancel()
+            try:
+                await self._ping_task
+            except asyncio.CancelledError:
+                pass
+            self._ping_task = None
+
+    def schedule_eviction(self, client_id: str, websocket: WebSocket, reason: str):
+        """Lance l'éviction d'un client dans une tâche séparée (sans attendre la fermeture)."""
+        task = asyncio.create_task(self.evict(client_id, websocket, reason))
+        self._eviction_tasks.add(task)
+        task.add_done_callback(self._eviction_tasks.discard)
+
+    async def evict(self, client_id: str, websocket: WebSocket, reason: str):
+        """
+        Déconnecte de force un client lent ou en erreur.
+
+        Le client est retiré du manager, sa socket est fermée, puis `on_evict`
+        est appelé pour suivre le chemin normal de déconnexion (player_disconnected).
+
+        Args:
+            client_id: L'ID du client à évincer
+            websocket: La connexion concernée (ignorée si le client s'est reconnecté entre-temps)
+            reason: La raison de l'éviction
+        """
+        if self.get_connection(client_id) is not websocket:
+            return
+
+        print(f"Client {client_id} évincé: {reason}")
+        room_id = self.disconnect(client_id)
+
+        try:
+            async with asyncio.timeout(self.send_timeout):
+                await websocket.close(code=1008, reason=reason)
+        except Exception:
+            pass
+
+        if self.on_evict is not None:
+            await self.on_evict(client_id, room_id)
+
     def get_connection(self, client_id: str) -> Optional[WebSocket]:
         """Récupère la connexion WebSocket d'un client."""
         if client_id in self.active_connections:
@@ -73,68 +488,88 @@ class ConnectionManager:
 
     def get_clients_in_room(self, room_id: str) -> List[str]:
         """Récupère la liste des IDs clients dans une room."""
-        return [
-            client_id
-            for client_id, data in self.active_connections.items()
-            if data["room_id"] == room_id
-        ]
+        roles = self.room_index.get(room_id)
+        if not roles:
+            return []
+        return [client_id for clients in roles.values() for client_id in clients]
 
     def get_clients_by_role(self, room_id: str, role: str) -> List[str]:
         """Récupère la liste des IDs clients dans une room par rôle."""
-        return [
-            client_id
-            for client_id, data in self.active_connections.items()
-            if data["room_id"] == room_id and data["role"] == role
-        ]
+        roles = self.room_index.get(room_id)
+        if not roles:
+            return []
+        return list(roles.get(role, ()))
 
-    async def send_personal_message(self, message: str, client_id: str) -> bool:
+    async def send_personal_message(
+        self, message: str, client_id: str, urgent: bool = False
+    ) -> bool:
         """
         Envoie un message à un client spécifique.
 
         Args:
             message: Le message à envoyer
             client_id: L'ID du client destinataire
+            urgent: Envoyer sans attendre le prochain envoi groupé
 
         Returns:
-            bool: True si le message a été envoyé avec succès
+            bool: True si le message a été mis en file d'envoi (ou transmis au
+                worker du client, pour un client distant)
         """
-        connection = self.get_connection(client_id)
-        if connection:
-            try:
-                await connection.send_text(message)
-                return True
-            except Exception as e:
-                print(f"Erreur lors de l'envoi du message à {client_id}: {e}")
-        return False
+        data = self.active_connections.get(client_id)
+        if data is None:
+            remote = self.remote_clients.get(client_id)
+            if remote is None or self.backplane is None:
+                return False
+            await self.backplane.send(
+                remote["worker"],
+                {
+                    "type": "personal",
+                    "worker": self.backplane.address,
+                    "client": client_id,
+                    "message": message,
+                    "urgent": urgent,
+                },
+            )
+            return True
+        if data["binary"]:
+            message = self._binary_frame(data["room_id"], message, urgent)
+        return self._send(client_id, data, message, urgent)
 
     async def broadcast_to_room(
-        self, message: str, room_id: str, exclude_client: str = None
+        self,
+        message: str,
+        room_id: str,
+        exclude_client: str = None,
+        urgent: bool = False,
     ) -> int:
         """
         Diffuse un message à tous les clients dans une room.
 
+        Le message est seulement mis en file pour chaque client: la diffusion
+        ne dépend pas de la vitesse du client le plus lent. Si un backplane est
+        branché, le message est aussi publié aux autres workers.
+
         Args:
             message: Le message à diffuser
             room_id: L'ID de la room
             exclude_client: ID du client à exclure (optionnel)
+            urgent: Envoyer sans attendre le prochain envoi groupé (buzz, réponses)
 
         Returns:
-            int: Nombre de clients qui ont reçu le message
+            int: Nombre de clients locaux pour lesquels le message a été mis en file
         """
-        count = 0
-        for client_id, data in self.active_connections.items():
-            if data["room_id"] == room_id and (
-                exclude_client is None or client_id != exclude_client
-            ):
-                try:
-                    await data["connection"].send_text(message)
-                    count += 1
-                except Exception as e:
-                    print(f"Erreur lors de la diffusion à {client_id}: {e}")
+        count = self.deliver_local(room_id, None, exclude_client, message, urgent)
+        if self.backplane is not None:
+            await self.backplane.publish(room_id, None, exclude_client, message, urgent)
         return count
 
     async def broadcast_to_role(
-        self, message: str, room_id: str, role: str, exclude_client: str = None
+        self,
+        message: str,
+        room_id: str,
+        role: str,
+        exclude_client: str = None,
+        urgent: bool = False,
     ) -> int:
         """
         Diffuse un message à tous les clients d'un rôle spécifique dans une room.
@@ -144,27 +579,145 @@ class ConnectionManager:
             room_id: L'ID de la room
             role: Le rôle ciblé ("host", "player", "spectator")
             exclude_client: ID du client à exclure (optionnel)
+            urgent: Envoyer sans attendre le prochain envoi groupé
 
         Returns:
-            int: Nombre de clients qui ont reçu le message
+            int: Nombre de clients locaux pour lesquels le message a été mis en file
         """
+        count = self.deliver_local(room_id, role, exclude_client, message, urgent)
+        if self.backplane is not None:
+            await self.backplane.publish(room_id, role, exclude_client, message, urgent)
+        return count
+
+    def deliver_local(
+        self,
+        room_id: str,
+        role: Optional[str],
+        exclude_client: Optional[str],
+        message: str,
+        urgent: bool = False,
+    ) -> int:
+        """
+        Met un message en file pour les clients de ce worker dans une room
+        (tous les rôles si role est None). Appelé aussi par le backplane pour
+        les messages publiés par les autres workers.
+
+        Joueurs et hôte sont servis d'abord, directement. Les spectateurs ne
+        coûtent ici qu'un ajout à la liste d'attente de leur tier, quel que
+        soit leur nombre: l'envoi leur est fait plus tard (_flush_spectators).
+        exclude_client ne concerne que les clients servis directement (les
+        spectateurs n'envoient pas d'événements diffusés).
+
+        Returns:
+            int: Nombre de clients locaux pour lesquels le message a été mis en file
+        """
+        started = time.perf_counter()
+        client_ids = self._direct_clients(room_id, role)
+
         count = 0
-        for client_id, data in self.active_connections.items():
-            if (
-                data["room_id"] == room_id
-                and data["role"] == role
-                and (exclude_client is None or client_id != exclude_client)
-            ):
-                try:
-                    await data["connection"].send_text(message)
-                    count += 1
-                except Exception as e:
-                    print(f"Erreur lors de la diffusion à {client_id}: {e}")
+        binary = None  # Trame binaire, transcodée au premier client MessagePack
+        for client_id in client_ids:
+            if client_id == exclude_client:
+                continue
+            data = self.active_connections.get(client_id)
+            if data is None:
+                continue
+            frame = message
+            if data["binary"]:
+                if binary is None:
+                    binary = self._binary_frame(room_id, message, urgent)
+                frame = binary
+            if self._send(client_id, data, frame, urgent):
+                count += 1
+
+        if role is None or role == SPECTATOR:
+            count += self._queue_for_spectators(room_id, message)
+
+        _broadcast_recipients.observe(count)
+        _broadcast_seconds.observe(time.perf_counter() - started)
         return count
 
+    def _direct_clients(self, room_id: str, role: Optional[str]) -> List[str]:
+        """Clients d'une room servis directement: tous les rôles sauf les spectateurs."""
+        roles = self.room_index.get(room_id)
+        if not roles or role == SPECTATOR:
+            return []
+        if role is not None:
+            return list(roles.get(role, ()))
+        return [
+            client_id
+            for client_role, clients in roles.items()
+            if client_role != SPECTATOR
+            for client_id in clients
+        ]
+
+    # --- Tier des spectateurs ---
+
+    def _queue_for_spectators(self, room_id: str, message: str) -> int:
+        """
+        Met un événement de côté pour les spectateurs de la room et programme
+        leur prochain envoi. Retourne le nombre de spectateurs concernés.
+        """
+        roles = self.room_index.get(room_id)
+        spectators = roles.get(SPECTATOR) if roles else None
+        if not spectators:
+            return 0
+        pending = self._spectator_pending.setdefault(room_id, [])
+        # Lot déjà trop long: il sera remplacé par l'état complet, inutile de
+        # garder la suite
+        if len(pending) <= self.spectator_max_batch or self.spectator_snapshot is None:
+            pending.append(message)
+        if room_id not in self._spectator_timers:
+            self._spectator_timers[room_id] = self.scheduler.schedule(
+                self.spectator_interval, self._flush_spectators, room_id
+            )
+        return len(spectators)
+
+    async def _flush_spectators(self, room_id: str):
+        """
+        Envoie aux spectateurs d'une room les événements accumulés, en une
+        trame encodée une fois. Les spectateurs sont servis par paquets de
+        fan_out_chunk, en rendant la main à la boucle entre deux paquets: un
+        buzz reçu pendant l'envoi est traité (et diffusé aux joueurs) sans
+        attendre la fin.
+        """
+        self._spectator_timers.pop(room_id, None)
+        pending = self._spectator_pending.pop(room_id, None)
+        spectators = self.get_clients_by_role(room_id, SPECTATOR)
+        if not pending or not spectators:
+            return
+        started = time.perf_counter()
+        if len(pending) > self.spectator_max_batch and self.spectator_snapshot is not None:
+            snapshot = self.spectator_snapshot(room_id)
+            if snapshot is not None:
+                pending = [snapshot]
+        if len(pending) > 1:
+            _batch_size.observe(len(pending))
+        text = pending[0] if len(pending) == 1 else encode_batch(pending)
+        binary = None
+
+        for index, client_id in enumerate(spectators):
+            if index and index % self.fan_out_chunk == 0:
+                await asyncio.sleep(0)
+            data = self.active_connections.get(client_id)
+            if data is None or data["role"] != SPECTATOR:
+                continue  # Parti pendant l'envoi
+            if data["binary"]:
+                if binary is None:
+                    frames = [self._binary_frame(room_id, message, False) for message in pending]
+                    binary = frames[0] if len(frames) == 1 else pack_batch(frames)
+                self._enqueue(client_id, data, binary)
+            else:
+                self._enqueue(client_id, data, text)
+        _spectator_fan_out.observe(time.perf_counter() - started)
+
     def count_clients_in_room(self, room_id: str) -> int:
-        """Compte le nombre de clients dans une room."""
-        return len(self.get_clients_in_room(room_id))
+        """Compte le nombre de clients dans une room (clients distants compris)."""
+        remote = len(self.remote_index.get(room_id, ()))
+        roles = self.room_index.get(room_id)
+        if not roles:
+            return remote
+        return remote + sum(len(clients) for clients in roles.values())
 
     def is_room_empty(self, room_id: str) -> bool:
         """Vérifie si une room est vide."""
@@ -172,4 +725,9 @@ class ConnectionManager:
 
 
 # Instance globale du gestionnaire de connexions
-connection_manager = ConnectionManager()
+connection_manager = ConnectionManager(
+    flush_interval=settings.WS_FLUSH_INTERVAL,
+    spectator_interval=settings.SPECTATOR_INTERVAL,
+    spectator_max_batch=settings.SPECTATOR_MAX_BATCH,
+    fan_out_chunk=settings.SPECTATOR_FAN_OUT_CHUNK,
+)
@@ -0,0 +1,96 @@
+from typing import Annotated, Dict, Literal, Optional, Union, get_args
+
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    StrictBool,
+    StrictFloat,
+    StrictInt,
+    StrictStr,
+    TypeAdapter,
+)
+
+# Taille max d'un message de chat (caractères)
+MAX_CHAT_LENGTH = 2000
+# Nombre max d'événements dans une trame (tableau JSON)
+MAX_BATCH_SIZE = 32
+
+
+class ClientMessage(BaseModel):
+    """Base des messages envoyés par les clients: les champs inconnus sont ignorés."""
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class BuzzMessage(ClientMessage):
+    type: Literal["buzz"]
+
+
+class PongMessage(ClientMessage):
+    """Réponse à un ping du serveur (mesure du RTT)."""
+
+    type: Literal["pong"]
+    id: StrictInt
+
+
+class ChatMessageIn(ClientMessage):
+    type: Literal["chat_message"]
+    content: StrictStr = Field(default="", max_length=MAX_CHAT_LENGTH)
+
+
+class GetRoomStateMessage(ClientMessage):
+    type: Literal["get_room_state"]
+
+
+class GetPlayerListMessage(ClientMessage):
+    type: Literal["get_player_list"]
+
+
+class ConfigUpdateMessage(ClientMessage):
+    """
+    Mise à jour partielle de la configuration de la room.
+    Les valeurs sont des scalaires JSON (durées en texte, booléens...); null
+    supprime la clé.
+    spotify_token (access token de l'hôte) sert à préparer les manches de la
+    playlist choisie; il n'est ni diffusé ni enregistré dans la config.
+    """
+
+    type: Literal["config_update"]
+    config: Dict[
+        Annotated[str, Field(max_length=64)],
+        Union[StrictBool, StrictInt, StrictFloat, Annotated[str, Field(max_length=256)], None],
+    ] = Field(default_factory=dict, max_length=32)
+    spotify_token: Optional[Annotated[str, Field(max_length=2048)]] = None
+
+
+class StartGameMessage(ClientMessage):
+    type: Literal["start_game"]
+
+
+class ValidateAnswerMessage(ClientMessage):
+    type: Literal["validate_answer"]
+    is_correct: StrictBool = False
+
+
+# Modèles des messages acceptés, un par valeur de "type"
+MESSAGE_MODELS = (
+    BuzzMessage,
+    PongMessage,
+    ChatMessageIn,
+    GetRoomStateMessage,
+    GetPlayerListMessage,
+    ConfigUpdateMessage,
+    StartGameMessage,
+    ValidateAnswerMessage,
+)
+MESSAGE_TYPES = tuple(
+    get_args(model.model_fields["type"].annotation)[0] for model in MESSAGE_MODELS
+)
+
+# Union discriminée par "type": pydantic choisit le modèle par le tag, sans
+# essayer les modèles un par un
+IncomingMessage = Annotated[Union[MESSAGE_MODELS], Field(discriminator="type")]
+
+# Validateur compilé une seule fois, à l'import
+incoming_message_adapter: TypeAdapter = TypeAdapter(IncomingMessage)
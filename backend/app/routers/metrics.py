@@ -0,0 +1,44 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.managers.chat_manager import chat_manager
+from app.managers.room_manager import room_manager
+from app.managers.ws_manager import connection_manager
+from app.utils.metrics import (
+    active_connections,
+    active_players,
+    active_rooms,
+    chat_histories,
+    chat_history_max,
+    chat_messages,
+    registry,
+)
+
+router = APIRouter()
+
+# Jauges calculées à la lecture de /metrics (rien à maintenir sur le chemin critique)
+_active_rooms = active_rooms.labels()
+_active_connections = active_connections.labels()
+_active_players = active_players.labels()
+_chat_histories = chat_histories.labels()
+_chat_messages = chat_messages.labels()
+_chat_history_max = chat_history_max.labels()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Métriques de l'application au format texte Prometheus.
+    """
+    _active_rooms.set(len(room_manager.rooms))
+    _active_connections.set(len(connection_manager.active_connections))
+    _active_players.set(sum(len(room.players) for room in room_manager.rooms.values()))
+
+    sizes = [len(history) for history in chat_manager.messages.values()]
+    _chat_histories.set(len(sizes))
+    _chat_messages.set(sum(sizes))
+    _chat_history_max.set(max(sizes, default=0))
+
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
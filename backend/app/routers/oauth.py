@@ -5,9 +5,29 @@ from app.config import settings
 from app.models.spotify import RefreshTokenRequest, TokenResponse
 from urllib.parse import urlencode
 from app.utils.spotify_requests import post_request_helper
+from app.utils.token_cache import TokenCache
 
 router = APIRouter()
 
+# Access tokens obtenus par refresh token, partagés entre les rafraîchissements simultanés
+token_cache = TokenCache(
+    margin=settings.SPOTIFY_TOKEN_REFRESH_MARGIN,
+    max_entries=settings.SPOTIFY_TOKEN_CACHE_MAX_ENTRIES,
+)
+
+
+def basic_auth_header() -> str:
+    """En-tête d'autorisation Basic de l'application (client_id:client_secret)."""
+    auth_str = f"{settings.CLIENT_ID}:{settings.CLIENT_SECRET}"
+    return f"Basic {b64encode(auth_str.encode()).decode()}"
+
+
+# Calculé une fois: les identifiants ne changent pas pendant la vie du processus
+REFRESH_HEADERS = {
+    "Content-Type": "application/x-www-form-urlencoded",
+    "Authorization": basic_auth_header(),
+}
+
 
 @router.get("/login")
 async def login():
@@ -70,7 +90,6 @@ async def spotify_callback(
     if not code:
         raise HTTPException(status_code=400, detail="No code provided")
 
-    token_url = "https://accounts.spotify.com/api/token"
     data = {
         "code": code,
         "grant_type": "authorization_code",
@@ -80,12 +99,8 @@ async def spotify_callback(
     }
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
-    result = await post_request_helper(token_url, data, headers)
-
-    if "error" in result:
-        raise HTTPException(status_code=400, detail=result["error"])
-
-    return result
+    # Lève une HTTPException avec le code adapté si l'échange échoue
+    return await post_request_helper(settings.token_url, data, headers)
 
     # c'est le front end qui va gerer l'auth et stocker les tokens
     # # besoin d'interagir avec 3 datas :
@@ -97,17 +112,20 @@ async def spotify_callback(
 
 @router.post("/refresh-token")
 async def refresh_token(refresh_token: RefreshTokenRequest):
-    token_url = "https://accounts.spotify.com/api/token"
+    """
+    Rafraîchit un access token Spotify.
 
-    # Création des données requises
+    Les demandes simultanées pour un même refresh token partagent un seul appel
+    à Spotify, et le token obtenu est resservi (expires_in recalculé) jusqu'à
+    peu avant son expiration.
+
+    Raises:
+        HTTPException: Code de Spotify pour un refresh token refusé (400, 401...),
+            502 si Spotify est injoignable ou en erreur
+    """
     data = {"grant_type": "refresh_token", "refresh_token": refresh_token.refresh_token}
 
-    # Création de l'en-tête d'autorisation Basic
-    auth_str = f"{settings.CLIENT_ID}:{settings.CLIENT_SECRET}"
-    b64_auth = b64encode(auth_str.encode()).decode()
-    headers = {
-        "Content-Type": "application/x-www-form-urlencoded",
-        "Authorization": f"Basic {b64_auth}",  # Ajout de l'autorisation Basic
-    }
+    async def fetch():
+        return await post_request_helper(settings.token_url, data, REFRESH_HEADERS)
 
-    return await post_request_helper(token_url, data, headers)
+    return await token_cache.get(refresh_token.refresh_token, fetch)
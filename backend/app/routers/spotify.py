@@ -1,8 +1,17 @@
-from fastapi import APIRouter, HTTPException, Request
-from app.utils.spotify_requests import get_request_helper
+from typing import AsyncIterator, List
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.config import settings
+from app.utils.events import dumps
+from app.utils.spotify_requests import get_request_helper, iter_pages, response_cache
 
 router = APIRouter()
 
+# Taille de page maximale acceptée par Spotify pour les tracks d'une playlist
+TRACKS_PAGE_SIZE = 100
+
 
 @router.get("/playlists")
 async def get_playlists(request: Request):
@@ -13,22 +22,79 @@ async def get_playlists(request: Request):
     if not access_token:
         raise HTTPException(status_code=401, detail="Token manquant")
 
-    playlist_url = "https://api.spotify.com/v1/me/playlists"
+    playlist_url = f"{settings.api_base_url}me/playlists"
     headers = {"Authorization": access_token}
 
-    return await get_request_helper(playlist_url, headers)
+    return await get_request_helper(playlist_url, headers, endpoint="playlists")
 
 
 @router.get("/playlists/{playlist_id}/tracks")
-async def get_playlist_tracks(playlist_id: str, request: Request):
+async def get_playlist_tracks(
+    playlist_id: str,
+    request: Request,
+    format: str = Query(default="json", pattern="^(json|ndjson)$"),
+):
     """
-    Récupère les chansons d'une playlist spécifique.
+    Récupère toutes les chansons d'une playlist spécifique.
+
+    Les pages sont téléchargées en parallèle et envoyées au client au fur et à
+    mesure, soit en JSON ({"total", "items": [...]}) streamé, soit en NDJSON
+    (un item par ligne) avec format=ndjson.
     """
     access_token = request.headers.get("Authorization")
     if not access_token:
         raise HTTPException(status_code=401, detail="Token manquant")
 
-    tracks_url = f"https://api.spotify.com/v1/playlists/{playlist_id}/tracks"
+    tracks_url = f"{settings.api_base_url}playlists/{playlist_id}/tracks"
     headers = {"Authorization": access_token}
 
-    return await get_request_helper(tracks_url, headers)
+    # La première page est récupérée avant de streamer pour que ses erreurs
+    # (token expiré, playlist inconnue...) donnent un vrai code HTTP
+    first_page = await get_request_helper(
+        f"{tracks_url}?offset=0&limit={TRACKS_PAGE_SIZE}",
+        headers,
+        endpoint="playlist_tracks",
+    )
+    pages = iter_pages(tracks_url, headers, first_page, endpoint="playlist_tracks")
+
+    if format == "ndjson":
+        return StreamingResponse(_stream_ndjson(pages), media_type="application/x-ndjson")
+    return StreamingResponse(
+        _stream_json(first_page.get("total", 0), pages), media_type="application/json"
+    )
+
+
+async def _stream_json(total: int, pages: AsyncIterator[List[dict]]):
+    """Streame {"total": ..., "items": [...]} page par page."""
+    yield f'{{"total":{total},"items":['
+    first = True
+    try:
+        async for items in pages:
+            if not items:
+                continue
+            chunk = dumps(items)[1:-1]
+            yield chunk if first else "," + chunk
+            first = False
+    except HTTPException as e:
+        # Le statut HTTP est déjà envoyé: on signale l'erreur dans le corps
+        yield f'],"error":{dumps(e.detail)}}}'
+        return
+    yield "]}"
+
+
+async def _stream_ndjson(pages: AsyncIterator[List[dict]]):
+    """Streame un item par ligne."""
+    try:
+        async for items in pages:
+            if items:
+                yield "\n".join(dumps(item) for item in items) + "\n"
+    except HTTPException as e:
+        yield dumps({"error": e.detail}) + "\n"
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Retourne les compteurs du cache des réponses Spotify (hits, misses, revalidations...).
+    """
+    return response_cache.stats()
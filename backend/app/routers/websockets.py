@@ -1,279 +1,954 @@
 # app/routes/ws_routes.py
-from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
-from app.managers.ws_manager import connection_manager
-from app.managers.room_manager import room_manager
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import StreamingResponse
+from app.config import settings
+from app.managers.backplane import Backplane
+from app.managers.ws_manager import SPECTATOR, connection_manager
+from app.managers.room_directory import room_directory
+from app.managers.room_manager import Room, room_manager
 from app.managers.chat_manager import chat_manager
-import json
+from app.managers.buzzer_manager import buzzer_manager
+from app.managers.game_loop import game_loop
+from app.managers.lobby import lobby
+from app.managers.playlist_prefetch import prefetcher
+from app.managers.scheduler import scheduler
+from app.managers.sessions import sessions
+from app.models.ws_messages import (
+    MAX_BATCH_SIZE,
+    MESSAGE_TYPES,
+    BuzzMessage,
+    ChatMessageIn,
+    ClientMessage,
+    ConfigUpdateMessage,
+    GetPlayerListMessage,
+    GetRoomStateMessage,
+    PongMessage,
+    StartGameMessage,
+    ValidateAnswerMessage,
+    incoming_message_adapter,
+)
+from app.utils.binary_protocol import SUBPROTOCOL, decode_client_frame, negotiate
+from app.utils.events import add_fields, encode_event, loads
+from app.utils.metrics import ws_message_seconds
+from pydantic import ValidationError
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+import time
 
 router = APIRouter()
 
+# Durée de traitement par type de message, liée une fois par type
+_message_timers = {
+    message_type: ws_message_seconds.labels(message_type)
+    for message_type in MESSAGE_TYPES
+}
+_invalid_timer = ws_message_seconds.labels("invalid")
+
+
+def room_event(room: Room, event_type: str, **fields) -> str:
+    """
+    Encode un événement en y joignant le delta d'état de la room, s'il y en a un.
+    Les clients appliquent delta.patch si leur version vaut delta.from_version,
+    sinon ils redemandent l'état complet avec get_room_state.
+    """
+    delta = room.pop_delta()
+    if delta is not None:
+        fields["delta"] = delta
+    return encode_event(event_type, **fields)
+
+
+def state_event(room: Room) -> str:
+    """
+    État complet de la room, avec le numéro du dernier événement diffusé et
+    l'epoch du journal: de quoi reprendre la session après une coupure.
+    """
+    return encode_event(
+        "room_state",
+        state=room.get_full_state_json(),
+        seq=room.events.seq,
+        epoch=room.events.epoch,
+    )
+
+
+async def broadcast_event(
+    room: Room,
+    message: str,
+    exclude_client: str = None,
+    urgent: bool = False,
+    personal: Optional[str] = None,
+) -> int:
+    """
+    Diffuse un événement à toute la room après l'avoir numéroté dans son
+    journal: un client qui se reconnecte pourra se le faire renvoyer.
+    personal est envoyé au client exclu à la place de l'événement (is_self...),
+    sous le même numéro.
+    Une diffusion compte comme activité de la room: une partie menée par le
+    serveur (manches, extraits) sans message des joueurs n'est pas inactive.
+    Les clients de la room connectés à d'autres workers reçoivent le même
+    événement (même delta, même numéro) par le backplane.
+    """
+    room_manager.touch(room, time.monotonic())
+    stamped = room.events.append(message, exclude_client, personal)
+    if personal is not None:
+        await connection_manager.send_personal_message(
+            room.events.stamp(personal), exclude_client, urgent
+        )
+    return await connection_manager.broadcast_to_room(
+        stamped, room.room_id, exclude_client, urgent
+    )
+
+
+class ClientContext:
+    """Client en cours de traitement, passé à chaque handler."""
+
+    __slots__ = (
+        "client_id",
+        "room_id",
+        "room",
+        "received_at",
+        "binary",
+        "spectator",
+        "owner",
+    )
+
+    def __init__(
+        self,
+        client_id: str,
+        room_id: str,
+        room: Optional[Room],
+        binary: bool = False,
+        spectator: bool = False,
+        owner: Optional[str] = None,
+    ):
+        self.client_id = client_id
+        self.room_id = room_id
+        self.room = room  # None si la room est sur un autre worker
+        self.received_at = 0.0  # Réception de la trame (time.monotonic)
+        self.binary = binary  # Protocole MessagePack négocié (trames binaires)
+        self.spectator = spectator  # Regarde seulement (SPECTATOR_MESSAGES)
+        self.owner = owner  # Adresse du worker de la room, s'il n'est pas celui-ci
+
+
+Handler = Callable[[ClientContext, ClientMessage], Awaitable[None]]
+
+# Registre des handlers par type de message: le coût du dispatch ne dépend pas
+# du nombre de types
+HANDLERS: Dict[str, Handler] = {}
+
+
+def handler(message_type: str):
+    """Enregistre le handler d'un type de message."""
+
+    def register(function: Handler) -> Handler:
+        HANDLERS[message_type] = function
+        return function
+
+    return register
+
+
+# Refus précalculés: le contenu fautif n'est jamais renvoyé au client
+ERROR_INVALID_JSON = encode_event("error", code="invalid_json")
+ERROR_BATCH_TOO_LARGE = encode_event("error", code="batch_too_large", max=MAX_BATCH_SIZE)
+# Erreurs de l'union discriminée quand le champ "type" manque ou est inconnu
+UNKNOWN_TYPE_ERRORS = ("union_tag_invalid", "union_tag_not_found")
+# Seuls messages acceptés d'un spectateur: il ne joue pas et ne parle pas
+SPECTATOR_MESSAGES = frozenset({"pong", "get_room_state", "get_player_list"})
+
+
+def _message_error(error: ValidationError, index: Optional[int]) -> str:
+    """Encode le refus d'un événement invalide (type inconnu ou champs invalides)."""
+    first = error.errors(include_url=False, include_context=False, include_input=False)[0]
+    code = "unknown_type" if first["type"] in UNKNOWN_TYPE_ERRORS else "invalid_message"
+    fields = {"code": code}
+    if code == "invalid_message":
+        fields["field"] = ".".join(str(part) for part in first["loc"][1:])
+    if index is not None:
+        fields["index"] = index
+    return encode_event("error", **fields)
+
+
+async def dispatch_frame(client: ClientContext, data: Union[str, bytes]):
+    """
+    Traite une trame: un événement JSON ou un tableau d'événements, traités
+    dans l'ordre (trame binaire MessagePack pour les clients qui ont négocié
+    le protocole binaire, voir app.utils.binary_protocol). Chaque événement est validé par l'union discriminée puis
+    passé au handler de son type; les événements invalides sont refusés un
+    par un sans interrompre le reste du tableau.
+    """
+    started = client.received_at
+    connection_manager.touch(client.client_id, started)
+    try:
+        if client.binary and isinstance(data, bytes):
+            payload = decode_client_frame(data)
+        else:
+            payload = loads(data)
+    except ValueError:
+        await connection_manager.send_personal_message(ERROR_INVALID_JSON, client.client_id)
+        _invalid_timer.observe(time.monotonic() - started)
+        return
+
+    if isinstance(payload, list):
+        if len(payload) > MAX_BATCH_SIZE:
+            await connection_manager.send_personal_message(
+                ERROR_BATCH_TOO_LARGE, client.client_id
+            )
+            _invalid_timer.observe(time.monotonic() - started)
+            return
+        events, batched = payload, True
+    else:
+        events, batched = (payload,), False
+
+    for index, event in enumerate(events):
+        try:
+            message = incoming_message_adapter.validate_python(event)
+        except ValidationError as error:
+            await connection_manager.send_personal_message(
+                _message_error(error, index if batched else None), client.client_id
+            )
+            _invalid_timer.observe(time.monotonic() - started)
+        else:
+            if client.spectator and message.type not in SPECTATOR_MESSAGES:
+                fields = {"code": "spectator_forbidden"}
+                if batched:
+                    fields["index"] = index
+                await connection_manager.send_personal_message(
+                    encode_event("error", **fields), client.client_id
+                )
+                _invalid_timer.observe(time.monotonic() - started)
+                started = time.monotonic()
+                continue
+            if client.owner is not None and message.type != "pong":
+                # Room d'un autre worker: l'action y est traitée
+                await forward_action(client, message)
+            else:
+                # Les pongs prouvent que le client est vivant, pas que la room est active
+                if message.type != "pong":
+                    room_manager.touch(client.room, started)
+                await HANDLERS[message.type](client, message)
+            _message_timers[message.type].observe(time.monotonic() - started)
+        started = time.monotonic()
+
+
+async def send_to_worker(address: Optional[str], message_type: str, **fields):
+    """Message de contrôle à un autre worker (tous si address est None), voir WORKER_HANDLERS."""
+    backplane = room_directory.backplane
+    if backplane is not None:
+        await backplane.send(
+            address, {"type": message_type, "worker": backplane.address, **fields}
+        )
+
+
+async def forward_action(client: ClientContext, message: ClientMessage):
+    """
+    Transmet une action au worker de la room, avec l'heure de réception et
+    le RTT mesurés ici (les workers d'un backplane Unix partagent la même
+    horloge monotone: l'arbitrage des buzz reste juste).
+    """
+    await send_to_worker(
+        client.owner,
+        "action",
+        client=client.client_id,
+        room=client.room_id,
+        message=message.model_dump(),
+        received_at=client.received_at,
+        rtt=connection_manager.get_rtt(client.client_id),
+    )
+
+
+@handler("buzz")
+async def handle_buzz(client: ClientContext, message: BuzzMessage):
+    # Le buzz est arbitré avec ceux reçus dans la même fenêtre,
+    # la décision est diffusée par announce_buzz
+    room = client.room
+    accepted = await buzzer_manager.submit(
+        room,
+        client.client_id,
+        client.received_at,
+        connection_manager.get_rtt(client.client_id),
+    )
+    if not accepted:
+        await connection_manager.send_personal_message(
+            encode_event("buzz_rejected", current_buzzer=room.current_buzzer),
+            client.client_id,
+            urgent=True,
+        )
+
+
+@handler("pong")
+async def handle_pong(client: ClientContext, message: PongMessage):
+    # Réponse à un ping: met à jour le RTT du client
+    connection_manager.record_pong(client.client_id, message.id)
+
+
+@handler("chat_message")
+async def handle_chat_message(client: ClientContext, message: ChatMessageIn):
+    client_id = client.client_id
+
+    # Ajouter le message au gestionnaire de chat
+    chat_message = chat_manager.add_message(
+        room_id=client.room_id,
+        sender_id=client_id,
+        sender_name=client_id,  # Ou récupérer le vrai nom depuis room.players[client_id]["name"]
+        content=message.content,
+        sender_role="player",
+    )
+
+    # Le message n'est encodé qu'une fois, is_self est ajouté au texte encodé
+    message_json = chat_message.to_json()
+
+    # Diffuser à tous les autres clients dans la room, l'auteur reçoit sa
+    # confirmation (is_self), gardée dans le journal pour la reprise
+    await broadcast_event(
+        client.room,
+        encode_event("chat_message", message=message_json),
+        exclude_client=client_id,
+        personal=encode_event("chat_message", message=add_fields(message_json, is_self=True)),
+    )
+
+
+@handler("get_room_state")
+async def handle_get_room_state(client: ClientContext, message: GetRoomStateMessage):
+    # Demande de l'état complet (ex: le client a détecté un trou de version)
+    await connection_manager.send_personal_message(state_event(client.room), client.client_id)
+
+
+@handler("get_player_list")
+async def handle_get_player_list(client: ClientContext, message: GetPlayerListMessage):
+    players = client.room.get_player_list()
+    await connection_manager.send_personal_message(
+        encode_event("player_list", players=players), client.client_id
+    )
+
+
+@handler("config_update")
+async def handle_config_update(client: ClientContext, message: ConfigUpdateMessage):
+    room = client.room
+
+    # Mettre à jour la configuration de la room
+    room.update_config(message.config)
+    # Nouvelle playlist (ou nouveaux extraits): la file des manches est préparée en fond
+    prefetcher.config_changed(room, message.spotify_token)
+
+    # Ajouter un message système au chat
+    system_msg = chat_manager.add_system_message(
+        client.room_id, f"Configuration mise à jour par {client.client_id}"
+    )
+
+    # Diffuser la nouvelle configuration à tous les joueurs
+    await broadcast_event(
+        room,
+        room_event(
+            room,
+            "config_update",
+            config=message.config,
+            updated_by=client.client_id,
+            system_message=system_msg.to_json(),
+        ),
+    )
+
+
+@handler("start_game")
+async def handle_start_game(client: ClientContext, message: StartGameMessage):
+    room = client.room
+    room.start_game()
+    # Le serveur enchaîne ensuite les manches (round_started, round_ended...)
+    game_loop.start(room)
+
+    system_msg = chat_manager.add_system_message(client.room_id, "La partie a commencé!")
+
+    await broadcast_event(
+        room, room_event(room, "game_started", system_message=system_msg.to_json())
+    )
+
+
+@handler("validate_answer")
+async def handle_validate_answer(client: ClientContext, message: ValidateAnswerMessage):
+    # Valider la réponse du joueur qui a buzzé
+    room = client.room
+    result = room.validate_answer(message.is_correct)
+
+    if result:
+        # Buzzer bloqué ou fin de manche: inclus dans le delta diffusé ci-dessous
+        game_loop.answered(room, message.is_correct)
+
+        # Créer un message système approprié
+        result_text = "correcte" if message.is_correct else "incorrecte"
+        system_msg = chat_manager.add_system_message(
+            client.room_id,
+            f"La réponse de {result['player_id']} était {result_text}!",
+        )
+
+        await broadcast_event(
+            room,
+            room_event(
+                room,
+                "answer_result",
+                result=result,
+                system_message=system_msg.to_json(),
+            ),
+            urgent=True,
+        )
+
 
 # / car j'utilise le prefix /ws dans le main.py
 @router.websocket("/{room_id}")
 async def websocket_endpoint(
-    websocket: WebSocket, room_id: str, client_id: str = Query(None)
+    websocket: WebSocket,
+    room_id: str,
+    client_id: str = Query(None),
+    resume_seq: Optional[int] = Query(None),
+    epoch: Optional[str] = Query(None),
+    role: str = Query("player"),
 ):
+    """
+    Connexion d'un joueur, ou d'un spectateur (role=spectator). Après une
+    coupure, le client repasse le dernier numéro d'événement reçu
+    (resume_seq) et l'epoch du journal de la room (donnés par room_state):
+    si sa place a été gardée, il ne reçoit que les événements manqués, puis
+    session_resumed.
+
+    Un spectateur reçoit l'état de la room puis ses événements regroupés
+    (une trame toutes les SPECTATOR_INTERVAL secondes au plus, voir
+    ConnectionManager.deliver_local), sans jamais retarder les joueurs.
+    """
     if not client_id:
         await websocket.close(code=1008, reason="client_id is required")
         return
+    if role not in ("player", SPECTATOR):
+        await websocket.close(code=1008, reason="role must be player or spectator")
+        return
+    spectator = role == SPECTATOR
 
     try:
-        # 1. Vérifier si la room existe
+        # 1. Vérifier si la room existe: ici, sur un autre worker (les actions
+        # du client y seront transmises), ou nulle part
         room = room_manager.get_room(room_id)
-        if not room:
-            # Si la room n'existe pas, la créer avec l'ID fourni
+        owner = room_directory.owner(room_id) if room is None else None
+        if room is None and owner is None:
+            # Si la room n'existe pas, la créer avec l'ID fourni et l'annoncer
             room_id = room_manager.create_room(
                 room_id=room_id, room_name=f"Room-{room_id}"
             )
             room = room_manager.get_room(room_id)
+            await room_directory.claim(room_id)
 
-        # 2. Établir la connexion WebSocket
-        success = await connection_manager.connect(websocket, client_id, room_id)
+        # 2. Établir la connexion WebSocket (trames MessagePack si le client
+        # propose le sous-protocole binaire, JSON sinon)
+        subprotocol = negotiate(websocket.scope.get("subprotocols", ()))
+        success = await connection_manager.connect(
+            websocket, client_id, room_id, role=role, subprotocol=subprotocol
+        )
         if not success:
             return
+        binary = subprotocol == SUBPROTOCOL
 
-        # 3. Ajouter le client à la room
+        if owner is not None:
+            client = ClientContext(client_id, room_id, None, binary, spectator, owner)
+            await serve_remote(websocket, client, role, resume_seq, epoch)
+            return
+
+        if spectator:
+            await watch_room(websocket, client_id, room, binary)
+            return
+
+        # 3 à 6. Place dans la room, état initial et annonce aux autres
+        await join_room(room, client_id, websocket, resume_seq, epoch)
+
+        # Boucle principale pour recevoir les messages
+        client = ClientContext(client_id, room_id, room, binary)
+        await receive_frames(websocket, client)
+
+    except WebSocketDisconnect:
+        # Gérer la déconnexion du client
+        print(f"Client {client_id} disconnected from room: {room_id}")
+
+        # Ignorer si le client a déjà été évincé ou s'est reconnecté ailleurs
+        if connection_manager.get_connection(client_id) is websocket:
+            # Supprimer la connexion du manager
+            connection_manager.disconnect(client_id)
+            await hold_seat(client_id, room_id)
+
+
+async def join_room(
+    room: Room,
+    client_id: str,
+    websocket: Optional[WebSocket],
+    resume_seq: Optional[int] = None,
+    epoch: Optional[str] = None,
+):
+    """
+    Arrivée d'un joueur sur le worker de la room. websocket est None pour un
+    joueur connecté à un autre worker: ses messages personnels y sont transmis.
+    """
+    room_id = room.room_id
+
+    # 3. Ajouter le client à la room, ou lui rendre la place gardée depuis
+    # sa déconnexion (score compris, sans rien annoncer aux autres)
+    resumed = sessions.resume(client_id, room_id) and client_id in room.players
+    if resumed:
+        room.players[client_id]["connection"] = websocket
+    else:
         room.add_player(client_id, websocket, client_id)
-        print(f"Client {client_id} connected to room: {room_id}")
+    room_manager.touch(room, time.monotonic())
+    print(f"Client {client_id} connected to room: {room_id}")
 
-        # 4. Ajouter un message système au chat
+    # 4. Ajouter un message système au chat
+    if not resumed:
         chat_manager.add_system_message(
             room_id, f"Le joueur {client_id} a rejoint la partie"
         )
 
-        # 5. Envoyer l'état initial au client
-        # 5.1 Liste des joueurs
-        players = room.get_player_list()
-        await websocket.send_text(
-            json.dumps({"type": "player_list", "players": players})
+    # 5. Envoyer l'état initial au client
+    # (via la file d'envoi du client pour garder l'ordre avec les diffusions)
+    missed = room.events.since(resume_seq, epoch, client_id) if resumed else None
+    if missed is not None:
+        # 5.1 Reprise: seulement les événements manqués, dans l'ordre
+        for event in missed:
+            await connection_manager.send_personal_message(event, client_id)
+        await connection_manager.send_personal_message(
+            encode_event(
+                "session_resumed",
+                seq=room.events.seq,
+                epoch=room.events.epoch,
+                missed=len(missed),
+            ),
+            client_id,
         )
+    else:
+        # 5.1 État de la room, joueurs compris, avec sa version et le numéro
+        # du dernier événement qu'il contient
+        await connection_manager.send_personal_message(state_event(room), client_id)
 
         # 5.2 Historique du chat
         chat_history = chat_manager.get_chat_history(room_id, 30)
-        await websocket.send_text(
-            json.dumps({"type": "chat_history", "messages": chat_history})
+        await connection_manager.send_personal_message(
+            encode_event("chat_history", messages=chat_history), client_id
         )
 
-        # 5.3 État de la room
-        await websocket.send_text(
-            json.dumps({"type": "room_state", "state": room.get_full_state()})
-        )
+    # 5.3 Premier ping pour connaître le RTT du client avant son premier buzz
+    # (envoyé par son worker s'il est connecté ailleurs)
+    connection_manager.ping(client_id)
 
-        # 6. Informer les autres clients de la nouvelle connexion
-        await connection_manager.broadcast_to_room(
-            json.dumps({"type": "player_joined", "player": client_id}),
-            room_id,
+    # 6. Informer les autres clients de la nouvelle connexion
+    # (le nouveau client a déjà l'état complet, les autres reçoivent le delta)
+    if not resumed:
+        await broadcast_event(
+            room,
+            room_event(room, "player_joined", player=client_id),
             exclude_client=client_id,
         )
 
-        # Boucle principale pour recevoir les messages
-        while True:
-            # Attendre un message du client
-            data = await websocket.receive_text()
-
-            try:
-                # Essayer de parser le message comme JSON
-                message_data = json.loads(data)
-                message_type = message_data.get("type", "")
-
-                # Traiter différents types de messages
-                if message_type == "chat_message":
-                    # Message de chat
-                    content = message_data.get("content", "")
-
-                    # Ajouter le message au gestionnaire de chat
-                    message = chat_manager.add_message(
-                        room_id=room_id,
-                        sender_id=client_id,
-                        sender_name=client_id,  # Ou récupérer le vrai nom depuis room.players[client_id]["name"]
-                        content=content,
-                        sender_role="player",
-                    )
-
-                    # Message personnel (confirmation)
-                    await connection_manager.send_personal_message(
-                        json.dumps(
-                            {
-                                "type": "chat_message",
-                                "message": {**message.to_dict(), "is_self": True},
-                            }
-                        ),
-                        client_id,
-                    )
-
-                    # Diffuser à tous les autres clients dans la room
-                    await connection_manager.broadcast_to_room(
-                        json.dumps(
-                            {"type": "chat_message", "message": message.to_dict()}
-                        ),
-                        room_id,
-                        exclude_client=client_id,
-                    )
-
-                elif message_type == "get_player_list":
-                    # Demande de la liste des joueurs
-                    players = room.get_player_list()
-                    await websocket.send_text(
-                        json.dumps({"type": "player_list", "players": players})
-                    )
-
-                elif message_type == "config_update":
-                    # Mise à jour de la configuration
-                    config = message_data.get("config", {})
-
-                    # Mettre à jour la configuration de la room
-                    room.update_config(config)
-
-                    # Ajouter un message système au chat
-                    system_msg = chat_manager.add_system_message(
-                        room_id, f"Configuration mise à jour par {client_id}"
-                    )
-
-                    # Diffuser la nouvelle configuration à tous les joueurs
-                    await connection_manager.broadcast_to_room(
-                        json.dumps(
-                            {
-                                "type": "config_update",
-                                "config": config,
-                                "updated_by": client_id,
-                                "system_message": system_msg.to_dict(),
-                            }
-                        ),
-                        room_id,
-                    )
-
-                elif message_type == "buzz":
-                    # Enregistrer le buzz dans la room
-                    if room.register_buzz(client_id):
-                        # Si le buzz est accepté, ajouter un message système
-                        system_msg = chat_manager.add_system_message(
-                            room_id, f"{client_id} a buzzé!"
-                        )
-
-                        # Diffuser l'information à tous les clients
-                        await connection_manager.broadcast_to_room(
-                            json.dumps(
-                                {
-                                    "type": "buzz",
-                                    "player": client_id,
-                                    "timestamp": room.buzzer_timestamp,
-                                    "system_message": system_msg.to_dict(),
-                                }
-                            ),
-                            room_id,
-                        )
-
-                elif message_type == "start_game":
-                    # Démarrer le jeu
-                    room.start_game()
-
-                    # Ajouter un message système
-                    system_msg = chat_manager.add_system_message(
-                        room_id, "La partie a commencé!"
-                    )
-
-                    # Informer tous les clients
-                    await connection_manager.broadcast_to_room(
-                        json.dumps(
-                            {
-                                "type": "game_started",
-                                "state": room.get_full_state(),
-                                "system_message": system_msg.to_dict(),
-                            }
-                        ),
-                        room_id,
-                    )
-
-                elif message_type == "validate_answer":
-                    # Valider la réponse du joueur qui a buzzé
-                    is_correct = message_data.get("is_correct", False)
-                    result = room.validate_answer(is_correct)
-
-                    if result:
-                        # Créer un message système approprié
-                        result_text = "correcte" if is_correct else "incorrecte"
-                        system_msg = chat_manager.add_system_message(
-                            room_id,
-                            f"La réponse de {result['player_id']} était {result_text}!",
-                        )
-
-                        # Informer tous les clients
-                        await connection_manager.broadcast_to_room(
-                            json.dumps(
-                                {
-                                    "type": "answer_result",
-                                    "result": result,
-                                    "system_message": system_msg.to_dict(),
-                                    "state": room.get_full_state(),
-                                }
-                            ),
-                            room_id,
-                        )
-
-                else:
-                    # Pour la compatibilité avec le code existant
-                    # Si le type de message n'est pas reconnu, le traiter comme un message texte brut
-                    print(f"Message de type inconnu reçu: {message_type}")
-                    await connection_manager.send_personal_message(
-                        f"Message reçu: {data}", client_id
-                    )
-
-            except json.JSONDecodeError:
-                # Si ce n'est pas du JSON valide, traiter comme un message texte brut
-                print(f"JSON invalide reçu: {data}")
-                await connection_manager.send_personal_message(
-                    f"Message non-JSON reçu: {data}", client_id
-                )
+
+async def announce_buzz(room: Room, winner: str, candidates: Dict[str, float]):
+    """
+    Diffuse la décision d'arbitrage d'un buzz: le gagnant et les joueurs
+    battus dans la même fenêtre. Le message système du chat part ensuite.
+    """
+    game_loop.buzzed(room)
+    await broadcast_event(
+        room,
+        room_event(
+            room,
+            "buzz",
+            player=winner,
+            timestamp=room.buzzer_timestamp,
+            rejected=[player_id for player_id in candidates if player_id != winner],
+        ),
+        urgent=True,
+    )
+
+    system_msg = chat_manager.add_system_message(room.room_id, f"{winner} a buzzé!")
+    await broadcast_event(room, encode_event("system_message", message=system_msg.to_json()))
+
+
+async def reject_buzzes(room: Room, player_ids: List[str]):
+    """Refuse les buzz d'une fenêtre close alors que le buzzer n'était plus actif."""
+    message = encode_event("buzz_rejected", current_buzzer=room.current_buzzer)
+    for player_id in player_ids:
+        await connection_manager.send_personal_message(message, player_id, urgent=True)
+
+
+# La décision d'un buzz est diffusée dès la fin de la fenêtre d'arbitrage
+buzzer_manager.on_decision = announce_buzz
+buzzer_manager.on_rejected = reject_buzzes
+
+
+# Événements qui rythment les manches: jamais retardés par l'envoi groupé
+URGENT_GAME_EVENTS = frozenset(("round_started", "round_ended", "buzzer_active"))
+
+
+async def announce_game_event(room: Room, event_type: str, fields: dict):
+    """
+    Diffuse un événement du déroulement de la partie (manches, buzzer, fin) ou
+    de la préparation de ses manches (round_queue_ready, round_queue_error).
+    """
+    if event_type == "game_ended":
+        system_msg = chat_manager.add_system_message(room.room_id, "La partie est terminée!")
+        fields["system_message"] = system_msg.to_json()
+        # Config modifiée pendant la partie: la nouvelle file est préparée maintenant
+        prefetcher.game_ended(room)
+    await broadcast_event(
+        room, room_event(room, event_type, **fields), urgent=event_type in URGENT_GAME_EVENTS
+    )
+
+
+game_loop.on_event = announce_game_event
+prefetcher.on_event = announce_game_event
+
+
+async def receive_frames(websocket: WebSocket, client: ClientContext):
+    """
+    Reçoit et traite les trames d'un client jusqu'à sa déconnexion
+    (WebSocketDisconnect) ou son éviction par le manager de connexions.
+    """
+    while connection_manager.get_connection(client.client_id) is websocket:
+        # Attendre un message du client (trame texte ou binaire)
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+        data = message.get("text")
+        if data is None:
+            data = message.get("bytes", b"")
+        # Horodatage monotone à la réception, avant tout traitement (buzz)
+        client.received_at = time.monotonic()
+        await dispatch_frame(client, data)
+
+
+async def watch_room(websocket: WebSocket, client_id: str, room: Room, binary: bool):
+    """
+    Suite de websocket_endpoint pour un spectateur: ni place, ni score, ni
+    annonce aux joueurs. Il reçoit l'état courant et l'historique du chat,
+    puis les événements de la room par le tier des spectateurs.
+    """
+    room_id = room.room_id
+    try:
+        await welcome_spectator(room, client_id, websocket)
+        await receive_frames(websocket, ClientContext(client_id, room_id, room, binary, True))
 
     except WebSocketDisconnect:
-        # Gérer la déconnexion du client
-        print(f"Client {client_id} disconnected from room: {room_id}")
+        print(f"Spectator {client_id} disconnected from room: {room_id}")
+        if connection_manager.get_connection(client_id) is websocket:
+            connection_manager.disconnect(client_id)
+            await hold_seat(client_id, room_id)
 
-        # 1. Supprimer le client de la room
-        room = room_manager.get_room(room_id)
-        if room:
-            room.remove_connection(client_id)
 
-            # 2. Ajouter un message système
-            system_msg = chat_manager.add_system_message(
-                room_id, f"{client_id} a quitté la partie"
-            )
+async def welcome_spectator(room: Room, client_id: str, websocket: Optional[WebSocket]):
+    """Arrivée d'un spectateur sur le worker de la room (websocket est None s'il est ailleurs)."""
+    room.add_spectator(client_id, websocket)
+    print(f"Spectator {client_id} connected to room: {room.room_id}")
 
-            # 3. Supprimer la connexion du manager
-            connection_manager.disconnect(client_id)
+    await connection_manager.send_personal_message(state_event(room), client_id)
+    chat_history = chat_manager.get_chat_history(room.room_id, 30)
+    await connection_manager.send_personal_message(
+        encode_event("chat_history", messages=chat_history), client_id
+    )
+    connection_manager.ping(client_id)
 
-            # 4. Informer les autres clients
-            await connection_manager.broadcast_to_room(
-                json.dumps(
-                    {
-                        "type": "player_disconnected",
-                        "player": client_id,
-                        "system_message": system_msg.to_dict(),
-                        "players": room.get_player_list(),
-                    }
-                ),
-                room_id,
-            )
 
-            # 5. Si la room est vide, la supprimer
-            if room.is_empty():
-                room_manager.delete_room(room_id)
-                chat_manager.delete_room_chat(room_id)
-                print(f"Room {room_id} deleted (empty)")
+async def serve_remote(
+    websocket: WebSocket,
+    client: ClientContext,
+    role: str,
+    resume_seq: Optional[int],
+    epoch: Optional[str],
+):
+    """
+    Suite de websocket_endpoint pour un client d'une room d'un autre worker:
+    il est annoncé à ce worker, qui lui envoie l'état initial et traite ses
+    actions (forward_action). Ses pongs sont traités ici, et les diffusions
+    de la room lui arrivent par le backplane.
+    """
+    await send_to_worker(
+        client.owner,
+        "join",
+        client=client.client_id,
+        room=client.room_id,
+        role=role,
+        resume_seq=resume_seq,
+        epoch=epoch,
+    )
+    connection_manager.ping(client.client_id)
+    await receive_frames(websocket, client)
+
+
+def spectator_snapshot(room_id: str) -> Optional[str]:
+    """État complet envoyé aux spectateurs à la place d'un lot d'événements trop long."""
+    room = room_manager.get_room(room_id)
+    return state_event(room) if room is not None else None
+
+
+async def hold_seat(client_id: str, room_id: str):
+    """
+    Connexion perdue (déconnexion ou éviction): la place du joueur est gardée
+    pendant le délai de grâce, puis handle_client_disconnect le fait partir.
+    Un spectateur part tout de suite, sans rien annoncer.
+    """
+    room = room_manager.get_room(room_id)
+    if room is None:
+        owner = room_directory.owner(room_id)
+        if owner is not None:
+            # Room d'un autre worker: la place y est gardée
+            await send_to_worker(owner, "leave", client=client_id, room=room_id)
+            return
+    if room is not None and client_id in room.spectators:
+        room.remove_connection(client_id)
+        return
+    if room is not None and client_id in room.players:
+        room.players[client_id]["connection"] = None
+    await sessions.hold(client_id, room_id)
+
+
+async def handle_client_disconnect(client_id: str, room_id: str):
+    """
+    Retire un client déconnecté de sa room et prévient les autres clients.
+    Appelé à la fin du délai de grâce (sessions), pour les déconnexions
+    normales comme pour les évictions.
+    """
+    # 1. Supprimer le client de la room
+    room = room_manager.get_room(room_id)
+    if room:
+        room.remove_connection(client_id)
+
+        # 2. Ajouter un message système
+        system_msg = chat_manager.add_system_message(
+            room_id, f"{client_id} a quitté la partie"
+        )
+
+        # 3. Informer les autres clients
+        await broadcast_event(
+            room,
+            room_event(
+                room,
+                "player_disconnected",
+                player=client_id,
+                system_message=system_msg.to_json(),
+            ),
+        )
+
+        # 4. Si la room est vide, la supprimer
+        if room.is_empty():
+            forget_room(room_id)
+            print(f"Room {room_id} deleted (empty)")
+
+
+def forget_room(room_id: str):
+    """Supprime une room de ce worker avec son chat, son buzzer, sa partie et sa playlist."""
+    room_manager.delete_room(room_id)
+    chat_manager.delete_room_chat(room_id)
+    buzzer_manager.cancel(room_id)
+    game_loop.stop(room_id)
+    prefetcher.forget(room_id)
+
+
+# Les clients évincés (trop lents, muets) suivent le chemin normal de déconnexion
+connection_manager.on_evict = hold_seat
+connection_manager.spectator_snapshot = spectator_snapshot
+sessions.on_expire = handle_client_disconnect
+
+
+# Messages de contrôle entre workers (backplane.send), par type
+WorkerHandler = Callable[[dict], Awaitable[None]]
+WORKER_HANDLERS: Dict[str, WorkerHandler] = {}
+
+
+def worker_handler(message_type: str):
+    """Enregistre le handler d'un type de message entre workers."""
+
+    def register(function: WorkerHandler) -> WorkerHandler:
+        WORKER_HANDLERS[message_type] = function
+        return function
+
+    return register
+
+
+async def handle_worker_message(message: dict):
+    """Message d'un autre worker (backplane.on_message)."""
+    function = WORKER_HANDLERS.get(message.get("type"))
+    if function is None:
+        print(f"Message de worker inconnu: {message.get('type')}")
+        return
+    await function(message)
+
+
+@worker_handler("claim")
+async def handle_claim(message: dict):
+    await room_directory.claimed(message)
+
+
+@worker_handler("release")
+async def handle_release(message: dict):
+    await room_directory.released(message)
+
+
+@worker_handler("personal")
+async def handle_personal(message: dict):
+    # Message du worker de la room pour un client connecté ici (seulement ici:
+    # un message pour un client reparti ailleurs est perdu, pas renvoyé)
+    client_id = message["client"]
+    if connection_manager.get_connection(client_id) is not None:
+        await connection_manager.send_personal_message(
+            message["message"], client_id, message["urgent"]
+        )
+
+
+@worker_handler("join")
+async def handle_remote_join(message: dict):
+    client_id, room_id, worker = message["client"], message["room"], message["worker"]
+    room = room_manager.get_room(room_id)
+    if room is None:
+        # Room supprimée entre-temps: son client doit partir
+        await send_to_worker(worker, "release", room=room_id)
+        return
+    connection_manager.add_remote(client_id, room_id, message["role"], worker)
+    if message["role"] == SPECTATOR:
+        await welcome_spectator(room, client_id, None)
+    else:
+        await join_room(room, client_id, None, message["resume_seq"], message["epoch"])
+
+
+@worker_handler("action")
+async def handle_remote_action(message: dict):
+    client_id = message["client"]
+    remote = connection_manager.remote_clients.get(client_id)
+    room = room_manager.get_room(message["room"])
+    if remote is None or remote["worker"] != message["worker"] or room is None:
+        return  # Client parti, ou reconnecté ailleurs entre-temps
+    if message["rtt"] is not None:
+        remote["rtt"] = message["rtt"]
+    action = incoming_message_adapter.validate_python(message["message"])
+    client = ClientContext(client_id, room.room_id, room, spectator=remote["role"] == SPECTATOR)
+    client.received_at = message["received_at"]
+    room_manager.touch(room, client.received_at)
+    await HANDLERS[action.type](client, action)
+
+
+@worker_handler("leave")
+async def handle_remote_leave(message: dict):
+    client_id = message["client"]
+    room_id = connection_manager.remove_remote(client_id, message["worker"])
+    if room_id is not None:
+        await hold_seat(client_id, room_id)
+
+
+async def evict_room_clients(room_id: str, reason: str):
+    """
+    Ferme les connexions de ce worker vers une room qui n'est plus chez le
+    même worker: les clients se reconnectent et la retrouvent chez son
+    nouveau propriétaire (ou en créent une nouvelle).
+    """
+    for client_id in connection_manager.get_clients_in_room(room_id):
+        websocket = connection_manager.get_connection(client_id)
+        connection_manager.disconnect(client_id)
+        try:
+            # 1012: redémarrage du service, le client peut se reconnecter
+            await websocket.close(code=1012, reason=reason)
+        except Exception:
+            pass
+
+
+async def give_up_room(room_id: str):
+    """Room de ce worker créée plus tôt sur un autre: la copie locale est abandonnée."""
+    for client_id in list(connection_manager.remote_index.get(room_id, ())):
+        connection_manager.remove_remote(client_id)
+    await evict_room_clients(room_id, "room déplacée")
+    forget_room(room_id)
+    print(f"Room {room_id} cédée au worker {room_directory.owner(room_id)}")
+
+
+async def close_released_room(room_id: str):
+    await evict_room_clients(room_id, "room fermée")
+
+
+async def worker_lost(address: str):
+    """
+    Worker perdu: ses rooms disparaissent (leurs clients connectés ici
+    partent), et les clients des rooms de ce worker qui passaient par lui
+    gardent leur place pendant le délai de grâce.
+    """
+    for room_id in room_directory.peer_lost(address):
+        await evict_room_clients(room_id, "worker perdu")
+    for client_id, room_id in connection_manager.remove_worker(address):
+        await hold_seat(client_id, room_id)
+
+
+def attach_backplane(backplane: Backplane):
+    """Branche les messages entre workers sur un backplane, avant son démarrage."""
+    room_directory.attach(backplane)
+    backplane.on_message = handle_worker_message
+    backplane.on_peer_lost = lambda address: scheduler.schedule(0, worker_lost, address)
+
+
+room_directory.on_lost = give_up_room
+room_directory.on_released = close_released_room
 
 
 # Endpoint pour récupérer la liste des rooms actives
 @router.get("/rooms")
-async def get_rooms():
-    """Récupère la liste des rooms disponibles."""
-    return room_manager.get_all_rooms_info()
+async def get_rooms(
+    request: Request,
+    limit: int = Query(settings.LOBBY_PAGE_SIZE, ge=1, le=settings.LOBBY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    has_password: Optional[bool] = None,
+    game_state: Optional[str] = None,
+    min_players: Optional[int] = Query(None, ge=0),
+    max_players: Optional[int] = Query(None, ge=0),
+):
+    """
+    Récupère une page de la liste des rooms, des plus récentes aux plus anciennes.
+    La page suivante s'obtient avec le curseur de l'en-tête X-Next-Cursor (absent
+    sur la dernière page). L'ETag suit la version du lobby: If-None-Match -> 304.
+    """
+    lobby.refresh()
+    etag = f'W/"{lobby.version}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    try:
+        page = lobby.page(limit, cursor, has_password, game_state, min_players, max_players)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"ETag": etag, "X-Lobby-Version": str(lobby.version)}
+    if page.next_cursor is not None:
+        headers["X-Next-Cursor"] = page.next_cursor
+    return Response(page.body, media_type="application/json", headers=headers)
+
+
+# Flux des changements de la liste des rooms (Server-Sent Events)
+@router.get("/rooms/events")
+async def get_rooms_events(request: Request, since: Optional[int] = None):
+    """
+    Pousse les changements de la liste des rooms: événements "diff"
+    {version, rooms: {room_id: fiche ou null}} à appliquer sur la liste, ou
+    "reset" {version} si les changements depuis since (ou Last-Event-ID) ne
+    sont plus connus et que la liste doit être rechargée.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    if since is None and last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    subscription = lobby.subscribe(since)
+    return StreamingResponse(
+        lobby.stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # Endpoint pour récupérer l'historique du chat d'une room
 @router.get("/room/{room_id}/chat")
-async def get_chat_history(room_id: str, limit: int = 50):
-    """Récupère l'historique du chat d'une room."""
+async def get_chat_history(room_id: str, limit: int = 50, since_seq: int = None):
+    """
+    Récupère l'historique du chat d'une room.
+    Avec since_seq, ne retourne que les messages plus récents que ce numéro de séquence.
+    """
     if not room_manager.check_room_exists(room_id):
         return {"error": "Room not found"}
 
+    if since_seq is not None:
+        return {"messages": chat_manager.get_messages_since_seq(room_id, since_seq)}
     return {"messages": chat_manager.get_chat_history(room_id, limit)}
@@ -0,0 +1,358 @@
+"""
+Protocole binaire optionnel (MessagePack), négocié par sous-protocole WebSocket.
+
+Un client qui ouvre la connexion avec le sous-protocole SUBPROTOCOL reçoit
+des trames binaires au lieu du texte JSON; sans sous-protocole, rien ne
+change. Une trame est un tableau [code du type, {code du champ: valeur}]:
+
+- les types d'événement et les noms de champs connus sont remplacés par leur
+  rang dans EVENT_TYPES et FIELD_KEYS (les autres restent en texte);
+- les IDs de joueurs (valeurs des champs ID_FIELDS, clés des dicts
+  ID_MAP_FIELDS) sont remplacés par leur rang dans la table de la room. Chaque
+  nouvel ID est annoncé par une trame "player_ids" {from, ids} envoyée à tous
+  les clients binaires de la room avant la première trame qui l'utilise; un
+  client qui se connecte reçoit la table entière;
+- room_id est omis (implicite: une connexion = une room).
+
+Avec le regroupement des événements (WS_FLUSH_INTERVAL), une trame peut être
+un tableau de trames ([[code, {...}], [code, {...}]]).
+
+Les événements restent encodés une fois en JSON (encode_event): la trame
+binaire en est dérivée une seule fois par diffusion, pas par destinataire.
+Les clients binaires peuvent envoyer leurs messages sous la même forme
+compacte ou en dict MessagePack {"type": ...}.
+
+Les tables ne font que s'allonger: un code existant ne change jamais de sens.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.utils.events import loads
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    msgpack = None
+
+SUBPROTOCOL = "blindotesto.msgpack.v1"
+
+# Types d'événement, dans les deux sens (le code est le rang)
+EVENT_TYPES = (
+    "error",
+    "ping",
+    "pong",
+    "player_ids",
+    "room_state",
+    "player_list",
+    "get_room_state",
+    "get_player_list",
+    "config_update",
+    "start_game",
+    "game_started",
+    "game_ended",
+    "validate_answer",
+    "answer_result",
+    "buzz",
+    "buzz_rejected",
+    "buzzer_active",
+    "round_started",
+    "round_ended",
+    "round_queue_ready",
+    "round_queue_error",
+    "chat_message",
+    "chat_history",
+    "system_message",
+    "player_joined",
+    "player_disconnected",
+    "session_resumed",
+)
+
+# Noms de champs, à tous les niveaux (le code est le rang)
+FIELD_KEYS = (
+    "id",
+    "code",
+    "field",
+    "index",
+    "max",
+    "state",
+    "delta",
+    "from_version",
+    "version",
+    "patch",
+    "players",
+    "name",
+    "score",
+    "config",
+    "playlist",
+    "clipDuration",
+    "clipMoment",
+    "buzzerOffDuration",
+    "cutMusicAfterBuzz",
+    "rounds",
+    "has_password",
+    "game_state",
+    "buzzer_state",
+    "current_buzzer",
+    "round_number",
+    "current_song",
+    "uri",
+    "offset",
+    "duration",
+    "round",
+    "clip_duration",
+    "reason",
+    "answer",
+    "artists",
+    "tracks",
+    "error",
+    "result",
+    "player_id",
+    "is_correct",
+    "player",
+    "timestamp",
+    "rejected",
+    "updated_by",
+    "system_message",
+    "message",
+    "messages",
+    "seq",
+    "sender_id",
+    "sender_name",
+    "content",
+    "sender_role",
+    "is_system",
+    "is_self",
+    "spotify_token",
+    "from",
+    "ids",
+    "ranks",
+    "rank",
+    "previous_rank",
+    "ranking",
+    "epoch",
+    "missed",
+)
+
+# Champs dont la valeur est un ID de joueur (ou une liste d'IDs)
+ID_FIELDS = frozenset(
+    ("player", "player_id", "current_buzzer", "rejected", "sender_id", "updated_by")
+)
+# Champs dont les clés sont des IDs de joueurs
+ID_MAP_FIELDS = frozenset(("players",))
+# Champs omis des trames binaires (connus du client par sa connexion)
+IMPLICIT_FIELDS = frozenset(("room_id",))
+
+_TYPE_CODES = {name: code for code, name in enumerate(EVENT_TYPES)}
+_FIELD_CODES = {name: code for code, name in enumerate(FIELD_KEYS)}
+_PLAYER_IDS = _TYPE_CODES["player_ids"]
+
+
+class InternTable:
+    """IDs de joueurs d'une room, numérotés dans l'ordre d'apparition."""
+
+    __slots__ = ("ids", "codes")
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def intern(self, player_id: str) -> int:
+        code = self.codes.get(player_id)
+        if code is None:
+            code = self.codes[player_id] = len(self.ids)
+            self.ids.append(player_id)
+        return code
+
+
+class _Packer:
+    """Transcodage d'un événement décodé vers sa forme compacte."""
+
+    __slots__ = ("table",)
+
+    def __init__(self, table: Optional[InternTable]):
+        self.table = table
+
+    def value(self, key: Optional[str], value: Any) -> Any:
+        if isinstance(value, str):
+            if key in ID_FIELDS and self.table is not None:
+                return self.table.intern(value)
+            return value
+        if isinstance(value, dict):
+            if key in ID_MAP_FIELDS and self.table is not None:
+                intern = self.table.intern
+                return {intern(k): self.value(None, v) for k, v in value.items()}
+            return self.map(value)
+        if isinstance(value, list):
+            return [self.value(key, item) for item in value]
+        return value
+
+    def map(self, obj: dict) -> dict:
+        codes = _FIELD_CODES
+        return {
+            codes.get(key, key): self.value(key, value)
+            for key, value in obj.items()
+            if key not in IMPLICIT_FIELDS
+        }
+
+
+class _Unpacker:
+    """Inverse de _Packer (clients Python, tests, benchmarks)."""
+
+    __slots__ = ("ids",)
+
+    def __init__(self, ids: Optional[List[str]]):
+        self.ids = ids
+
+    def value(self, key: Optional[str], value: Any) -> Any:
+        if isinstance(value, int) and not isinstance(value, bool):
+            if key in ID_FIELDS and self.ids is not None:
+                return self.ids[value]
+            return value
+        if isinstance(value, dict):
+            if key in ID_MAP_FIELDS and self.ids is not None:
+                return {
+                    self.ids[k] if isinstance(k, int) else k: self.value(None, v)
+                    for k, v in value.items()
+                }
+            return self.map(value)
+        if isinstance(value, list):
+            return [self.value(key, item) for item in value]
+        return value
+
+    def map(self, obj: dict) -> dict:
+        result = {}
+        for key, value in obj.items():
+            name = FIELD_KEYS[key] if isinstance(key, int) else key
+            result[name] = self.value(name, value)
+        return result
+
+
+def _pack(obj: Any) -> bytes:
+    return msgpack.packb(obj, use_bin_type=True)
+
+
+def _compact_event(event: dict, table: Optional[InternTable]) -> list:
+    fields = dict(event)
+    event_type = fields.pop("type", None)
+    return [_TYPE_CODES.get(event_type, event_type), _Packer(table).map(fields)]
+
+
+def pack_batch(frames: List[bytes]) -> bytes:
+    """
+    Regroupe des trames déjà encodées dans un tableau MessagePack, sans les
+    décoder: seul l'en-tête du tableau est ajouté.
+    """
+    count = len(frames)
+    if count < 16:
+        header = bytes((0x90 | count,))
+    elif count < 0x10000:
+        header = b"\xdc" + count.to_bytes(2, "big")
+    else:
+        header = b"\xdd" + count.to_bytes(4, "big")
+    return header + b"".join(frames)
+
+
+class BinaryCodec:
+    """Tables d'IDs par room et transcodage des événements JSON en trames binaires."""
+
+    def __init__(self):
+        self.tables: Dict[str, InternTable] = {}
+
+    def encode(self, room_id: Optional[str], message: str) -> Tuple[bytes, Optional[bytes]]:
+        """
+        Transcode un événement JSON (texte de encode_event). Retourne la trame
+        et, si l'événement contient des IDs encore inconnus de la room, la
+        trame "player_ids" à envoyer avant elle à tous les clients binaires.
+        Sans room_id (ping commun à tout le worker), les IDs restent en texte.
+        """
+        table = None
+        if room_id is not None:
+            table = self.tables.get(room_id)
+            if table is None:
+                table = self.tables[room_id] = InternTable()
+        known = len(table.ids) if table is not None else 0
+
+        frame = _pack(_compact_event(loads(message), table))
+        ids_frame = None
+        if table is not None and len(table.ids) > known:
+            ids_frame = self._ids_frame(table, known)
+        return frame, ids_frame
+
+    def hello(self, room_id: str) -> Optional[bytes]:
+        """Table entière de la room, pour un client binaire qui se connecte."""
+        table = self.tables.get(room_id)
+        if table is None or not table.ids:
+            return None
+        return self._ids_frame(table, 0)
+
+    @staticmethod
+    def _ids_frame(table: InternTable, start: int) -> bytes:
+        from_code, ids_code = _FIELD_CODES["from"], _FIELD_CODES["ids"]
+        return _pack([_PLAYER_IDS, {from_code: start, ids_code: table.ids[start:]}])
+
+    def forget(self, room_id: str):
+        """Plus aucun client dans la room: sa table repart de zéro."""
+        self.tables.pop(room_id, None)
+
+
+def negotiate(offered: Iterable[str]) -> Optional[str]:
+    """
+    Sous-protocole à accepter parmi ceux proposés par le client, None pour JSON.
+    Le protocole binaire n'est proposé que si msgpack est installé.
+    """
+    if msgpack is not None and SUBPROTOCOL in offered:
+        return SUBPROTOCOL
+    return None
+
+
+def _expand_event(event: Any) -> Any:
+    """Forme compacte [code, {champs}] -> dict {"type": ..., ...}; dict laissé tel quel."""
+    if isinstance(event, list) and len(event) == 2 and isinstance(event[1], dict):
+        code = event[0]
+        if isinstance(code, int):
+            code = EVENT_TYPES[code]  # IndexError si le code est inconnu
+        return {"type": code, **_Unpacker(None).map(event[1])}
+    return event
+
+
+def decode_client_frame(data: bytes) -> Any:
+    """
+    Décode une trame binaire reçue d'un client: un événement ou un tableau
+    d'événements, sous forme de dicts prêts pour la validation. ValueError si
+    la trame est illisible.
+    """
+    try:
+        payload = msgpack.unpackb(data, strict_map_key=False, max_bin_len=0, max_ext_len=0)
+        if isinstance(payload, list) and payload and isinstance(payload[0], (list, dict)):
+            return [_expand_event(event) for event in payload]
+        return _expand_event(payload)
+    except (ValueError, KeyError, IndexError, TypeError, msgpack.UnpackException) as e:
+        raise ValueError(f"trame MessagePack invalide: {e}") from None
+
+
+def decode_frame(data: bytes, ids: List[str]) -> dict:
+    """
+    Décode une trame envoyée par le serveur en dict JSON équivalent (room_id
+    en moins). ids est la table du client: les trames "player_ids" la
+    complètent, et sont retournées décodées elles aussi.
+    """
+    return _decode_event(msgpack.unpackb(data, strict_map_key=False), ids)
+
+
+def decode_frames(data: bytes, ids: List[str]) -> List[dict]:
+    """Comme decode_frame, pour une trame qui peut regrouper plusieurs événements."""
+    payload = msgpack.unpackb(data, strict_map_key=False)
+    if payload and isinstance(payload[0], list):
+        return [_decode_event(event, ids) for event in payload]
+    return [_decode_event(payload, ids)]
+
+
+def _decode_event(event: list, ids: List[str]) -> dict:
+    code, fields = event
+    event_type = EVENT_TYPES[code] if isinstance(code, int) else code
+    if event_type == "player_ids":
+        start, new_ids = fields[_FIELD_CODES["from"]], fields[_FIELD_CODES["ids"]]
+        del ids[start:]
+        ids.extend(new_ids)
+        return {"type": event_type, "from": start, "ids": new_ids}
+    return {"type": event_type, **_Unpacker(ids).map(fields)}
@@ -0,0 +1,75 @@
+"""
+Encodage des événements WebSocket.
+
+Chaque événement sortant est sérialisé une seule fois en texte JSON, puis ce même
+texte est mis en file pour tous les destinataires. Les parties déjà encodées
+(message de chat, état de la room) sont insérées telles quelles via RawJSON.
+Utilise orjson s'il est installé, sinon le module json standard.
+"""
+
+import json
+from typing import Any, List
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    orjson = None
+
+
+class RawJSON(str):
+    """Fragment JSON déjà encodé, inséré tel quel dans un événement."""
+
+    __slots__ = ()
+
+
+if orjson is not None:
+
+    def dumps(obj: Any) -> str:
+        """Sérialise un objet en texte JSON compact."""
+        return orjson.dumps(obj).decode()
+
+    loads = orjson.loads
+
+else:
+
+    def dumps(obj: Any) -> str:
+        """Sérialise un objet en texte JSON compact."""
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+    loads = json.loads
+
+
+def encode(obj: Any) -> RawJSON:
+    """Encode un objet une fois pour pouvoir l'insérer dans plusieurs événements."""
+    return RawJSON(dumps(obj))
+
+
+def encode_event(event_type: str, **fields: Any) -> str:
+    """
+    Encode un événement {"type": event_type, **fields} en texte JSON.
+
+    Les valeurs de type RawJSON sont insérées sans être réencodées.
+    """
+    parts = ['{"type":', dumps(event_type)]
+    for key, value in fields.items():
+        parts.append(f',"{key}":')
+        parts.append(value if isinstance(value, RawJSON) else dumps(value))
+    parts.append("}")
+    return "".join(parts)
+
+
+def add_fields(encoded_object: RawJSON, **fields: Any) -> RawJSON:
+    """
+    Ajoute des champs à un objet JSON déjà encodé sans le réencoder.
+
+    Sert aux différences par destinataire (ex: is_self pour l'auteur d'un message).
+    """
+    extra = dumps(fields)
+    if encoded_object == "{}":
+        return RawJSON(extra)
+    return RawJSON(f"{encoded_object[:-1]},{extra[1:]}")
+
+
+def encode_batch(messages: List[str]) -> str:
+    """Regroupe des événements déjà encodés dans une seule trame (tableau JSON)."""
+    return f"[{','.join(messages)}]"
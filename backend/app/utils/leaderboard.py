@@ -0,0 +1,173 @@
+"""
+Classement incrémental des joueurs d'une room.
+
+Rangs "olympiques": à score égal, même rang (1, 2, 2, 4). Le rang d'un score
+est 1 + le nombre de joueurs qui ont strictement plus; un arbre de Fenwick
+indexé par score le donne en O(log S) (S = meilleur score). Une mise à jour de
+score coûte aussi O(log S), sans jamais retrier les joueurs.
+
+Comme le rang ne dépend que du score, les clients n'ont pas besoin du rang de
+chaque joueur: la table {score: rang} suffit, et une mise à jour n'en modifie
+que quelques entrées (pour une bonne réponse, +1 point: le score quitté et le
+score atteint). Ce sont ces changements que retournent les méthodes de
+modification, prêts à être fusionnés dans le delta de la room.
+
+À score égal, l'ordre d'affichage (top) est celui d'arrivée au score: le
+premier à l'atteindre passe devant.
+"""
+
+from bisect import bisect_left, insort
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# {score (texte, clé JSON): rang, ou None si plus personne n'a ce score}
+RankChanges = Dict[str, Optional[int]]
+
+
+class Leaderboard:
+    def __init__(self):
+        self.scores: Dict[str, int] = {}
+        # Joueurs par score, dans l'ordre d'arrivée au score (dict ordonné)
+        self._buckets: Dict[int, Dict[str, None]] = {}
+        # Scores présents, triés (au plus nombre de manches + 1 valeurs)
+        self._levels: List[int] = []
+        # Arbre de Fenwick: nombre de joueurs par score (indice = score + 1)
+        self._tree: List[int] = [0] * 17
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def __contains__(self, player_id: str) -> bool:
+        return player_id in self.scores
+
+    # --- Arbre de Fenwick ---
+
+    def _add_count(self, score: int, delta: int):
+        if score < 0:
+            raise ValueError(f"score négatif: {score}")
+        if score + 1 >= len(self._tree):
+            self._grow(score + 1)
+        tree = self._tree
+        index = score + 1
+        while index < len(tree):
+            tree[index] += delta
+            index += index & -index
+
+    def _grow(self, index: int):
+        """Agrandit l'arbre (taille doublée) en le reconstruisant depuis les buckets."""
+        size = len(self._tree)
+        while size <= index:
+            size *= 2
+        tree = [0] * size
+        for score, bucket in self._buckets.items():
+            tree[score + 1] += len(bucket)
+        for index in range(1, size):
+            parent = index + (index & -index)
+            if parent < size:
+                tree[parent] += tree[index]
+        self._tree = tree
+
+    def _count_at_most(self, score: int) -> int:
+        """Nombre de joueurs dont le score est <= score."""
+        index = min(score + 1, len(self._tree) - 1)
+        total = 0
+        while index > 0:
+            total += self._tree[index]
+            index -= index & -index
+        return total
+
+    # --- Lecture ---
+
+    def rank_of_score(self, score: int) -> int:
+        """Rang qu'a (ou qu'aurait) un joueur avec ce score."""
+        if score < 0:
+            return len(self.scores) + 1
+        return 1 + len(self.scores) - self._count_at_most(score)
+
+    def rank(self, player_id: str) -> int:
+        """Rang d'un joueur (KeyError s'il n'est pas classé)."""
+        return self.rank_of_score(self.scores[player_id])
+
+    def rank_table(self) -> Dict[str, int]:
+        """Table complète {score: rang}, du meilleur score au moins bon."""
+        table = {}
+        above = 0
+        for score in reversed(self._levels):
+            table[str(score)] = above + 1
+            above += len(self._buckets[score])
+        return table
+
+    def ranked(self) -> Iterator[Tuple[str, int, int]]:
+        """(player_id, score, rang) du premier au dernier."""
+        above = 0
+        for score in reversed(self._levels):
+            bucket = self._buckets[score]
+            for player_id in bucket:
+                yield player_id, score, above + 1
+            above += len(bucket)
+
+    def top(self, count: int) -> List[Tuple[str, int, int]]:
+        """Les count premiers: O(count + scores distincts parcourus)."""
+        result = []
+        for entry in self.ranked():
+            if len(result) >= count:
+                break
+            result.append(entry)
+        return result
+
+    # --- Modifications ---
+
+    def add(self, player_id: str, score: int = 0) -> RankChanges:
+        """Classe un nouveau joueur (un joueur déjà classé garde son score)."""
+        if player_id in self.scores:
+            return {}
+        return self._move(player_id, None, score)
+
+    def remove(self, player_id: str) -> RankChanges:
+        """Retire un joueur du classement."""
+        if player_id not in self.scores:
+            return {}
+        return self._move(player_id, self.scores[player_id], None)
+
+    def set_score(self, player_id: str, score: int) -> RankChanges:
+        """Change le score d'un joueur classé (ou le classe)."""
+        previous = self.scores.get(player_id)
+        if previous == score:
+            return {}
+        return self._move(player_id, previous, score)
+
+    def _move(self, player_id: str, old: Optional[int], new: Optional[int]) -> RankChanges:
+        """
+        Déplace un joueur de old vers new (None = absent) et retourne les rangs
+        modifiés: ceux des scores compris entre les deux (ils gagnent ou perdent
+        un joueur devant eux), plus les scores apparus ou disparus.
+        """
+        changes: RankChanges = {}
+        if old is not None:
+            bucket = self._buckets[old]
+            del bucket[player_id]
+            del self.scores[player_id]
+            self._add_count(old, -1)
+            if not bucket:
+                del self._buckets[old]
+                del self._levels[bisect_left(self._levels, old)]
+                changes[str(old)] = None
+        if new is not None:
+            self._add_count(new, 1)  # Avant le bucket: _grow recompte depuis les buckets
+            bucket = self._buckets.get(new)
+            if bucket is None:
+                bucket = self._buckets[new] = {}
+                insort(self._levels, new)
+            bucket[player_id] = None
+            self.scores[player_id] = new
+            changes[str(new)] = self.rank_of_score(new)
+
+        # Scores dont le nombre de joueurs strictement devant a changé: [low, high)
+        if old is None or new is None:
+            # Arrivée ou départ: tous les scores inférieurs
+            low, high = 0, old if new is None else new
+        else:
+            low, high = min(old, new), max(old, new)
+        levels = self._levels
+        for score in levels[bisect_left(levels, low) : bisect_left(levels, high)]:
+            changes.setdefault(str(score), self.rank_of_score(score))
+        return changes
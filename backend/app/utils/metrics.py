@@ -0,0 +1,230 @@
+"""
+Métriques au format texte Prometheus, sans dépendance.
+
+Les métriques sont des familles (nom + noms de labels) dont on récupère une
+fois pour toutes l'enfant correspondant à des valeurs de labels avec
+labels(...). Le texte des labels est formaté à ce moment-là: sur le chemin
+critique, inc() et observe() ne font que des additions.
+"""
+
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# Durées (secondes) du traitement d'un message ou d'une diffusion
+FAST_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0,
+)
+# Durées (secondes) d'un appel réseau
+SLOW_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Tailles (nombre de destinataires, de messages...)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    __slots__ = ("labels", "value")
+
+    def __init__(self, labels: str):
+        self.labels = labels  # Texte des labels, formaté une fois: 'type="buzz"'
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def samples(self, name: str) -> Iterator[str]:
+        braces = f"{{{self.labels}}}" if self.labels else ""
+        yield f"{name}{braces} {_number(self.value)}"
+
+
+class Gauge(Counter):
+    __slots__ = ()
+
+    def set(self, value: float):
+        self.value = value
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+
+class Histogram:
+    __slots__ = ("labels", "bounds", "counts", "sum", "count")
+
+    def __init__(self, labels: str, bounds: Sequence[float]):
+        self.labels = labels
+        self.bounds = bounds
+        # Un compteur par seau (non cumulé) + un pour les valeurs au-delà du dernier
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str) -> Iterator[str]:
+        prefix = self.labels + "," if self.labels else ""
+        cumulative = 0
+        for bound, count in zip((*self.bounds, float("inf")), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{prefix}le="{_number(bound)}"}} {cumulative}'
+        braces = f"{{{self.labels}}}" if self.labels else ""
+        yield f"{name}_sum{braces} {_number(self.sum)}"
+        yield f"{name}_count{braces} {self.count}"
+
+
+class Metric:
+    """Famille de métriques: un nom, une aide, des noms de labels et leurs enfants."""
+
+    def __init__(
+        self,
+        kind: str,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = FAST_BUCKETS,
+    ):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.children: Dict[Tuple, object] = {}
+
+    def labels(self, *values):
+        """
+        Retourne l'enfant pour ces valeurs de labels, créé au premier appel.
+        À appeler hors du chemin critique et à garder (ou à mettre en cache).
+        """
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: labels attendus {self.labelnames}")
+            text = ",".join(
+                f'{label}="{_escape(str(value))}"'
+                for label, value in zip(self.labelnames, values)
+            )
+            if self.kind == "histogram":
+                child = Histogram(text, self.buckets)
+            elif self.kind == "gauge":
+                child = Gauge(text)
+            else:
+                child = Counter(text)
+            self.children[values] = child
+        return child
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for child in list(self.children.values()):
+            yield from child.samples(self.name)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Texte de l'exposition Prometheus (format 0.0.4)."""
+        lines = [line for metric in self.metrics for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+# Registre global, exposé par /metrics
+registry = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Metric:
+    return registry.register(Metric("counter", name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Metric:
+    return registry.register(Metric("gauge", name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = FAST_BUCKETS,
+) -> Metric:
+    return registry.register(Metric("histogram", name, documentation, labelnames, buckets))
+
+
+# Métriques de l'application
+
+ws_message_seconds = histogram(
+    "blindotesto_ws_message_seconds",
+    "Durée de traitement d'un message WebSocket reçu, par type",
+    ("type",),
+)
+broadcast_recipients = histogram(
+    "blindotesto_broadcast_recipients",
+    "Nombre de clients locaux destinataires d'une diffusion",
+    buckets=SIZE_BUCKETS,
+)
+broadcast_seconds = histogram(
+    "blindotesto_broadcast_seconds", "Durée de mise en file d'une diffusion"
+)
+ws_send_failures = counter(
+    "blindotesto_ws_send_failures_total",
+    "Clients évincés suite à un échec d'envoi, par raison",
+    ("reason",),
+)
+ws_frames_sent = counter(
+    "blindotesto_ws_frames_sent_total", "Trames WebSocket envoyées aux clients"
+)
+ws_batch_size = histogram(
+    "blindotesto_ws_batch_size",
+    "Nombre d'événements regroupés dans une trame par l'envoi groupé",
+    buckets=SIZE_BUCKETS,
+)
+spectator_fan_out_seconds = histogram(
+    "blindotesto_spectator_fan_out_seconds",
+    "Durée d'un envoi groupé aux spectateurs d'une room",
+)
+active_rooms = gauge("blindotesto_rooms", "Rooms actives")
+active_connections = gauge("blindotesto_connections", "Connexions WebSocket ouvertes")
+active_players = gauge("blindotesto_players", "Joueurs présents dans les rooms")
+chat_histories = gauge("blindotesto_chat_histories", "Rooms ayant un historique de chat")
+chat_messages = gauge("blindotesto_chat_messages", "Messages gardés dans les historiques")
+chat_history_max = gauge(
+    "blindotesto_chat_history_max_size", "Taille du plus grand historique de chat"
+)
+spotify_request_seconds = histogram(
+    "blindotesto_spotify_request_seconds",
+    "Durée des appels à Spotify, par endpoint",
+    ("endpoint",),
+    buckets=SLOW_BUCKETS,
+)
+spotify_responses = counter(
+    "blindotesto_spotify_responses_total",
+    "Réponses de Spotify par endpoint et code HTTP (error = pas de réponse)",
+    ("endpoint", "status"),
+)
+reaper_evictions = counter(
+    "blindotesto_reaper_evictions_total",
+    "Connexions, rooms et chats supprimés par le nettoyage en tâche de fond, par raison",
+    ("reason",),
+)
+estimated_memory = gauge(
+    "blindotesto_rooms_estimated_bytes",
+    "Mémoire estimée des rooms et de leur chat (budget global)",
+)
+timer_lag_seconds = histogram(
+    "blindotesto_timer_lag_seconds",
+    "Retard d'exécution des minuteries du jeu par rapport à leur échéance",
+)
@@ -0,0 +1,116 @@
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+import time
+
+
+class CacheEntry:
+    """Réponse Spotify mise en cache."""
+
+    __slots__ = ("data", "etag", "expires_at", "size")
+
+    def __init__(self, data: Any, etag: Optional[str], expires_at: float, size: int):
+        self.data = data
+        self.etag = etag
+        self.expires_at = expires_at
+        self.size = size
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.expires_at
+
+
+class ResponseCache:
+    """
+    Cache LRU des réponses GET de Spotify, clé (token utilisateur, URL).
+
+    Borné en nombre d'entrées et en octets. Une entrée expirée qui a un ETag
+    est gardée pour être revalidée avec If-None-Match (304 = servie depuis la mémoire).
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[Tuple[str, str], CacheEntry]" = OrderedDict()
+        self.total_bytes = 0
+        # Compteurs pour dimensionner le cache
+        self.hits = 0  # Réponse fraîche servie sans appel à Spotify
+        self.misses = 0  # Réponse complète téléchargée
+        self.revalidations = 0  # 304 de Spotify, réponse servie depuis la mémoire
+        self.evictions = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[CacheEntry]:
+        """Récupère une entrée (fraîche ou non) et la marque comme récemment utilisée."""
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(
+        self,
+        key: Tuple[str, str],
+        data: Any,
+        etag: Optional[str],
+        ttl: float,
+        size: int,
+    ):
+        """Ajoute ou remplace une entrée, puis évince les moins récentes si besoin."""
+        if size > self.max_bytes:
+            self.delete(key)
+            return
+
+        self.delete(key)
+        self.entries[key] = CacheEntry(data, etag, time.monotonic() + ttl, size)
+        self.total_bytes += size
+
+        while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= evicted.size
+            self.evictions += 1
+
+    def refresh(self, entry: CacheEntry, ttl: float):
+        """Prolonge une entrée revalidée par un 304."""
+        entry.expires_at = time.monotonic() + ttl
+
+    def delete(self, key: Tuple[str, str]):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+
+    def clear(self):
+        self.entries.clear()
+        self.total_bytes = 0
+
+    def stats(self) -> dict:
+        """Retourne les compteurs du cache."""
+        return {
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "evictions": self.evictions,
+        }
+
+
+def parse_cache_control(header: Optional[str], default_ttl: float) -> Optional[float]:
+    """
+    Retourne la durée de vie (secondes) indiquée par Cache-Control,
+    ou None si la réponse ne doit pas être mise en cache.
+    """
+    if not header:
+        return default_ttl
+
+    ttl = default_ttl
+    for directive in header.lower().split(","):
+        directive = directive.strip()
+        if directive == "no-store":
+            return None
+        if directive == "no-cache":
+            ttl = 0
+        elif directive.startswith("max-age="):
+            try:
+                ttl = max(0, int(directive[len("max-age=") :]))
+            except ValueError:
+                pass
+    return ttl
@@ -1,33 +1,249 @@
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import time
+
 import httpx
 from fastapi import HTTPException
 
+from app.config import settings
+from app.utils.metrics import spotify_request_seconds, spotify_responses
+from app.utils.response_cache import ResponseCache, parse_cache_control
+
+# Client HTTP partagé par toute l'application (créé/fermé dans le lifespan de main.py)
+_http_client: Optional[httpx.AsyncClient] = None
+
+# Cache des réponses GET, partagé entre les joueurs qui parcourent les mêmes playlists
+response_cache = ResponseCache(
+    max_entries=settings.SPOTIFY_CACHE_MAX_ENTRIES,
+    max_bytes=settings.SPOTIFY_CACHE_MAX_BYTES,
+)
 
-async def post_request_helper(token_url: str, data: dict, headers: dict):
-    async with httpx.AsyncClient(timeout=10.0) as client:
+
+def create_http_client() -> httpx.AsyncClient:
+    """Crée un client HTTP avec pool de connexions keep-alive vers Spotify."""
+    http2 = settings.SPOTIFY_HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            print("HTTP/2 demandé mais le paquet h2 n'est pas installé, repli sur HTTP/1.1")
+            http2 = False
+
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.SPOTIFY_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SPOTIFY_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.SPOTIFY_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            settings.SPOTIFY_HTTP_TIMEOUT, connect=settings.SPOTIFY_HTTP_CONNECT_TIMEOUT
+        ),
+        http2=http2,
+    )
+
+
+def start_http_client() -> httpx.AsyncClient:
+    """Initialise le client HTTP partagé (appelé au démarrage de l'application)."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = create_http_client()
+    return _http_client
+
+
+async def close_http_client():
+    """Ferme le client HTTP partagé et ses connexions (appelé à l'arrêt)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+# Métriques liées une fois par endpoint et par (endpoint, code), au premier appel
+_request_timers: Dict[str, Any] = {}
+_response_counters: Dict[Tuple[str, Any], Any] = {}
+
+
+def _observe(endpoint: str, started: float, status):
+    """Enregistre la durée et le code de réponse (ou "error") d'un appel à Spotify."""
+    timer = _request_timers.get(endpoint)
+    if timer is None:
+        timer = _request_timers[endpoint] = spotify_request_seconds.labels(endpoint)
+    timer.observe(time.perf_counter() - started)
+
+    counter = _response_counters.get((endpoint, status))
+    if counter is None:
+        counter = _response_counters[endpoint, status] = spotify_responses.labels(
+            endpoint, status
+        )
+    counter.inc()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Retourne le client HTTP partagé, en le créant si le lifespan ne l'a pas fait."""
+    if _http_client is None or _http_client.is_closed:
+        return start_http_client()
+    return _http_client
+
+
+def _token_error(error: httpx.HTTPError) -> HTTPException:
+    """
+    Convertit l'échec d'un appel au service de tokens en erreur HTTP:
+    les erreurs du client (400 invalid_grant, 401, 429...) sont transmises
+    telles quelles, les pannes de Spotify ou du réseau deviennent 502.
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return HTTPException(status_code=502, detail=f"Spotify API error: {str(error)}")
+
+    detail = f"Spotify API error: {str(error)}"
+    try:
+        body = response.json()
+        if isinstance(body, dict) and body.get("error"):
+            detail = body.get("error_description") or str(body["error"])
+    except ValueError:
+        pass
+    headers = None
+    if response.headers.get("Retry-After"):
+        headers = {"Retry-After": response.headers["Retry-After"]}
+    status_code = response.status_code if response.status_code < 500 else 502
+    return HTTPException(status_code=status_code, detail=detail, headers=headers)
+
+
+async def post_request_helper(
+    token_url: str, data: dict, headers: dict, endpoint: str = "token"
+):
+    """
+    Requête POST vers le service de tokens de Spotify.
+    Lève une HTTPException (voir _token_error) si l'échange échoue.
+    """
+    client = get_http_client()
+    started = time.perf_counter()
+    try:
         try:
             response = await client.post(
                 token_url,
                 data=data,
                 headers=headers,
             )
-            response.raise_for_status()
-            return response.json()  # Retourne directement le JSON sans HTTPException
-        except httpx.HTTPError as e:
-            # Au lieu de raise HTTPException, retourne un dict d'erreur
-            return {"error": f"Spotify API error: {str(e)}"}
+        except httpx.HTTPError:
+            _observe(endpoint, started, "error")
+            raise
+        _observe(endpoint, started, response.status_code)
+        response.raise_for_status()
+        return response.json()
+    except httpx.HTTPError as e:
+        raise _token_error(e)
+
+
+async def get_request_helper(
+    url: str, headers: dict, use_cache: bool = True, endpoint: str = "other"
+):
+    """
+    Requête GET vers Spotify.
 
+    Les réponses sont mises en cache par (token, URL): une entrée fraîche est
+    servie directement, une entrée expirée est revalidée avec If-None-Match.
+    Les données retournées peuvent être partagées entre appels: ne pas les modifier.
+    endpoint est le nom (borné) sous lequel l'appel apparaît dans les métriques.
+    """
+    client = get_http_client()
+    key = (headers.get("Authorization", ""), url)
+    entry = response_cache.get(key) if use_cache else None
 
-async def get_request_helper(url: str, headers: dict):
-    async with httpx.AsyncClient(timeout=10.0) as client:
+    if entry is not None:
+        if entry.is_fresh(time.monotonic()):
+            response_cache.hits += 1
+            return entry.data
+        if entry.etag:
+            headers = {**headers, "If-None-Match": entry.etag}
+
+    started = time.perf_counter()
+    try:
         try:
             response = await client.get(
                 url,
                 headers=headers,
             )
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPError as e:
-            raise HTTPException(
-                status_code=getattr(e.response, "status_code", 500),
-                detail=f"Spotify API error: {str(e)}",
+        except httpx.HTTPError:
+            _observe(endpoint, started, "error")
+            raise
+        _observe(endpoint, started, response.status_code)
+
+        if response.status_code == 304 and entry is not None:
+            # Pas de changement côté Spotify: on sert la copie en mémoire
+            response_cache.revalidations += 1
+            ttl = parse_cache_control(
+                response.headers.get("Cache-Control"), settings.SPOTIFY_CACHE_TTL
+            )
+            response_cache.refresh(entry, ttl or 0)
+            return entry.data
+
+        response.raise_for_status()
+        data = response.json()
+
+        if use_cache:
+            response_cache.misses += 1
+            ttl = parse_cache_control(
+                response.headers.get("Cache-Control"), settings.SPOTIFY_CACHE_TTL
             )
+            etag = response.headers.get("ETag")
+            if ttl is not None and (ttl > 0 or etag):
+                response_cache.put(key, data, etag, ttl, len(response.content))
+            else:
+                response_cache.delete(key)
+
+        return data
+    except httpx.HTTPError as e:
+        raise HTTPException(
+            status_code=getattr(getattr(e, "response", None), "status_code", 500),
+            detail=f"Spotify API error: {str(e)}",
+        )
+
+
+async def iter_pages(
+    url: str,
+    headers: dict,
+    first_page: dict,
+    concurrency: int = None,
+    endpoint: str = "other",
+) -> AsyncIterator[List[dict]]:
+    """
+    Parcourt toutes les pages d'une ressource paginée Spotify (items/total/limit).
+
+    La première page est déjà récupérée par l'appelant (pour que ses erreurs
+    remontent avant le début du streaming). Les pages suivantes sont téléchargées
+    en parallèle dans une fenêtre glissante de `concurrency` requêtes, et
+    retournées dans l'ordre: la mémoire reste bornée à quelques pages.
+    """
+    concurrency = concurrency or settings.SPOTIFY_PAGE_CONCURRENCY
+    yield first_page.get("items", [])
+
+    total = first_page.get("total") or 0
+    limit = first_page.get("limit") or len(first_page.get("items", [])) or 1
+    separator = "&" if "?" in url else "?"
+    offsets = iter(range(limit, total, limit))
+
+    def fetch(offset: int) -> asyncio.Task:
+        page_url = f"{url}{separator}offset={offset}&limit={limit}"
+        return asyncio.ensure_future(
+            # Pages lues une seule fois: inutile de remplir le cache avec
+            get_request_helper(page_url, headers, use_cache=False, endpoint=endpoint)
+        )
+
+    pending = deque()
+    try:
+        for offset in offsets:
+            pending.append(fetch(offset))
+            if len(pending) >= concurrency:
+                break
+
+        while pending:
+            page = await pending.popleft()
+            next_offset = next(offsets, None)
+            if next_offset is not None:
+                pending.append(fetch(next_offset))
+            yield page.get("items", [])
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,95 @@
+from collections import OrderedDict
+from hashlib import sha256
+from typing import Awaitable, Callable, Dict, Tuple
+import asyncio
+import time
+
+# Récupère un token auprès de Spotify (réponse JSON avec expires_in)
+TokenFetcher = Callable[[], Awaitable[dict]]
+
+
+class TokenCache:
+    """
+    Cache des access tokens obtenus par refresh token, avec requêtes unifiées.
+
+    Les rafraîchissements simultanés d'un même refresh token (plusieurs onglets,
+    reconnexions en rafale) partagent un seul appel à Spotify. Le token obtenu
+    est resservi jusqu'à `margin` secondes avant son expiration, avec un
+    expires_in recalculé. Les erreurs sont transmises à tous les appelants en
+    attente mais ne sont pas mises en cache.
+    """
+
+    def __init__(self, margin: float = 600.0, max_entries: int = 1024):
+        self.margin = margin
+        self.max_entries = max_entries
+        # {clé: (réponse de Spotify, heure d'expiration monotone)}
+        self.entries: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        # Appels à Spotify en cours: {clé: tâche}
+        self.in_flight: Dict[str, asyncio.Task] = {}
+        # Compteurs
+        self.hits = 0  # Token servi depuis le cache
+        self.misses = 0  # Appel à Spotify
+        self.coalesced = 0  # Appelant rattaché à un appel déjà en cours
+
+    @staticmethod
+    def key(refresh_token: str) -> str:
+        """Clé du cache: empreinte du refresh token (le secret n'est pas gardé tel quel)."""
+        return sha256(refresh_token.encode()).hexdigest()
+
+    async def get(self, refresh_token: str, fetch: TokenFetcher) -> dict:
+        """Retourne un token valide pour ce refresh token, en appelant fetch si besoin."""
+        key = self.key(refresh_token)
+        now = time.monotonic()
+        cached = self.entries.get(key)
+        if cached is not None:
+            data, expires_at = cached
+            if now < expires_at - self.margin:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return {**data, "expires_in": int(expires_at - now)}
+            del self.entries[key]
+
+        task = self.in_flight.get(key)
+        if task is None:
+            self.misses += 1
+            task = self.in_flight[key] = asyncio.create_task(self._fetch(key, fetch))
+            task.add_done_callback(_log_fetch_error)
+        else:
+            self.coalesced += 1
+        # shield: un appelant annulé (client parti) n'annule pas l'appel partagé
+        data = await asyncio.shield(task)
+        return dict(data)
+
+    async def _fetch(self, key: str, fetch: TokenFetcher) -> dict:
+        try:
+            data = await fetch()
+        finally:
+            self.in_flight.pop(key, None)
+        expires_in = data.get("expires_in")
+        if isinstance(expires_in, (int, float)) and expires_in > self.margin:
+            self.entries[key] = (data, time.monotonic() + expires_in)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return data
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        """Retourne les compteurs du cache."""
+        return {
+            "entries": len(self.entries),
+            "in_flight": len(self.in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+
+def _log_fetch_error(task: asyncio.Task):
+    """
+    Récupère l'erreur d'un appel partagé: si tous les appelants ont été
+    annulés, plus personne ne l'attend ("Task exception was never retrieved").
+    """
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Token: échec du rafraîchissement: {task.exception()}")
@@ -0,0 +1,52 @@
+"""
+Micro-benchmark du stockage du chat (buffer circulaire).
+
+Mesure l'ajout d'un message au-delà de la limite d'historique, la lecture
+de l'historique et les requêtes "depuis" (seq et date) pour plusieurs tailles
+d'historique. Les coûts doivent rester constants (ajout, seq) ou logarithmiques (date).
+
+Usage (depuis backend/):
+    python -m benchmarks.bench_chat
+"""
+
+import timeit
+
+from app.managers.chat_manager import ChatManager
+
+
+def main(number: int = 5_000):
+    print(
+        f"{'history':>8} {'append (µs)':>12} {'history(30) (µs)':>17}"
+        f" {'since seq (µs)':>15} {'since time (µs)':>16}"
+    )
+    for max_history in (100, 1_000, 10_000, 100_000):
+        manager = ChatManager()
+        manager.max_history = max_history
+        for i in range(max_history + 10):
+            manager.add_message("room", "alice", "alice", f"m{i}")
+        history = manager.messages["room"]
+
+        append = timeit.timeit(
+            lambda: manager.add_message("room", "alice", "alice", "hello"),
+            number=number,
+        )
+        # Un client qui a raté les 5 derniers messages
+        recent = history[len(history) - 6]
+        last = timeit.timeit(
+            lambda: manager.get_chat_history("room", 30), number=number
+        )
+        since_seq = timeit.timeit(
+            lambda: history.since_seq(recent.seq), number=number
+        )
+        since_time = timeit.timeit(
+            lambda: history.since_time(recent.created_at), number=number
+        )
+        print(
+            f"{max_history:>8} {append / number * 1e6:>12.2f}"
+            f" {last / number * 1e6:>17.2f}"
+            f" {since_seq / number * 1e6:>15.2f} {since_time / number * 1e6:>16.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
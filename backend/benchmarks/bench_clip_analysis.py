@@ -0,0 +1,71 @@
+"""
+Repérage des refrains pour une playlist de 500 morceaux: analyse seule,
+premier passage complet (analyse + écriture du cache disque) et passage
+suivant (tout vient du cache).
+
+Les analyses sont les fixtures de tests/fixtures/audio_analysis, servies sans
+réseau.
+
+Usage (depuis backend/):
+    python -m benchmarks.bench_clip_analysis [morceaux]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from app.managers.clip_selector import ClipPointCache, ClipSelector
+from app.utils.audio_analysis import analyze
+
+FIXTURES = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "tests", "fixtures", "audio_analysis",
+)
+
+
+def load_fixtures() -> list:
+    analyses = []
+    for name in sorted(os.listdir(FIXTURES)):
+        with open(os.path.join(FIXTURES, name)) as fixture:
+            analyses.append(json.load(fixture))
+    return analyses
+
+
+def timed(label: str, function):
+    start = time.perf_counter()
+    result = function()
+    print(f"{label:<34} {(time.perf_counter() - start) * 1000:>9.1f} ms")
+    return result
+
+
+def main(tracks: int = 500):
+    analyses = load_fixtures()
+    segments = sum(len(a["segments"]) for a in analyses) / len(analyses)
+    print(f"{tracks} morceaux, {segments:.0f} segments en moyenne")
+    track_ids = [f"track-{i}" for i in range(tracks)]
+
+    timed("analyse NumPy", lambda: [
+        analyze(track_id, analyses[i % len(analyses)]) for i, track_id in enumerate(track_ids)
+    ])
+
+    async def fetch(track_id: str, headers: dict):
+        return analyses[int(track_id.split("-")[1]) % len(analyses)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "clips.db")
+        selector = ClipSelector(ClipPointCache(path), fetch, concurrency=8)
+        timed("premier passage (analyse + cache)", lambda: asyncio.run(selector.points(track_ids, {})))
+        selector.close()
+
+        # Nouveau processus: le cache disque suffit
+        selector = ClipSelector(ClipPointCache(path), fetch)
+        timed("passage suivant (cache disque)", lambda: asyncio.run(selector.points(track_ids, {})))
+        assert selector.analyzed == 0
+        selector.close()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
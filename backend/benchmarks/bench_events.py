@@ -0,0 +1,63 @@
+"""
+Micro-benchmark de l'encodage d'un message de chat diffusé.
+
+Compare l'ancien chemin (to_dict + json.dumps deux fois, copie pour is_self)
+avec l'encodage unique de app.utils.events.
+
+Usage (depuis backend/):
+    python -m benchmarks.bench_events
+"""
+
+import json
+import timeit
+
+from app.managers.chat_manager import ChatMessage
+from app.managers.room_manager import Room
+from app.utils.events import add_fields, encode_event
+
+
+def legacy_chat(message: ChatMessage):
+    own = json.dumps(
+        {"type": "chat_message", "message": {**message.to_dict(), "is_self": True}}
+    )
+    others = json.dumps({"type": "chat_message", "message": message.to_dict()})
+    return own, others
+
+
+def encoded_chat(message: ChatMessage):
+    message_json = message.to_json()
+    own = encode_event("chat_message", message=add_fields(message_json, is_self=True))
+    others = encode_event("chat_message", message=message_json)
+    return own, others
+
+
+def main(number: int = 20_000):
+    content = "Je crois que c'est Daft Punk, non ?"
+    legacy = timeit.timeit(
+        lambda: legacy_chat(ChatMessage("alice", "alice", content, "room")),
+        number=number,
+    )
+    encoded = timeit.timeit(
+        lambda: encoded_chat(ChatMessage("alice", "alice", content, "room")),
+        number=number,
+    )
+    print(f"chat_message   json x2: {legacy / number * 1e6:6.2f} µs")
+    print(f"chat_message   encodé : {encoded / number * 1e6:6.2f} µs")
+
+    room = Room("room")
+    for i in range(8):
+        room.add_player(f"p{i}", None)
+    legacy = timeit.timeit(
+        lambda: json.dumps({"type": "room_state", "state": room.get_full_state()}),
+        number=number,
+    )
+    encoded = timeit.timeit(
+        lambda: encode_event("room_state", state=room.get_full_state_json()),
+        number=number,
+    )
+    print(f"room_state     json   : {legacy / number * 1e6:6.2f} µs")
+    print(f"room_state     caché  : {encoded / number * 1e6:6.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
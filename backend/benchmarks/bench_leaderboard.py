@@ -0,0 +1,50 @@
+"""
+Coût d'une bonne réponse dans une grande room: classement recalculé en triant
+tous les joueurs contre classement incrémental (utils.leaderboard), et taille
+des rangs diffusés (liste complète contre changements {score: rang}).
+
+Usage (depuis backend/):
+    python -m benchmarks.bench_leaderboard
+"""
+
+import random
+import timeit
+
+from app.utils.events import dumps
+from app.utils.leaderboard import Leaderboard
+
+
+def main(number: int = 2_000):
+    print(
+        f"{'joueurs':>8} {'tri (µs)':>10} {'incrémental (µs)':>17}"
+        f" {'liste (o)':>10} {'changements (o)':>16}"
+    )
+    for players in (10, 100, 1_000, 10_000):
+        rng = random.Random(1)
+        scores = {f"player-{i}": rng.randrange(10) for i in range(players)}
+        board = Leaderboard()
+        for player_id, score in scores.items():
+            board.add(player_id, score)
+        ids = list(scores)
+
+        def full():
+            player_id = rng.choice(ids)
+            scores[player_id] += 1
+            ranked = sorted(scores.items(), key=lambda item: -item[1])
+            return [(player_id, score, rank) for rank, (player_id, score) in enumerate(ranked, 1)]
+
+        def incremental():
+            player_id = rng.choice(ids)
+            changes = board.set_score(player_id, board.scores[player_id] + 1)
+            return changes, board.rank(player_id)
+
+        full_time = timeit.timeit(full, number=number)
+        incremental_time = timeit.timeit(incremental, number=number)
+        print(
+            f"{players:>8} {full_time / number * 1e6:>10.2f} {incremental_time / number * 1e6:>17.2f}"
+            f" {len(dumps(full())):>10} {len(dumps(incremental()[0])):>16}"
+        )
+
+
+if __name__ == "__main__":
+    main()
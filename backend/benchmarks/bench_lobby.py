@@ -0,0 +1,58 @@
+"""
+Coût d'une requête du lobby selon le nombre de rooms: liste complète
+(get_all_rooms_info sérialisée à chaque requête) contre page du lobby
+(cachée par version, recalculée après un changement de room).
+
+Usage (depuis backend/):
+    python -m benchmarks.bench_lobby
+"""
+
+import timeit
+
+from app.managers.lobby import Lobby
+from app.managers.room_manager import RoomManager
+from app.utils.events import dumps
+
+
+def main(number: int = 200):
+    print(
+        f"{'rooms':>8} {'liste (µs)':>12} {'page cachée (µs)':>17}"
+        f" {'page après changement (µs)':>27} {'page filtrée (µs)':>18}"
+    )
+    for count in (100, 1_000, 10_000, 100_000):
+        manager = RoomManager()
+        for i in range(count):
+            manager.create_room(f"room-{i}", password="x" if i % 4 == 0 else None)
+        lobby = Lobby(manager)
+        lobby.refresh()
+        busy = manager.get_room("room-7")
+
+        def full_list():
+            return dumps(manager.get_all_rooms_info())
+
+        def cached_page():
+            lobby.refresh()
+            return lobby.page(50).body
+
+        def changed_page():
+            # Un joueur arrive ou repart: nouvelle version, cache vidé
+            if "alice" in busy.players:
+                busy.remove_connection("alice")
+            else:
+                busy.add_player("alice", None)
+            lobby.refresh()
+            return lobby.page(50).body
+
+        def filtered_page():
+            lobby.pages.clear()
+            return lobby.page(50, has_password=False, game_state="waiting", min_players=0).body
+
+        times = [
+            timeit.timeit(function, number=number) / number * 1e6
+            for function in (full_list, cached_page, changed_page, filtered_page)
+        ]
+        print(f"{count:>8} {times[0]:>12.1f} {times[1]:>17.2f} {times[2]:>27.1f} {times[3]:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
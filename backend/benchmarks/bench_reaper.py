@@ -0,0 +1,73 @@
+"""
+Durée d'un passage du reaper avec des dizaines de milliers de rooms: chaque
+passage est synchrone, c'est le temps pendant lequel la boucle d'événements
+est bloquée.
+
+Usage (depuis backend/):
+    python -m benchmarks.bench_reaper [rooms] [batch_size]
+"""
+
+import sys
+import time
+
+from app.managers.buzzer_manager import BuzzerManager
+from app.managers.chat_manager import ChatManager
+from app.managers.reaper import Reaper
+from app.managers.room_manager import RoomManager
+from app.managers.ws_manager import ConnectionManager
+
+
+def populate(reaper: Reaper, rooms: int):
+    for r in range(rooms):
+        room_id = reaper.room_manager.create_room(f"room-{r}")
+        room = reaper.room_manager.get_room(room_id)
+        for p in range(8):
+            room.add_player(f"player-{p}", None, f"Joueur {p}")
+        for m in range(30):
+            reaper.chat_manager.add_message(room_id, "player-1", "Joueur 1", f"message {m}")
+        room.last_activity = 0.0
+    # Chats sans room (suppression manquée)
+    for r in range(rooms // 10):
+        reaper.chat_manager.add_system_message(f"orphan-{r}", "bonjour")
+
+
+def main(rooms: int = 50_000, batch_size: int = 1000):
+    reaper = Reaper(
+        RoomManager(),
+        ChatManager(),
+        ConnectionManager(),
+        BuzzerManager(),
+        batch_size=batch_size,
+        room_idle_ttl=float("inf"),
+        room_empty_ttl=float("inf"),
+        memory_budget=2**62,
+    )
+    populate(reaper, rooms)
+
+    durations = []
+    passes = rooms // batch_size + 1
+    for _ in range(passes):
+        start = time.perf_counter()
+        reaper.sweep(1.0)
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    print(f"{rooms} rooms, {passes} passages de {batch_size}")
+    print(f"passage médian   {durations[len(durations) // 2] * 1000:>8.2f} ms")
+    print(f"passage max      {durations[-1] * 1000:>8.2f} ms")
+    print(f"mémoire estimée  {reaper.total_size / 2**20:>8.1f} Mio")
+
+    # Budget dépassé: la moitié des rooms doit partir, au plus batch_size par passage
+    reaper.memory_budget = reaper.total_size // 2
+    start = time.perf_counter()
+    reaper.sweep(1.0)
+    print(f"passage (budget) {(time.perf_counter() - start) * 1000:>8.2f} ms")
+
+    # Expiration: toutes les rooms sont inactives, au plus batch_size par passage
+    reaper.room_empty_ttl = 10.0
+    start = time.perf_counter()
+    reaper.sweep(1000.0)
+    print(f"passage (TTL)    {(time.perf_counter() - start) * 1000:>8.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,51 @@
+"""
+Taille et coût d'encodage d'un answer_result: état complet vs delta versionné.
+
+Usage (depuis backend/):
+    python -m benchmarks.bench_room_state
+"""
+
+import json
+import timeit
+
+from app.managers.room_manager import Room
+from app.utils.events import encode_event
+
+
+def play_round(room: Room, player_id: str):
+    room.reset_buzzer()
+    room.register_buzz(player_id)
+    return room.validate_answer(True)
+
+
+def main(number: int = 2_000):
+    print(f"{'players':>8} {'full (B)':>9} {'delta (B)':>10} {'full (µs)':>10} {'delta (µs)':>11}")
+    for players in (6, 50, 500):
+        room = Room("room")
+        for i in range(players):
+            room.add_player(f"player-{i}", None)
+        room.start_game()
+        room.pop_delta()
+
+        def full():
+            result = play_round(room, "player-1")
+            room.pop_delta()
+            result["scores"] = room.get_player_list()
+            return json.dumps(
+                {"type": "answer_result", "result": result, "state": room.get_full_state()}
+            )
+
+        def delta():
+            result = play_round(room, "player-1")
+            return encode_event("answer_result", result=result, delta=room.pop_delta())
+
+        full_time = timeit.timeit(full, number=number)
+        delta_time = timeit.timeit(delta, number=number)
+        print(
+            f"{players:>8} {len(full()):>9} {len(delta()):>10}"
+            f" {full_time / number * 1e6:>10.2f} {delta_time / number * 1e6:>11.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
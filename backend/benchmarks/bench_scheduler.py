@@ -0,0 +1,119 @@
+"""
+Minuteries du jeu avec 10k+ rooms: coût de programmation/annulation, retard
+des minuteries (drift) et CPU consommé, comparés à une tâche endormie par room.
+
+Chaque room simulée réarme une minuterie périodique (période aléatoire entre
+0,5 et 1,5 s, comme les fins d'extrait et les réarmements du buzzer) et en
+annule une autre sur deux (buzz qui coupe l'extrait).
+
+Usage (depuis backend/):
+    python -m benchmarks.bench_scheduler [rooms] [secondes]
+"""
+
+from typing import List
+import asyncio
+import random
+import sys
+import time
+import tracemalloc
+
+from app.managers.scheduler import TimerScheduler
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def report(label: str, lags: List[float], cpu: float, wall: float, memory: int):
+    print(
+        f"{label:<18} {len(lags):>8} {percentile(lags, 50) * 1000:>9.2f} "
+        f"{percentile(lags, 99) * 1000:>9.2f} {max(lags) * 1000:>9.2f} "
+        f"{cpu / wall * 100:>7.1f} % {memory / 2**20:>8.1f}"
+    )
+
+
+async def operations(count: int):
+    scheduler = TimerScheduler()
+    start = time.perf_counter()
+    timers = [scheduler.schedule(60 + random.random() * 60, print) for _ in range(count)]
+    scheduled = time.perf_counter() - start
+    start = time.perf_counter()
+    for timer in timers:
+        timer.cancel()
+    cancelled = time.perf_counter() - start
+    scheduler.close()
+    print(f"programmer         {scheduled / count * 1e6:>8.2f} µs/minuterie ({count})")
+    print(f"annuler            {cancelled / count * 1e6:>8.2f} µs/minuterie")
+
+
+async def shared_heap(rooms: int, duration: float):
+    scheduler = TimerScheduler()
+    loop = asyncio.get_running_loop()
+    lags: List[float] = []
+
+    def fire(deadline: float):
+        lags.append(loop.time() - deadline)
+        period = random.uniform(0.5, 1.5)
+        scheduler.schedule(period, fire, loop.time() + period)
+        if random.random() < 0.5:
+            scheduler.schedule(period / 2, print).cancel()
+
+    for _ in range(rooms):
+        delay = random.uniform(0, 1.0)
+        scheduler.schedule(delay, fire, loop.time() + delay)
+    await asyncio.sleep(duration)
+    scheduler.close()
+    return lags
+
+
+async def task_per_room(rooms: int, duration: float):
+    loop = asyncio.get_running_loop()
+    lags: List[float] = []
+
+    async def room_loop():
+        await asyncio.sleep(random.uniform(0, 1.0))
+        while True:
+            period = random.uniform(0.5, 1.5)
+            deadline = loop.time() + period
+            if random.random() < 0.5:
+                # Extrait coupé: une attente annulée avant son échéance
+                pending = asyncio.ensure_future(asyncio.sleep(period / 2))
+                pending.cancel()
+            await asyncio.sleep(period)
+            lags.append(loop.time() - deadline)
+
+    tasks = [asyncio.create_task(room_loop()) for _ in range(rooms)]
+    await asyncio.sleep(duration)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return lags
+
+
+def measure(label: str, coroutine_function, rooms: int, duration: float):
+    cpu, wall = time.process_time(), time.perf_counter()
+    lags = asyncio.run(coroutine_function(rooms, duration))
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    # Mémoire mesurée à part: tracemalloc ralentit trop pour mesurer le retard
+    tracemalloc.start()
+    asyncio.run(coroutine_function(rooms, 1.0))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    report(label, lags, cpu, wall, peak)
+
+
+def main(rooms: int = 10_000, duration: float = 5.0):
+    asyncio.run(operations(100_000))
+    print()
+    print(f"{rooms} rooms, {duration:.0f} s")
+    print(
+        f"{'':<18} {'timers':>8} {'p50 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9} "
+        f"{'CPU':>9} {'Mio max':>8}"
+    )
+    measure("tas partagé", shared_heap, rooms, duration)
+    measure("tâche par room", task_per_room, rooms, duration)
+
+
+if __name__ == "__main__":
+    main(*(float(arg) if i else int(arg) for i, arg in enumerate(sys.argv[1:3])))
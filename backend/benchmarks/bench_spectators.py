@@ -0,0 +1,129 @@
+"""
+Délai des buzz pour les joueurs d'une room regardée par de nombreux
+spectateurs, avec et sans le tier des spectateurs.
+
+Sans tier, chaque événement est mis en file pour chaque spectateur, comme
+pour un joueur: des milliers de tâches d'écriture réveillées par événement,
+que le buzz suivant doit attendre dans la boucle d'événements. Avec le tier,
+une diffusion ne coûte aux spectateurs qu'un ajout à une liste, et ils
+reçoivent une trame commune toutes les SPECTATOR_INTERVAL secondes, envoyée
+par paquets.
+
+Chaque événement est "reçu" à heure fixe (un toutes les 2 ms, un buzz tous
+les 10): on mesure le retard de la boucle à la réception, le délai entre la
+réception d'un buzz et son envoi au dernier joueur, et les trames envoyées
+aux spectateurs. Sans tier, les spectateurs dont la file déborde sont
+évincés (messages "évincé" pendant la mesure).
+
+Usage (depuis backend/):
+    python -m benchmarks.bench_spectators [spectateurs] [événements]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+
+from app.managers.scheduler import TimerScheduler
+from app.managers.ws_manager import SPECTATOR, ConnectionManager
+from app.utils.events import encode_event
+
+PLAYERS = [f"joueur-{i:02d}" for i in range(8)]
+SPACING = 0.002
+
+
+class CountingWebSocket:
+    """Compte les trames envoyées et note l'heure d'envoi du dernier buzz."""
+
+    def __init__(self):
+        self.frames = 0
+        self.last_buzz = None
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, message: str):
+        self.frames += 1
+        if '"type":"buzz"' in message:
+            self.last_buzz = time.perf_counter()
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def traffic(count: int) -> list:
+    """(message, urgent): chat et résultats, un buzz tous les 10 événements."""
+    events = []
+    for i in range(count):
+        player = PLAYERS[i % len(PLAYERS)]
+        if i % 10 == 9:
+            events.append((encode_event("buzz", player=player, rejected=[], seq=i), True))
+        else:
+            message = {"id": f"m{i}", "sender_id": player, "content": "C'est Daft Punk, non ?"}
+            events.append((encode_event("chat_message", message=message, seq=i), False))
+    return events
+
+
+async def run(spectator_count: int, tiered: bool, events: list) -> dict:
+    manager = ConnectionManager(scheduler=TimerScheduler())
+    players = [CountingWebSocket() for _ in PLAYERS]
+    spectators = [CountingWebSocket() for _ in range(spectator_count)]
+    for player_id, websocket in zip(PLAYERS, players):
+        await manager.connect(websocket, player_id, "room-bench")
+    for i, websocket in enumerate(spectators):
+        # Sans tier: servis comme des joueurs, à chaque événement
+        role = SPECTATOR if tiered else "player"
+        await manager.connect(websocket, f"spectateur-{i}", "room-bench", role=role)
+    await asyncio.sleep(0.05)
+
+    lags, buzz_delays = [], []
+    start = time.perf_counter()
+    for index, (message, urgent) in enumerate(events):
+        received = start + index * SPACING  # Heure de réception prévue
+        delay = received - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        lags.append(time.perf_counter() - received)
+        await manager.broadcast_to_room(message, "room-bench", urgent=urgent)
+        if urgent:
+            # Délai mesuré quand le dernier joueur a reçu le buzz
+            while any(ws.last_buzz is None or ws.last_buzz < received for ws in players):
+                await asyncio.sleep(0)
+            buzz_delays.append(max(ws.last_buzz for ws in players) - received)
+    await asyncio.sleep(manager.spectator_interval + 0.05)
+
+    for client_id in list(manager.active_connections):
+        manager.disconnect(client_id)
+    await asyncio.sleep(0)
+    return {
+        "lag_ms": statistics.median(lags) * 1e3,
+        "buzz_ms": statistics.median(buzz_delays) * 1e3,
+        "buzz_max_ms": max(buzz_delays) * 1e3,
+        "frames": sum(ws.frames for ws in spectators),
+        "duration": time.perf_counter() - start,
+    }
+
+
+async def main(spectator_count: int = 2000, count: int = 500):
+    events = traffic(count)
+    print(
+        f"{len(PLAYERS)} joueurs, {spectator_count} spectateurs, {count} événements "
+        f"(un toutes les {SPACING * 1e3:.0f} ms, un buzz sur 10)"
+    )
+    print(
+        f"{'':>10} {'retard boucle':>14} {'buzz médian':>12} {'buzz max':>10} "
+        f"{'trames spect.':>14} {'durée':>8}"
+    )
+    for tiered in (False, True):
+        result = await run(spectator_count, tiered, events)
+        print(
+            f"{'tier' if tiered else 'sans tier':>10} {result['lag_ms']:>11.2f} ms "
+            f"{result['buzz_ms']:>9.2f} ms {result['buzz_max_ms']:>7.2f} ms "
+            f"{result['frames']:>14} {result['duration']:>7.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    spectator_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    asyncio.run(main(spectator_count, count))
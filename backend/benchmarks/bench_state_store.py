@@ -0,0 +1,72 @@
+"""
+Temps de redémarrage (restauration jusqu'à "prêt") et coût des écritures
+incrémentales avec 10k rooms dans SQLite.
+
+Usage (depuis backend/):
+    python -m benchmarks.bench_state_store [rooms]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from app.managers.chat_manager import ChatManager
+from app.managers.room_manager import RoomManager
+from app.managers.state_store import SQLiteStateStore, StatePersistence
+
+
+def populate(room_manager: RoomManager, chat_manager: ChatManager, rooms: int):
+    for r in range(rooms):
+        room_id = room_manager.create_room(f"room-{r}")
+        room = room_manager.get_room(room_id)
+        for p in range(8):
+            room.add_player(f"player-{p}", None, f"Joueur {p}")
+        room.start_game()
+        for m in range(30):
+            chat_manager.add_message(room_id, "player-1", "Joueur 1", f"message {m}")
+
+
+def timed(label: str, coroutine):
+    start = time.perf_counter()
+    result = asyncio.run(coroutine)
+    print(f"{label:<38} {(time.perf_counter() - start) * 1000:>9.1f} ms")
+    return result
+
+
+def main(rooms: int = 10_000):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "state.db")
+
+        room_manager, chat_manager = RoomManager(), ChatManager()
+        persistence = StatePersistence(SQLiteStateStore(path), room_manager, chat_manager)
+        asyncio.run(persistence.restore())
+        populate(room_manager, chat_manager, rooms)
+        timed(f"écriture initiale ({rooms} rooms)", persistence.flush())
+
+        # Une manche dans 1000 rooms: un score et un message système chacune
+        for r in range(0, rooms, rooms // 1000 or 1):
+            room = room_manager.get_room(f"room-{r}")
+            room.reset_buzzer()
+            room.register_buzz("player-2")
+            room.validate_answer(True)
+            chat_manager.add_system_message(room.room_id, "Bonne réponse")
+        timed("écriture incrémentale (1000 rooms)", persistence.flush())
+        timed("arrêt (dernière écriture)", persistence.close())
+        print(f"{'taille du fichier':<38} {os.path.getsize(path) / 1e6:>9.1f} Mo")
+
+        async def restart():
+            persistence = StatePersistence(
+                SQLiteStateStore(path), RoomManager(), ChatManager()
+            )
+            counts = await persistence.restore()
+            await persistence.close()
+            return counts
+
+        restored, messages = timed("redémarrage jusqu'à prêt", restart())
+        print(f"{'restaurés':<38} {restored:>9} rooms, {messages} messages")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,124 @@
+"""
+Trames envoyées avec et sans regroupement des événements non urgents
+(WS_FLUSH_INTERVAL), dans une room de 8 joueurs pendant une rafale de chat
+et d'arrivées de joueurs entrecoupée de buzz.
+
+Chaque trame est une écriture sur la socket (un appel système send() côté
+serveur, un réveil côté client): on compte les trames et les octets envoyés,
+avant et après compression permessage-deflate (négociée par défaut par
+uvicorn; compresseur zlib par connexion avec reprise de contexte, comme
+l'extension). Les buzz partent toujours seuls et tout de suite: on mesure
+aussi leur délai.
+
+Usage (depuis backend/):
+    python -m benchmarks.bench_ws_batching [événements]
+"""
+
+import asyncio
+import sys
+import time
+import zlib
+
+from app.managers.scheduler import TimerScheduler
+from app.managers.ws_manager import ConnectionManager
+from app.utils.events import encode_event
+
+PLAYERS = [f"joueur-{i:02d}" for i in range(8)]
+
+
+class CountingWebSocket:
+    """Compte les trames et leur taille, brute et compressée (permessage-deflate)."""
+
+    def __init__(self):
+        self.frames = 0
+        self.raw = 0
+        self.deflated = 0
+        self.compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        self.last_buzz = None
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, message: str):
+        if '"type":"buzz"' in message:
+            self.last_buzz = time.perf_counter()
+        data = message.encode()
+        self.frames += 1
+        self.raw += len(data)
+        compressed = self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.deflated += len(compressed) - 4  # Fin 00 00 ff ff retirée, comme l'extension
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def traffic(count: int) -> list:
+    """(message, urgent): chat et arrivées, un buzz tous les 10 événements."""
+    events = []
+    for i in range(count):
+        sender = PLAYERS[i % len(PLAYERS)]
+        if i % 10 == 9:
+            events.append((encode_event("buzz", player=sender, rejected=[]), True))
+        elif i % 10 == 4:
+            events.append((encode_event("player_joined", player=f"invite-{i}"), False))
+        else:
+            message = {
+                "id": f"m{i}",
+                "seq": i,
+                "sender_id": sender,
+                "sender_name": sender,
+                "content": "C'est Daft Punk, non ?",
+                "room_id": "room-bench",
+                "sender_role": "player",
+                "is_system": False,
+                "timestamp": "2025-01-01T12:00:00.123456",
+            }
+            events.append((encode_event("chat_message", message=message), False))
+    return events
+
+
+async def run(flush_interval: float, events: list, spacing: float) -> dict:
+    manager = ConnectionManager(flush_interval=flush_interval, scheduler=TimerScheduler())
+    sockets = [CountingWebSocket() for _ in PLAYERS]
+    for player_id, websocket in zip(PLAYERS, sockets):
+        await manager.connect(websocket, player_id, "room-bench")
+    await asyncio.sleep(0)
+
+    buzz_delays = []
+    for message, urgent in events:
+        sent = time.perf_counter()
+        await manager.broadcast_to_room(message, "room-bench", urgent=urgent)
+        await asyncio.sleep(spacing)
+        if urgent:
+            buzz_delays.append(sockets[0].last_buzz - sent)
+    await asyncio.sleep(flush_interval + 0.01)
+
+    for player_id in PLAYERS:
+        manager.disconnect(player_id)
+    await asyncio.sleep(0)
+    return {
+        "frames": sum(ws.frames for ws in sockets),
+        "raw": sum(ws.raw for ws in sockets),
+        "deflated": sum(ws.deflated for ws in sockets),
+        "buzz_ms": max(buzz_delays) * 1e3,
+    }
+
+
+async def main(count: int = 400):
+    events = traffic(count)
+    spacing = 0.002  # Une rafale: un événement toutes les 2 ms
+    print(f"{count} événements, {len(PLAYERS)} clients, un événement toutes les {spacing * 1e3:.0f} ms")
+    print(f"{'intervalle':>10} {'trames':>8} {'octets':>9} {'deflate':>9} {'buzz max':>9}")
+    baseline = None
+    for interval in (0.0, 0.010, 0.020):
+        result = await run(interval, events, spacing)
+        baseline = baseline or result["frames"]
+        print(
+            f"{interval * 1e3:>7.0f} ms {result['frames']:>8} {result['raw']:>9} "
+            f"{result['deflated']:>9} {result['buzz_ms']:>6.2f} ms"
+            f"   ({1 - result['frames'] / baseline:.0%} de trames en moins)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 400))
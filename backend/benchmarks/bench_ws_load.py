@@ -0,0 +1,339 @@
+"""
+Banc de charge WebSocket: N rooms × M joueurs simulés contre un serveur local.
+
+Le serveur est lancé avec uvicorn sur 127.0.0.1 (port libre) dans un processus
+séparé, pour que les clients simulés ne faussent pas ses mesures. Chaque
+client rejoint sa room, répond aux pings et envoie des messages de chat, des
+buzz et des demandes d'état à des intervalles aléatoires (loi exponentielle);
+le premier joueur de chaque room démarre la partie, change la configuration et
+valide les réponses.
+
+Mesures:
+- messages/s envoyés et reçus par les clients,
+- latence p50/p95/p99 par type de message: de l'envoi par un client à la
+  réception par chaque destinataire (fan-out) ou à la réponse (requêtes),
+- mémoire du serveur par room (RSS après connexion de tous les clients
+  moins RSS au démarrage, Linux uniquement).
+
+Usage (depuis backend/):
+    python -m benchmarks.bench_ws_load --rooms 50 --players 6 --duration 10
+    python -m benchmarks.bench_ws_load --url ws://127.0.0.1:8000  # serveur existant
+"""
+
+from collections import defaultdict, deque
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from websockets.asyncio.client import connect
+
+from app.utils.events import dumps, loads
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Stats:
+    """Compteurs et latences de tous les clients simulés."""
+
+    def __init__(self):
+        self.sent = 0
+        self.received = 0
+        self.errors = 0
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+
+    def record(self, kind: str, started: Optional[float]):
+        if started is not None:
+            self.latencies[kind].append(time.perf_counter() - started)
+
+
+class RoomTracker:
+    """Heures d'envoi partagées par les clients d'une room (pour le fan-out)."""
+
+    def __init__(self, room_id: str):
+        self.room_id = room_id
+        self.markers: Dict[str, float] = {}  # {marqueur chat/config: heure d'envoi}
+        self.last_buzz: Dict[str, float] = {}  # {joueur: heure de son dernier buzz}
+        self.last_validate: Optional[float] = None
+
+
+class SimulatedClient:
+    def __init__(self, url: str, tracker: RoomTracker, client_id: str, leader: bool,
+                 stats: Stats, args: argparse.Namespace, markers: itertools.count):
+        self.url = f"{url}/ws/{tracker.room_id}?client_id={client_id}"
+        self.tracker = tracker
+        self.client_id = client_id
+        self.leader = leader  # Premier joueur de la room: démarre et arbitre
+        self.stats = stats
+        self.args = args
+        self.markers = markers
+        self.websocket = None
+        self.joined = asyncio.Event()
+        self.join_started: Optional[float] = None
+        # Requêtes en attente de leur réponse personnelle (FIFO)
+        self.pending_buzz: deque = deque()
+        self.pending_state: deque = deque()
+
+    async def send(self, message: dict):
+        await self.websocket.send(dumps(message))
+        self.stats.sent += 1
+
+    async def join(self):
+        self.join_started = time.perf_counter()
+        self.websocket = await connect(self.url, max_size=None, ping_interval=None)
+        self.reader = asyncio.create_task(self.read())
+        await self.joined.wait()
+
+    async def read(self):
+        try:
+            async for frame in self.websocket:
+                self.stats.received += 1
+                try:
+                    await self.handle(loads(frame))
+                except ValueError:
+                    pass  # Réponses texte brut du serveur
+        except Exception:
+            self.stats.errors += 1
+
+    async def handle(self, data: dict):
+        message_type = data.get("type")
+        tracker = self.tracker
+
+        if message_type == "ping":
+            await self.send({"type": "pong", "id": data["id"]})
+        elif message_type == "room_state":
+            if not self.joined.is_set():
+                self.stats.record("join", self.join_started)
+                self.joined.set()
+            elif self.pending_state:
+                self.stats.record("get_room_state", self.pending_state.popleft())
+        elif message_type == "chat_message":
+            message = data["message"]
+            if not message.get("is_self"):
+                self.stats.record("chat_message", tracker.markers.get(message["content"]))
+        elif message_type == "config_update":
+            marker = data["config"].get("bench")
+            if data.get("updated_by") != self.client_id:
+                self.stats.record("config_update", tracker.markers.get(marker))
+        elif message_type == "buzz_rejected":
+            if self.pending_buzz:
+                self.stats.record("buzz", self.pending_buzz.popleft())
+        elif message_type == "buzz":
+            winner = data["player"]
+            self.stats.record("buzz", tracker.last_buzz.get(winner))
+            if winner == self.client_id and self.pending_buzz:
+                self.pending_buzz.popleft()
+        elif message_type == "answer_result":
+            self.stats.record("validate_answer", tracker.last_validate)
+
+    async def every(self, rate: float, action):
+        """Répète une action avec des intervalles exponentiels de moyenne 1/rate."""
+        if rate <= 0:
+            return
+        while True:
+            await asyncio.sleep(random.expovariate(rate))
+            await action()
+
+    async def chat(self):
+        marker = f"bench-{next(self.markers)}"
+        self.tracker.markers[marker] = time.perf_counter()
+        await self.send({"type": "chat_message", "content": marker})
+
+    async def buzz(self):
+        now = time.perf_counter()
+        self.tracker.last_buzz[self.client_id] = now
+        self.pending_buzz.append(now)
+        await self.send({"type": "buzz"})
+
+    async def get_state(self):
+        self.pending_state.append(time.perf_counter())
+        await self.send({"type": "get_room_state"})
+
+    async def update_config(self):
+        marker = f"bench-{next(self.markers)}"
+        self.tracker.markers[marker] = time.perf_counter()
+        await self.send({"type": "config_update", "config": {"bench": marker}})
+
+    async def validate(self):
+        self.tracker.last_validate = time.perf_counter()
+        await self.send({"type": "validate_answer", "is_correct": random.random() < 0.5})
+
+    async def play(self):
+        args = self.args
+        actions = [
+            self.every(args.chat_rate, self.chat),
+            self.every(args.buzz_rate, self.buzz),
+            self.every(args.state_rate, self.get_state),
+        ]
+        if self.leader:
+            await self.send({"type": "start_game"})
+            actions += [
+                self.every(args.config_rate, self.update_config),
+                self.every(args.validate_rate, self.validate),
+            ]
+        await asyncio.gather(*actions)
+
+    async def close(self):
+        if self.websocket is not None:
+            await self.websocket.close()
+            await self.reader
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, args: argparse.Namespace) -> subprocess.Popen:
+    """Lance l'application avec uvicorn et attend qu'elle accepte les connexions."""
+    env = {
+        **os.environ,
+        "CLIENT_ID": os.environ.get("CLIENT_ID", "bench"),
+        "CLIENT_SECRET": os.environ.get("CLIENT_SECRET", "bench"),
+        "WS_BACKPLANE": "none",
+        "STATE_STORE": "none",
+        "BUZZER_ARBITRATION_WINDOW": str(args.buzz_window),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return server
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError("le serveur s'est arrêté au démarrage")
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError("le serveur ne répond pas")
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Mémoire résidente d'un processus (Linux), None si indisponible."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def report(stats: Stats, elapsed: float, rooms: int, memory: Optional[int]):
+    print(f"{'type':<16} {'count':>8} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}")
+    for kind in sorted(stats.latencies):
+        values = stats.latencies[kind]
+        print(
+            f"{kind:<16} {len(values):>8} {percentile(values, 50) * 1000:>9.2f} "
+            f"{percentile(values, 95) * 1000:>9.2f} {percentile(values, 99) * 1000:>9.2f}"
+        )
+    print()
+    print(f"envoyés     {stats.sent / elapsed:>10.0f} msg/s")
+    print(f"reçus       {stats.received / elapsed:>10.0f} msg/s")
+    print(f"erreurs     {stats.errors:>10}")
+    if memory is not None:
+        print(f"mémoire     {memory / rooms / 1024:>10.1f} Kio/room")
+
+
+async def run(url: str, args: argparse.Namespace, server_pid: Optional[int]) -> Stats:
+    stats = Stats()
+    markers = itertools.count()
+    clients: List[SimulatedClient] = []
+    for r in range(args.rooms):
+        tracker = RoomTracker(f"bench-{r}")
+        for p in range(args.players):
+            clients.append(
+                SimulatedClient(url, tracker, f"r{r}-p{p}", p == 0, stats, args, markers)
+            )
+
+    # Un premier client charge le code des connexions avant la mesure de référence
+    warmup = SimulatedClient(url, RoomTracker("bench-warmup"), "warmup", False,
+                             Stats(), args, markers)
+    await warmup.join()
+    await warmup.close()
+    rss_before = rss_bytes(server_pid) if server_pid else None
+
+    # Connexions par paquets pour ne pas saturer la file d'accept
+    semaphore = asyncio.Semaphore(args.connect_concurrency)
+
+    async def join(client: SimulatedClient):
+        async with semaphore:
+            await client.join()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(join(client) for client in clients))
+    print(f"{len(clients)} clients connectés en {time.perf_counter() - start:.2f} s")
+
+    rss_after = rss_bytes(server_pid) if server_pid else None
+    memory = rss_after - rss_before if rss_before and rss_after else None
+
+    stats.sent = stats.received = 0
+    players = [asyncio.create_task(client.play()) for client in clients]
+    start = time.perf_counter()
+    await asyncio.sleep(args.duration)
+    elapsed = time.perf_counter() - start
+    for task in players:
+        task.cancel()
+    await asyncio.gather(*players, return_exceptions=True)
+
+    # Les compteurs sont figés avant la fermeture (les départs génèrent des messages)
+    sent, received = stats.sent, stats.received
+    await asyncio.gather(*(client.close() for client in clients), return_exceptions=True)
+    stats.sent, stats.received = sent, received
+
+    report(stats, elapsed, args.rooms, memory)
+    return stats
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--duration", type=float, default=10.0, help="secondes de jeu")
+    parser.add_argument("--chat-rate", type=float, default=0.5, help="messages/s par joueur")
+    parser.add_argument("--buzz-rate", type=float, default=0.2, help="buzz/s par joueur")
+    parser.add_argument("--state-rate", type=float, default=0.1, help="get_room_state/s par joueur")
+    parser.add_argument("--config-rate", type=float, default=0.05, help="config_update/s par room")
+    parser.add_argument("--validate-rate", type=float, default=0.2, help="validate_answer/s par room")
+    parser.add_argument("--buzz-window", type=float, default=0.0,
+                        help="fenêtre d'arbitrage des buzz du serveur lancé (secondes)")
+    parser.add_argument("--connect-concurrency", type=int, default=50)
+    parser.add_argument("--url", help="serveur existant (ws://hôte:port), sinon lancé en local")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.url:
+        return asyncio.run(run(args.url.rstrip("/"), args, None))
+
+    port = free_port()
+    server = start_server(port, args)
+    try:
+        return asyncio.run(run(f"ws://127.0.0.1:{port}", args, server.pid))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
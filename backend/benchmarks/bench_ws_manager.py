@@ -0,0 +1,56 @@
+"""
+Micro-benchmark de la diffusion dans ConnectionManager.
+
+Mesure le coût d'un broadcast dans une room de 6 joueurs pendant que le nombre
+de rooms sans rapport augmente. Avec l'index par room, le coût doit rester plat.
+
+Usage (depuis backend/):
+    python -m benchmarks.bench_ws_manager
+"""
+
+import asyncio
+import time
+
+from app.managers.ws_manager import ConnectionManager
+
+
+class NullWebSocket:
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        pass
+
+
+async def bench(unrelated_rooms: int, players_per_room: int = 6, rounds: int = 2000):
+    manager = ConnectionManager()
+    for r in range(unrelated_rooms):
+        for p in range(players_per_room):
+            await manager.connect(NullWebSocket(), f"c-{r}-{p}", f"room-{r}")
+    for p in range(players_per_room):
+        await manager.connect(NullWebSocket(), f"target-{p}", "target")
+    # Démarre les tâches d'écriture avant la mesure
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await manager.broadcast_to_room("{}", "target", exclude_client="target-0")
+        # Laisse les tâches d'écriture vider leur file
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+
+    for client_id in list(manager.active_connections):
+        manager.disconnect(client_id)
+    await asyncio.sleep(0)
+    return elapsed / rounds * 1e6
+
+
+async def main():
+    print(f"{'rooms':>8} {'clients':>8} {'broadcast (µs)':>16}")
+    for unrelated in (0, 100, 1_000, 10_000):
+        cost = await bench(unrelated)
+        print(f"{unrelated:>8} {(unrelated + 1) * 6:>8} {cost:>16.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
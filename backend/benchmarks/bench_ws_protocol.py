@@ -0,0 +1,117 @@
+"""
+Taille sur le fil et temps d'encodage/décodage: JSON contre MessagePack
+(sous-protocole binaire de app.utils.binary_protocol) sur le trafic typique
+d'une room de 8 joueurs.
+
+Côté serveur, la trame binaire est dérivée du texte JSON (déjà encodé une
+fois par diffusion): le coût mesuré est celui de ce transcodage, payé une
+fois par diffusion et non par destinataire. Côté client, on compare le
+décodage JSON au décodage de la trame (IDs et noms de champs compris).
+
+Usage (depuis backend/):
+    python -m benchmarks.bench_ws_protocol [répétitions]
+"""
+
+import sys
+import timeit
+
+from app.managers.chat_manager import ChatMessage
+from app.managers.room_manager import Room
+from app.utils.binary_protocol import BinaryCodec, decode_frame
+from app.utils.events import add_fields, encode_event, loads
+
+PLAYERS = [f"joueur-{i:02d}-{'x' * 12}" for i in range(8)]
+
+
+def typical_traffic() -> list:
+    """(nom, fonction qui encode l'événement en JSON) pour une partie ordinaire."""
+    room = Room("room-bench")
+    room.update_config({"playlist": "37i9dQZF1DXcBWIGoYBM5M"})
+    for player_id in PLAYERS:
+        room.add_player(player_id, None)
+    room.pop_delta()
+    chat = ChatMessage(PLAYERS[1], PLAYERS[1], "C'est Daft Punk, non ?", room.room_id)
+    system = ChatMessage(
+        "system", "Système", f"{PLAYERS[2]} a buzzé!", room.room_id, "system", True
+    )
+    history = [
+        ChatMessage(player_id, player_id, "Trop facile celle-là", room.room_id).to_dict()
+        for player_id in PLAYERS
+    ] * 4
+
+    def answer_result():
+        room.start_game()
+        room.register_buzz(PLAYERS[2])
+        result = room.validate_answer(True)
+        return encode_event(
+            "answer_result",
+            result=result,
+            system_message=system.to_json(),
+            delta=room.pop_delta(),
+        )
+
+    def round_started():
+        room.start_round(
+            room.round_number + 1,
+            {"uri": "spotify:track:4uLU6hMCjMI75M1A2tKUQC", "offset": 46.0, "duration": 212.0},
+        )
+        return encode_event(
+            "round_started", round=room.round_number, clip_duration=15.0, delta=room.pop_delta()
+        )
+
+    def buzz():
+        return encode_event(
+            "buzz",
+            player=PLAYERS[2],
+            timestamp="2025-01-01T12:00:00.123456",
+            rejected=PLAYERS[3:5],
+        )
+
+    def chat_message():
+        return encode_event("chat_message", message=add_fields(chat.to_json(), is_self=True))
+
+    return [
+        ("room_state", lambda: encode_event("room_state", state=room.get_full_state_json())),
+        ("chat_history", lambda: encode_event("chat_history", messages=history)),
+        ("chat_message", chat_message),
+        ("buzz", buzz),
+        ("answer_result", answer_result),
+        ("round_started", round_started),
+        ("ping", lambda: encode_event("ping", id=123456)),
+    ]
+
+
+def main(number: int = 20_000):
+    codec = BinaryCodec()
+    ids: list = []
+    print(f"{'événement':<14} {'JSON o':>7} {'MsgPack o':>9} {'gain':>6} "
+          f"{'transcodage':>12} {'décodage JSON':>14} {'décodage bin':>13}")
+    total_json = total_binary = 0
+    for name, make in typical_traffic():
+        message = make()
+        frame, ids_frame = codec.encode(codec_room(name), message)
+        if ids_frame is not None:
+            decode_frame(ids_frame, ids)
+        assert decode_frame(frame, ids)["type"] == name
+
+        json_size, binary_size = len(message.encode()), len(frame)
+        total_json += json_size
+        total_binary += binary_size
+        transcode = timeit.timeit(lambda: codec.encode(codec_room(name), message), number=number)
+        json_decode = timeit.timeit(lambda: loads(message), number=number)
+        binary_decode = timeit.timeit(lambda: decode_frame(frame, ids), number=number)
+        print(
+            f"{name:<14} {json_size:>7} {binary_size:>9} {1 - binary_size / json_size:>6.0%} "
+            f"{transcode / number * 1e6:>9.2f} µs {json_decode / number * 1e6:>11.2f} µs "
+            f"{binary_decode / number * 1e6:>10.2f} µs"
+        )
+    print(f"{'total':<14} {total_json:>7} {total_binary:>9} {1 - total_binary / total_json:>6.0%}")
+
+
+def codec_room(event_type: str):
+    # Les pings sont communs à tout le worker: pas de table d'IDs
+    return None if event_type == "ping" else "room-bench"
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -1,5 +1,11 @@
 # https://fastapi.tiangolo.com/tutorial/testing/#testing-file
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Generator
+from urllib.parse import parse_qs, urlparse
+import asyncio
+import json
+import threading
+import time
 import pytest
 
 from fastapi.testclient import TestClient
@@ -10,3 +16,152 @@ from app.main import app
 @pytest.fixture()
 def test_app() -> Generator:
     yield TestClient(app)
+
+
+class FakeWebSocket:
+    """WebSocket factice qui enregistre les messages envoyés."""
+
+    def __init__(self, delay: float = 0.0):
+        self.accepted = False
+        self.closed = False
+        self.delay = delay
+        self.sent = []
+
+    async def accept(self):
+        self.accepted = True
+
+    async def send_text(self, message: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent.append(message)
+
+    async def close(self, code: int = 1000, reason: str = None):
+        self.closed = True
+
+
+@pytest.fixture()
+def fake_websocket():
+    return FakeWebSocket
+
+
+# Coût simulé de l'établissement d'une connexion (handshake TCP+TLS)
+HANDSHAKE_DELAY = 0.05
+
+
+class FakeSpotifyHandler(BaseHTTPRequestHandler):
+    """
+    Serveur local qui imite l'API Spotify: keep-alive, ETag par chemin,
+    et pagination offset/limit sur /playlists/{id}/tracks.
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        # Appelé une fois par connexion TCP
+        self.server.connections += 1
+        time.sleep(HANDSHAKE_DELAY)
+        super().setup()
+
+    def do_GET(self):
+        # ETag stable par chemin, revalidation obligatoire comme sur l'API Spotify
+        etag = f'"{self.path}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.server.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.server.full_responses += 1
+        url = urlparse(self.path)
+        if url.path.endswith("/tracks"):
+            payload = self.tracks_page(parse_qs(url.query))
+        else:
+            payload = {"items": [], "path": self.path}
+
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", self.server.cache_control)
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        # Service de tokens: refresh_token "revoked" refusé comme par Spotify
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        with self.server.lock:
+            self.server.token_requests += 1
+            count = self.server.token_requests
+        time.sleep(self.server.page_delay)
+
+        if form.get("refresh_token") == ["revoked"]:
+            status = 400
+            payload = {"error": "invalid_grant", "error_description": "Refresh token revoked"}
+        else:
+            status = 200
+            payload = {
+                "access_token": f"access-{count}",
+                "token_type": "Bearer",
+                "expires_in": 3600,
+                "scope": "streaming",
+            }
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def tracks_page(self, query: dict) -> dict:
+        offset = int(query.get("offset", ["0"])[0])
+        limit = min(int(query.get("limit", ["100"])[0]), 100)
+        total = self.server.track_count
+
+        with self.server.lock:
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(
+                self.server.max_in_flight, self.server.in_flight
+            )
+        time.sleep(self.server.page_delay)
+        with self.server.lock:
+            self.server.in_flight -= 1
+
+        return {
+            "items": [
+                {"track": {"id": f"t{i}"}}
+                for i in range(offset, min(offset + limit, total))
+            ],
+            "limit": limit,
+            "offset": offset,
+            "total": total,
+        }
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def fake_spotify():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeSpotifyHandler)
+    server.connections = 0
+    server.full_responses = 0
+    server.not_modified = 0
+    server.cache_control = "private, max-age=0"
+    server.track_count = 0
+    server.page_delay = 0.0
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.token_requests = 0
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server, f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,238 @@
+import asyncio
+import tempfile
+
+from app.managers.backplane import InMemoryBackplane, InMemoryBus, UnixSocketBackplane
+from app.managers.ws_manager import ConnectionManager
+from app.utils.events import loads
+
+
+async def two_workers(fake_websocket, backplane_a, backplane_b):
+    """Deux managers (workers) avec des clients de la même room de chaque côté."""
+    worker_a, worker_b = ConnectionManager(), ConnectionManager()
+    await worker_a.start_backplane(backplane_a)
+    await worker_b.start_backplane(backplane_b)
+
+    sockets = {
+        "alice": fake_websocket(),
+        "bob": fake_websocket(),
+        "host": fake_websocket(),
+        "other": fake_websocket(),
+    }
+    await worker_a.connect(sockets["alice"], "alice", "room-a")
+    await worker_b.connect(sockets["bob"], "bob", "room-a")
+    await worker_b.connect(sockets["host"], "host", "room-a", role="host")
+    await worker_b.connect(sockets["other"], "other", "room-b")
+    return worker_a, worker_b, sockets
+
+
+def test_in_memory_backplane_reaches_other_workers(fake_websocket):
+    bus = InMemoryBus()
+
+    async def scenario():
+        worker_a, worker_b, sockets = await two_workers(
+            fake_websocket, InMemoryBackplane(bus), InMemoryBackplane(bus)
+        )
+        local = await worker_a.broadcast_to_room("hello", "room-a")
+        await worker_a.broadcast_to_role("hosts only", "room-a", "host")
+        await worker_b.broadcast_to_room("from b", "room-a", exclude_client="bob")
+        await asyncio.sleep(0.01)
+        await worker_a.stop_backplane()
+        await worker_b.stop_backplane()
+        return local, sockets
+
+    local, sockets = asyncio.run(scenario())
+    assert local == 1
+    assert sockets["alice"].sent == ["hello", "from b"]
+    assert sockets["bob"].sent == ["hello"]
+    assert sockets["host"].sent == ["hello", "hosts only", "from b"]
+    assert sockets["other"].sent == []
+    assert bus.backplanes == []
+
+
+def test_unix_socket_backplane_reaches_other_workers(fake_websocket):
+    with tempfile.TemporaryDirectory() as directory:
+
+        async def scenario():
+            worker_a, worker_b, sockets = await two_workers(
+                fake_websocket,
+                UnixSocketBackplane(directory, "a"),
+                UnixSocketBackplane(directory, "b"),
+            )
+            # Laisse le temps à l'annonce de b d'atteindre a
+            await asyncio.sleep(0.05)
+            await worker_a.broadcast_to_room("hello", "room-a")
+            # Pas d'ordre global entre workers: on attend la livraison avant la suite
+            await asyncio.sleep(0.05)
+            await worker_b.broadcast_to_room("from b", "room-a", exclude_client="bob")
+            await asyncio.sleep(0.05)
+            await worker_a.stop_backplane()
+            await worker_b.stop_backplane()
+            return sockets
+
+        sockets = asyncio.run(scenario())
+
+    assert sockets["alice"].sent == ["hello", "from b"]
+    assert sockets["bob"].sent == ["hello"]
+    assert sockets["host"].sent == ["hello", "from b"]
+    assert sockets["other"].sent == []
+
+
+def test_messages_reach_the_addressed_worker_and_peers_are_tracked():
+    with tempfile.TemporaryDirectory() as directory:
+
+        async def scenario(make_backplane):
+            backplanes = [make_backplane(name) for name in "abc"]
+            received = {backplane.address: [] for backplane in backplanes}
+            peers = {backplane.address: [] for backplane in backplanes}
+            lost = {backplane.address: [] for backplane in backplanes}
+            for backplane in backplanes:
+
+                async def on_message(message, address=backplane.address):
+                    received[address].append(message["n"])
+
+                async def on_peer(peer, address=backplane.address):
+                    peers[address].append(peer)
+
+                backplane.on_message = on_message
+                backplane.on_peer = on_peer
+                backplane.on_peer_lost = lost[backplane.address].append
+                await backplane.start(lambda *frame: 0)
+            await asyncio.sleep(0.05)
+
+            a, b, c = backplanes
+            await a.send(b.address, {"type": "test", "n": 1})
+            await a.send(None, {"type": "test", "n": 2})
+            await asyncio.sleep(0.05)
+            await c.close()
+            await asyncio.sleep(0.05)
+            lost = {address: list(addresses) for address, addresses in lost.items()}
+            await a.close()
+            await b.close()
+            return a, b, c, received, peers, lost
+
+        bus = InMemoryBus()
+        for make_backplane in (
+            lambda name: InMemoryBackplane(bus),
+            lambda name: UnixSocketBackplane(directory, name),
+        ):
+            a, b, c, received, peers, lost = asyncio.run(scenario(make_backplane))
+            assert received == {a.address: [], b.address: [1, 2], c.address: [2]}
+            assert sorted(peers[a.address]) == sorted([b.address, c.address])
+            assert sorted(peers[c.address]) == sorted([a.address, b.address])
+            assert lost[a.address] == lost[b.address] == [c.address]
+
+
+def test_clients_on_another_worker_play_in_the_owner_room(fake_websocket):
+    from app.managers.room_directory import room_directory
+    from app.managers.room_manager import room_manager
+    from app.managers.ws_manager import connection_manager
+    from app.routers import websockets
+
+    bus = InMemoryBus()
+    owner, other = InMemoryBackplane(bus), InMemoryBackplane(bus)
+    # Worker de bob: messages personnels du propriétaire livrés à ses clients
+    remote = ConnectionManager()
+    alice, bob = fake_websocket(), fake_websocket()
+
+    async def on_message(message):
+        await remote.send_personal_message(message["message"], message["client"])
+
+    async def send(message_type, **fields):
+        await other.send(
+            owner.address, {"type": message_type, "worker": other.address, **fields}
+        )
+
+    async def scenario():
+        # Worker propriétaire: le routeur (managers globaux)
+        websockets.attach_backplane(owner)
+        await connection_manager.start_backplane(owner)
+        other.on_message = on_message
+        await remote.start_backplane(other)
+        try:
+            room_id = room_manager.create_room(room_id="room-owned")
+            room = room_manager.get_room(room_id)
+            await connection_manager.connect(alice, "alice", room_id)
+            await websockets.join_room(room, "alice", alice)
+
+            # bob est connecté à l'autre worker: son arrivée et son message y
+            # sont transmis, tout est joué dans la room du propriétaire
+            await remote.connect(bob, "bob", room_id)
+            await send("join", client="bob", room=room_id, role="player",
+                       resume_seq=None, epoch=None)
+            await send("action", client="bob", room=room_id, received_at=0.0, rtt=0.02,
+                       message={"type": "chat_message", "content": "salut"})
+            await asyncio.sleep(0.05)
+            players = set(room.players)
+            rtt = connection_manager.get_rtt("bob")
+
+            await send("leave", client="bob", room=room_id)
+            remote.disconnect("bob")
+            return room, players, rtt
+        finally:
+            connection_manager.disconnect("alice")
+            await connection_manager.stop_backplane()
+            await remote.stop_backplane()
+            websockets.forget_room("room-owned")
+            room_directory.backplane = None
+            room_manager.on_delete = None
+
+    room, players, rtt = asyncio.run(scenario())
+    assert players == {"alice", "bob"}
+    assert rtt == 0.02
+    assert "bob" not in connection_manager.remote_clients
+
+    # Mêmes événements, mêmes numéros chez alice et chez bob
+    seen_by_alice = [loads(frame) for frame in alice.sent]
+    seen_by_bob = [loads(frame) for frame in bob.sent]
+    joined = next(event for event in seen_by_alice if event["type"] == "player_joined")
+    assert joined["player"] == "bob"
+    assert seen_by_bob[0]["type"] == "room_state"
+    assert seen_by_bob[0]["seq"] == joined["seq"] - 1
+    assert {"alice", "bob"} == set(seen_by_bob[0]["state"]["players"])
+    chat = [event for event in seen_by_alice + seen_by_bob if event["type"] == "chat_message"]
+    assert [(event["message"]["sender_id"], event["seq"]) for event in chat] == [
+        ("bob", joined["seq"] + 1),
+        ("bob", joined["seq"] + 1),
+    ]
+
+
+def test_stuck_peers_and_bad_frames_do_not_block_the_backplane(fake_websocket):
+    with tempfile.TemporaryDirectory() as directory:
+
+        async def scenario():
+            # Pair qui accepte la connexion mais ne lit jamais rien
+            stuck = await asyncio.start_unix_server(
+                lambda reader, writer: None, path=f"{directory}/stuck.sock"
+            )
+            backplane = UnixSocketBackplane(directory, "a", queue_size=16)
+            worker_a, worker_b, sockets = await two_workers(
+                fake_websocket, backplane, UnixSocketBackplane(directory, "b")
+            )
+            await asyncio.sleep(0.05)
+
+            # Trame illisible: ignorée, le pair reste lu
+            _, writer = await asyncio.open_unix_connection(backplane.path)
+            writer.write(b"{pas du json\n")
+            await writer.drain()
+
+            # Le pair bloqué remplit sa socket puis sa file: retiré sans bloquer
+            big = "x" * 64 * 1024
+            async with asyncio.timeout(1):
+                for _ in range(64):
+                    await worker_a.broadcast_to_room(big, "room-b")
+                    await asyncio.sleep(0.002)
+            await worker_b.broadcast_to_room("from b", "room-a", exclude_client="bob")
+            await asyncio.sleep(0.05)
+
+            peers = set(backplane.peers)
+            writer.close()
+            stuck.close()
+            await worker_a.stop_backplane()
+            await worker_b.stop_backplane()
+            return peers, sockets
+
+        peers, sockets = asyncio.run(scenario())
+
+    assert peers == {f"{directory}/b.sock"}
+    assert sockets["alice"].sent == ["from b"]
+    assert len(sockets["other"].sent) == 64
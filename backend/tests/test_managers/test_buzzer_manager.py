@@ -0,0 +1,122 @@
+import asyncio
+
+from app.managers.buzzer_manager import BuzzerManager
+from app.managers.room_manager import Room
+
+
+def playing_room(*players: str) -> Room:
+    room = Room("room-a")
+    for player_id in players:
+        room.add_player(player_id, None)
+    room.start_game()
+    room.reset_buzzer()
+    return room
+
+
+def run_window(manager: BuzzerManager, room: Room, buzzes):
+    """Soumet des buzz (joueur, délai avant réception, heure de réception, RTT)."""
+    decisions = []
+
+    async def on_decision(room, winner, candidates):
+        decisions.append((winner, sorted(candidates)))
+
+    manager.on_decision = on_decision
+
+    async def scenario():
+        results = []
+        for player_id, delay, received_at, rtt in buzzes:
+            await asyncio.sleep(delay)
+            results.append(await manager.submit(room, player_id, received_at, rtt))
+        await asyncio.sleep(manager.window * 2)
+        return results
+
+    return asyncio.run(scenario()), decisions
+
+
+def test_slow_client_that_pressed_first_wins():
+    manager = BuzzerManager(window=0.05)
+    room = playing_room("near", "far")
+
+    # "far" (RTT 200 ms) arrive 30 ms après "near" (RTT 10 ms) mais a appuyé 65 ms avant
+    results, decisions = run_window(
+        manager, room, [("near", 0, 10.000, 0.010), ("far", 0.01, 10.030, 0.200)]
+    )
+
+    assert results == [True, True]
+    assert decisions == [("far", ["far", "near"])]
+    assert room.current_buzzer == "far"
+    assert manager.pending == {}
+
+
+def test_compensation_is_capped():
+    manager = BuzzerManager(window=0.05, max_compensation=0.02)
+    room = playing_room("near", "far")
+
+    _, decisions = run_window(
+        manager, room, [("near", 0, 10.000, 0.010), ("far", 0.01, 10.030, 5.0)]
+    )
+
+    assert decisions[0][0] == "near"
+
+
+def test_buzzes_after_the_decision_are_rejected():
+    manager = BuzzerManager(window=0)
+    room = playing_room("alice", "bob")
+
+    results, decisions = run_window(
+        manager, room, [("alice", 0, 1.0, None), ("bob", 0, 0.5, None)]
+    )
+
+    assert results == [True, False]
+    assert decisions == [("alice", ["alice"])]
+
+
+def test_buzz_is_refused_when_the_buzzer_is_inactive():
+    manager = BuzzerManager(window=0)
+    room = Room("room-a")
+    room.add_player("alice", None)
+
+    results, decisions = run_window(manager, room, [("alice", 0, 1.0, None)])
+
+    assert results == [False]
+    assert decisions == []
+
+
+def test_decision_errors_are_logged(capsys):
+    manager = BuzzerManager(window=0.01)
+    room = playing_room("alice")
+
+    async def on_decision(room, winner, candidates):
+        raise RuntimeError("diffusion impossible")
+
+    manager.on_decision = on_decision
+
+    async def scenario():
+        assert await manager.submit(room, "alice", 10.0)
+        await asyncio.sleep(0.03)
+
+    asyncio.run(scenario())
+    assert "diffusion impossible" in capsys.readouterr().out
+    assert manager.pending == {}
+
+
+def test_candidates_are_rejected_when_the_round_ends_during_the_window():
+    manager = BuzzerManager(window=0.02)
+    room = playing_room("alice", "bob")
+    rejections = []
+
+    async def on_rejected(room, player_ids):
+        rejections.append(sorted(player_ids))
+
+    manager.on_rejected = on_rejected
+
+    async def scenario():
+        assert await manager.submit(room, "alice", 10.0)
+        assert await manager.submit(room, "bob", 10.01)
+        room.end_round()  # Fin de manche avant la fin de la fenêtre
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert rejections == [["alice", "bob"]]
+    assert room.current_buzzer is None
+    assert manager.pending == {}
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+from app.managers.chat_manager import ChatHistory, ChatManager
+
+
+def fill(manager: ChatManager, room_id: str, count: int):
+    return [
+        manager.add_message(room_id, "alice", "alice", f"m{i}") for i in range(count)
+    ]
+
+
+def test_history_is_capped_and_ordered():
+    manager = ChatManager()
+    manager.max_history = 5
+    fill(manager, "room-a", 12)
+
+    history = manager.get_chat_history("room-a", 50)
+    assert [m["content"] for m in history] == [f"m{i}" for i in range(7, 12)]
+    assert [m["seq"] for m in history] == list(range(8, 13))
+    assert [m["content"] for m in manager.get_chat_history("room-a", 2)] == [
+        "m10",
+        "m11",
+    ]
+
+
+def test_since_seq_and_since_timestamp():
+    manager = ChatManager()
+    manager.max_history = 4
+    messages = fill(manager, "room-a", 10)
+
+    assert [m["seq"] for m in manager.get_messages_since_seq("room-a", 8)] == [9, 10]
+    # Seq plus ancien que l'historique: tout ce qui reste
+    assert [m["seq"] for m in manager.get_messages_since_seq("room-a", 1)] == [
+        7,
+        8,
+        9,
+        10,
+    ]
+    assert manager.get_messages_since_seq("room-a", 10) == []
+
+    since = manager.get_messages_since("room-a", messages[7].timestamp)
+    assert [m["seq"] for m in since] == [
+        m.seq for m in messages[6:] if m.created_at > messages[7].created_at
+    ]
+    assert len(manager.get_messages_since("room-a", "pas une date")) == 4
+
+
+def test_ring_buffer_bisect_by_time():
+    history = ChatHistory(capacity=3)
+    for i in range(7):
+        history.new_message(
+            sender_id="s", sender_name="s", content=str(i), room_id="r"
+        )
+    # Horodatages explicites pour un test déterministe
+    for offset, message in enumerate(history):
+        message.created_at = 100 + 10 * offset
+
+    assert [m.content for m in history.since_time(105)] == ["5", "6"]
+    assert [m.content for m in history.since_time(0)] == ["4", "5", "6"]
+    assert history.since_time(200) == []
+
+
+def test_timestamp_keeps_iso_format():
+    manager = ChatManager()
+    message = manager.add_system_message("room-a", "hello")
+    assert datetime.fromisoformat(message.to_dict()["timestamp"])
+    assert message.is_system
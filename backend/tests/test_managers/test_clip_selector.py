@@ -0,0 +1,52 @@
+import asyncio
+
+from fastapi import HTTPException
+
+from app.managers.clip_selector import ClipPointCache, ClipSelector
+from tests.test_utils.test_audio_analysis import load_fixture
+
+
+def fixture_fetcher(calls: list):
+    """Analyses enregistrées: "missing" n'a pas d'analyse, "flaky" échoue."""
+
+    async def fetch(track_id: str, headers: dict):
+        calls.append(track_id)
+        await asyncio.sleep(0.01)
+        if track_id == "missing":
+            return None
+        if track_id == "flaky":
+            raise HTTPException(status_code=502, detail="Spotify API error")
+        return load_fixture("verse-chorus")
+
+    return fetch
+
+
+def test_tracks_are_analyzed_once_and_cached_on_disk(tmp_path):
+    path = str(tmp_path / "clips.db")
+    calls = []
+    selector = ClipSelector(ClipPointCache(path), fixture_fetcher(calls))
+
+    async def scenario():
+        # Deux rooms demandent les mêmes morceaux en même temps
+        return await asyncio.gather(
+            selector.points(["a", "b", "missing"], {}, {"missing": 200.0}),
+            selector.points(["b", "a", "flaky"], {}, {"flaky": 100.0}),
+        )
+
+    first, second = asyncio.run(scenario())
+    selector.close()
+
+    assert sorted(calls) == ["a", "b", "flaky", "missing"]
+    assert first["a"].refrain_start == 46.0
+    assert first["missing"].repeats == 0
+    assert second["flaky"].refrain_start == 30.0
+
+    # Nouveau processus: tout vient du disque, sauf le morceau en erreur
+    calls.clear()
+    selector = ClipSelector(ClipPointCache(path), fixture_fetcher(calls))
+    points = asyncio.run(selector.points(["a", "b", "missing", "flaky"], {}))
+    selector.close()
+
+    assert calls == ["flaky"]
+    assert selector.hits == 3
+    assert points["b"].refrain_start == 46.0
@@ -0,0 +1,105 @@
+import asyncio
+
+from app.managers.game_loop import GameLoop, parse_seconds
+from app.managers.room_manager import Room
+from app.managers.scheduler import TimerScheduler
+
+
+def playing_room() -> Room:
+    room = Room("room-a")
+    room.add_player("alice", None)
+    room.update_config({"clipDuration": "0.1 sec", "buzzerOffDuration": "0.03 sec"})
+    room.start_game()
+    return room
+
+
+def recording_loop(rounds: int = 2) -> tuple:
+    game_loop = GameLoop(TimerScheduler(), rounds=rounds, intermission=0.02)
+    events = []
+
+    async def on_event(room, event_type, fields):
+        events.append((event_type, fields.get("reason"), room.buzzer_state))
+
+    game_loop.on_event = on_event
+    return game_loop, events
+
+
+def test_parse_seconds():
+    assert parse_seconds("15 sec", 3) == 15
+    assert parse_seconds("2,5", 3) == 2.5
+    assert parse_seconds(4, 3) == 4
+    assert parse_seconds("", 3) == 3
+    assert parse_seconds(None, 3) == 3
+
+
+def test_rounds_time_out_then_game_ends():
+    game_loop, events = recording_loop(rounds=2)
+    room = playing_room()
+
+    async def scenario():
+        game_loop.start(room)
+        await asyncio.sleep(0.4)
+
+    asyncio.run(scenario())
+
+    assert events == [
+        ("round_started", None, "active"),
+        ("round_ended", "timeout", "inactive"),
+        ("round_started", None, "active"),
+        ("round_ended", "timeout", "inactive"),
+        ("game_ended", None, "inactive"),
+    ]
+    assert room.game_state == "ended"
+    assert game_loop.clocks == {}
+
+
+def test_wrong_answer_locks_buzzer_and_clip_pauses_while_answering():
+    game_loop, events = recording_loop(rounds=1)
+    room = playing_room()
+
+    async def scenario():
+        game_loop.start(room)
+        await asyncio.sleep(0.02)
+        room.register_buzz("alice")
+        game_loop.buzzed(room)
+        # Extrait coupé: la manche ne se termine pas pendant la réponse
+        await asyncio.sleep(0.15)
+        assert [event[0] for event in events] == ["round_started"]
+
+        room.validate_answer(False)
+        game_loop.answered(room, False)
+        assert room.buzzer_state == "inactive"
+        await asyncio.sleep(0.05)
+        assert events[-1] == ("buzzer_active", None, "active")
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+
+    assert [event[0] for event in events] == [
+        "round_started",
+        "buzzer_active",
+        "round_ended",
+        "game_ended",
+    ]
+
+
+def test_correct_answer_ends_round():
+    game_loop, events = recording_loop(rounds=2)
+    room = playing_room()
+
+    async def scenario():
+        game_loop.start(room)
+        await asyncio.sleep(0.01)
+        room.register_buzz("alice")
+        game_loop.buzzed(room)
+        room.validate_answer(True)
+        game_loop.answered(room, True)
+        await asyncio.sleep(0.01)
+        game_loop.stop(room.room_id)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+
+    assert events == [("round_started", None, "active"), ("round_ended", "found", "inactive")]
+    assert room.players["alice"]["score"] == 1
+    assert room.round_number == 1
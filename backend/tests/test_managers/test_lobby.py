@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from app.managers.lobby import Lobby
+from app.managers.room_manager import RoomManager
+from app.utils.events import loads
+
+
+def make_lobby(rooms: int = 0, **kwargs) -> tuple:
+    manager = RoomManager()
+    for i in range(rooms):
+        manager.create_room(f"room-{i:02d}", password="secret" if i % 3 == 0 else None)
+    return manager, Lobby(manager, **kwargs)
+
+
+def page_ids(page) -> list:
+    return [info["id"] for info in loads(page.body)]
+
+
+def test_pages_follow_the_cursor_and_filters():
+    manager, lobby = make_lobby(10)
+    for i in range(10):
+        # Même date de création pour toutes: l'ID départage
+        manager.rooms[f"room-{i:02d}"].created_at = manager.rooms["room-00"].created_at
+    manager.get_room("room-04").add_player("alice", None)
+    manager.get_room("room-05").start_game()
+    lobby.refresh()
+
+    first = lobby.page(4)
+    second = lobby.page(4, first.next_cursor)
+    third = lobby.page(4, second.next_cursor)
+    assert page_ids(first) + page_ids(second) + page_ids(third) == [
+        f"room-{i:02d}" for i in range(10)
+    ]
+    assert third.next_cursor is None
+
+    open_rooms = lobby.page(50, has_password=False, game_state="waiting")
+    assert page_ids(open_rooms) == ["room-01", "room-02", "room-04", "room-07", "room-08"]
+    assert page_ids(lobby.page(50, min_players=1)) == ["room-04"]
+    assert lobby.page(4) is first  # Même version: page servie depuis le cache
+    with pytest.raises(ValueError):
+        lobby.page(4, "pas-un-curseur")
+
+
+def test_only_flagged_rooms_are_refreshed_and_diffed():
+    manager, lobby = make_lobby(3)
+    assert set(lobby.refresh()) == {"room-00", "room-01", "room-02"}
+    assert lobby.refresh() is None
+
+    room = manager.get_room("room-01")
+    room.add_player("alice", None)
+    room.update_config({"clipDuration": "30"})  # Invisible dans le lobby
+    manager.delete_room("room-02")
+    diff = lobby.refresh()
+    assert diff["room-01"]["player_count"] == 1
+    assert diff["room-02"] is None
+    assert lobby.version == 2
+
+    # Changement de score: fiche recalculée mais identique, pas de version
+    room.start_game()
+    lobby.refresh()
+    room.reset_buzzer()
+    room.register_buzz("alice")
+    room.validate_answer(True)
+    assert lobby.refresh() is None
+    assert lobby.version == 3
+
+
+def test_subscribers_get_missed_diffs_or_a_reset():
+    manager, lobby = make_lobby(1, history=2, subscriber_queue_size=4)
+
+    async def scenario():
+        lobby.refresh()
+        live = lobby.subscribe(lobby.version)
+        for i in range(1, 4):
+            manager.create_room(f"new-{i}")
+            lobby.refresh()
+
+        # Abonné à jour: les trois diffs; abonné en retard de 1: le dernier
+        received = [live.queue.get_nowait() for _ in range(3)]
+        assert [message.split("\n")[1] for message in received] == ["event: diff"] * 3
+        late = lobby.subscribe(3)
+        assert '"new-3"' in late.queue.get_nowait()
+        # Historique dépassé (2 diffs gardés): il faut recharger la liste
+        lost = lobby.subscribe(1)
+        assert lost.queue.get_nowait().startswith("id: 4\nevent: reset")
+
+        # Abonné qui ne lit plus: remplacé par un reset, puis fermé
+        for i in range(4, 10):
+            manager.create_room(f"new-{i}")
+            lobby.refresh()
+        assert live.closed and live not in lobby.subscribers
+        messages = [message async for message in lobby.stream(live, keepalive=0.01)]
+        assert len(messages) == 1 and "event: reset" in messages[0]
+
+    asyncio.run(scenario())
+
+
+def test_changes_are_drained_without_subscribers():
+    manager, lobby = make_lobby()
+
+    async def scenario():
+        lobby.start(0.01)
+        for i in range(50):
+            manager.create_room(f"room-{i:02d}")
+            manager.delete_room(f"room-{i:02d}")
+        await asyncio.sleep(0.05)
+        await lobby.close()
+
+    asyncio.run(scenario())
+    assert manager.listing_changes == set()
+    assert lobby.rooms == {}
@@ -0,0 +1,232 @@
+import asyncio
+import random
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.managers.clip_selector import ClipPointCache, ClipSelector
+from app.managers.game_loop import GameLoop
+from app.managers.playlist_prefetch import (
+    PlaylistPrefetcher,
+    fetch_playlist_tracks,
+    parse_playlist_id,
+    playable_tracks,
+)
+from app.managers.room_manager import Room
+from app.managers.scheduler import TimerScheduler
+from app.utils.spotify_requests import close_http_client, start_http_client
+from tests.test_utils.test_audio_analysis import load_fixture
+
+PLAYLIST_A = "37i9dQZF1DXcBWIGoYBM5M"
+PLAYLIST_B = "37i9dQZF1DX0XUsuxWHRQd"
+
+
+def playlist_items(count: int) -> list:
+    items = [
+        {"track": {"id": f"t{i}", "name": f"Titre {i}", "duration_ms": 200_000,
+                   "artists": [{"name": "Artiste"}]}}
+        for i in range(count)
+    ]
+    # Injouables: fichier local, indisponible dans le pays, épisode, supprimé
+    items += [
+        {"track": {"id": None, "is_local": True}},
+        {"track": {"id": "blocked", "is_playable": False}},
+        {"track": {"id": "episode", "type": "episode"}},
+        {"track": None},
+    ]
+    return items
+
+
+def make_prefetcher(tmp_path, fetch_tracks, rounds: int = 3) -> tuple:
+    async def fetch_analysis(track_id, headers):
+        return load_fixture("verse-chorus")
+
+    selector = ClipSelector(ClipPointCache(str(tmp_path / "clips.db")), fetch_analysis)
+    game_loop = GameLoop(TimerScheduler(), rounds=rounds, intermission=0.02)
+    prefetcher = PlaylistPrefetcher(selector, game_loop, fetch_tracks, random.Random(1))
+    events = []
+
+    async def on_event(room, event_type, fields):
+        events.append((event_type, fields))
+
+    prefetcher.on_event = on_event
+    game_loop.on_event = on_event
+    return prefetcher, game_loop, events
+
+
+def test_parse_playlist_id():
+    assert parse_playlist_id(PLAYLIST_A) == PLAYLIST_A
+    assert parse_playlist_id(f"spotify:playlist:{PLAYLIST_A}") == PLAYLIST_A
+    assert parse_playlist_id(f"https://open.spotify.com/playlist/{PLAYLIST_A}?si=x") == PLAYLIST_A
+    assert parse_playlist_id("Pop") is None
+    assert parse_playlist_id(None) is None
+
+
+def test_playable_tracks_drops_unplayable_and_duplicates():
+    tracks = playable_tracks(playlist_items(3) + playlist_items(1))
+    assert [track.track_id for track in tracks] == ["t0", "t1", "t2"]
+    assert tracks[0].uri == "spotify:track:t0"
+    assert tracks[0].duration == 200.0
+
+
+def test_queue_is_ready_before_the_game_and_feeds_the_rounds(tmp_path):
+    async def fetch_tracks(playlist_id, headers):
+        assert headers == {"Authorization": "Bearer host-token"}
+        return playlist_items(5)
+
+    prefetcher, game_loop, events = make_prefetcher(tmp_path, fetch_tracks, rounds=2)
+    room = Room("room-a")
+    room.add_player("alice", None)
+
+    async def scenario():
+        room.update_config({"playlist": PLAYLIST_A, "clipDuration": "0.05 sec"})
+        prefetcher.config_changed(room, "host-token")
+        await asyncio.sleep(0.1)
+        queue = room.round_queue
+        assert len(queue) == 5
+        # Repères du refrain (46 s) calculés pour les manches de la partie
+        assert [track.offset for track in queue.tracks[:2]] == [46.0, 46.0]
+
+        room.start_game()
+        game_loop.start(room)
+        await asyncio.sleep(0.01)
+        assert room.current_song["offset"] == 46.0
+        assert "name" not in room.current_song
+        await asyncio.sleep(0.3)
+
+    asyncio.run(scenario())
+    prefetcher.selector.close()
+
+    types = [event_type for event_type, _ in events]
+    assert types == [
+        "round_queue_ready",
+        "round_started",
+        "round_ended",
+        "round_started",
+        "round_ended",
+        "game_ended",
+    ]
+    played = [fields["answer"]["id"] for kind, fields in events if kind == "round_ended"]
+    assert played == [track.track_id for track in room.round_queue.tracks[:2]]
+    assert len(room.round_queue) == 3
+
+
+def test_config_change_cancels_the_previous_pipeline(tmp_path):
+    started = []
+
+    async def fetch_tracks(playlist_id, headers):
+        started.append(playlist_id)
+        await asyncio.sleep(0.05)
+        return playlist_items(2 if playlist_id == PLAYLIST_A else 4)
+
+    prefetcher, _, events = make_prefetcher(tmp_path, fetch_tracks)
+    room = Room("room-a")
+
+    async def scenario():
+        room.update_config({"playlist": PLAYLIST_A})
+        prefetcher.config_changed(room, "host-token")
+        await asyncio.sleep(0.01)
+        # Même config renvoyée par le frontend: pas de nouvelle préparation
+        prefetcher.config_changed(room, "host-token")
+        room.update_config({"playlist": PLAYLIST_B})
+        prefetcher.config_changed(room)
+        await asyncio.sleep(0.15)
+
+    asyncio.run(scenario())
+    prefetcher.selector.close()
+
+    assert started == [PLAYLIST_A, PLAYLIST_B]
+    assert events == [("round_queue_ready", {"playlist": PLAYLIST_B, "tracks": 4})]
+    assert room.round_queue.playlist_id == PLAYLIST_B
+    assert prefetcher.tasks == {}
+
+
+def test_pipeline_errors_are_announced(tmp_path):
+    async def fetch_tracks(playlist_id, headers):
+        raise HTTPException(status_code=404, detail="Not found")
+
+    prefetcher, _, events = make_prefetcher(tmp_path, fetch_tracks)
+    room = Room("room-a")
+
+    async def scenario():
+        room.update_config({"playlist": PLAYLIST_A})
+        prefetcher.config_changed(room, "host-token")
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    prefetcher.selector.close()
+
+    assert events == [("round_queue_error", {"playlist": PLAYLIST_A, "error": "Not found"})]
+    assert room.round_queue is None
+
+
+def test_config_change_during_the_game_is_applied_when_it_ends(tmp_path):
+    started = []
+
+    async def fetch_tracks(playlist_id, headers):
+        started.append(playlist_id)
+        return playlist_items(2 if playlist_id == PLAYLIST_A else 4)
+
+    prefetcher, _, events = make_prefetcher(tmp_path, fetch_tracks)
+    room = Room("room-a")
+
+    async def scenario():
+        room.update_config({"playlist": PLAYLIST_A})
+        prefetcher.config_changed(room, "host-token")
+        await asyncio.sleep(0.05)
+        queue = room.round_queue
+
+        room.start_game()
+        room.update_config({"playlist": PLAYLIST_B})
+        prefetcher.config_changed(room)
+        await asyncio.sleep(0.05)
+        # La partie continue sur la file en cours
+        assert room.round_queue is queue
+        assert started == [PLAYLIST_A]
+
+        room.end_game()
+        prefetcher.game_ended(room)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    prefetcher.selector.close()
+
+    assert started == [PLAYLIST_A, PLAYLIST_B]
+    assert room.round_queue.playlist_id == PLAYLIST_B
+    assert prefetcher.deferred == set()
+
+
+def test_unexpected_pipeline_errors_are_announced(tmp_path):
+    async def fetch_tracks(playlist_id, headers):
+        raise KeyError("items")
+
+    prefetcher, _, events = make_prefetcher(tmp_path, fetch_tracks)
+    room = Room("room-a")
+
+    async def scenario():
+        room.update_config({"playlist": PLAYLIST_A})
+        prefetcher.config_changed(room, "host-token")
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    prefetcher.selector.close()
+
+    assert [event_type for event_type, _ in events] == ["round_queue_error"]
+    assert events[0][1]["playlist"] == PLAYLIST_A
+    assert room.round_queue is None
+
+
+def test_fetch_playlist_tracks_reads_every_page(fake_spotify, monkeypatch):
+    server, base_url = fake_spotify
+    server.track_count = 250
+    monkeypatch.setattr(settings, "api_base_url", f"{base_url}/")
+
+    async def scenario():
+        start_http_client()
+        try:
+            return await fetch_playlist_tracks(PLAYLIST_A, {"Authorization": "Bearer x"})
+        finally:
+            await close_http_client()
+
+    items = asyncio.run(scenario())
+    assert [item["track"]["id"] for item in items] == [f"t{i}" for i in range(250)]
@@ -0,0 +1,110 @@
+import asyncio
+
+from app.managers.buzzer_manager import BuzzerManager
+from app.managers.chat_manager import ChatManager
+from app.managers.reaper import Reaper
+from app.managers.room_manager import RoomManager
+from app.managers.ws_manager import ConnectionManager
+
+
+def make_reaper(**options) -> Reaper:
+    return Reaper(
+        RoomManager(), ChatManager(), ConnectionManager(), BuzzerManager(), **options
+    )
+
+
+def create_rooms(reaper: Reaper, count: int, now: float = 0.0):
+    """Crée des rooms actives à now, now + 1, now + 2... (la première est la plus ancienne)."""
+    for i in range(count):
+        room_id = reaper.room_manager.create_room(f"room-{i}")
+        reaper.room_manager.get_room(room_id).last_activity = now + i
+
+
+def test_silent_clients_are_evicted(fake_websocket):
+    reaper = make_reaper(heartbeat_timeout=30.0)
+    manager = reaper.connection_manager
+    sockets = {cid: fake_websocket() for cid in ("silent", "alive")}
+
+    async def scenario():
+        await manager.connect(sockets["silent"], "silent", "room-a")
+        await manager.connect(sockets["alive"], "alive", "room-a")
+        now = manager.active_connections["alive"]["last_seen"] + 31
+        manager.touch("alive", now - 1)
+        reaper.sweep(now)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+
+    assert sockets["silent"].closed
+    assert not sockets["alive"].closed
+    assert list(manager.active_connections) == ["alive"]
+
+
+def test_idle_rooms_are_closed_from_least_recently_active(fake_websocket):
+    reaper = make_reaper(room_idle_ttl=100.0, room_empty_ttl=10.0)
+    create_rooms(reaper, 4, now=1000.0)
+    reaper.chat_manager.add_system_message("room-0", "bienvenue")
+    # Activité récente: room-0 passe en fin d'ordre
+    reaper.room_manager.touch(reaper.room_manager.get_room("room-0"), 1115.0)
+    assert list(reaper.room_manager.rooms)[-1] == "room-0"
+
+    websocket = fake_websocket()
+
+    async def scenario():
+        await reaper.connection_manager.connect(websocket, "p1", "room-2")
+        reaper.sweep(1012.5)
+        # room-1 est vide depuis plus de 10 s; room-2 a un client connecté
+        assert list(reaper.room_manager.rooms) == ["room-2", "room-3", "room-0"]
+
+        reaper.sweep(1120.0)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+
+    # room-2 a dépassé le TTL d'inactivité malgré son client, qui est coupé
+    assert list(reaper.room_manager.rooms) == ["room-0"]
+    assert "room-0" in reaper.chat_manager.messages
+    assert websocket.closed
+
+
+def test_memory_budget_closes_empty_rooms_first(fake_websocket):
+    reaper = make_reaper(room_idle_ttl=float("inf"), room_empty_ttl=float("inf"))
+    create_rooms(reaper, 4)
+    reaper.measure_rooms()
+    per_room = reaper.total_size // 4
+    reaper.memory_budget = per_room * 2
+
+    async def scenario():
+        await reaper.connection_manager.connect(fake_websocket(), "p1", "room-0")
+        reaper.sweep(10.0)
+
+    asyncio.run(scenario())
+
+    # room-0 est la moins active mais jouée: room-1 et room-2 sont fermées
+    assert list(reaper.room_manager.rooms) == ["room-0", "room-3"]
+    assert reaper.total_size == per_room * 2
+
+
+def test_orphan_chats_are_removed():
+    reaper = make_reaper()
+    reaper.room_manager.create_room("room-a")
+    reaper.chat_manager.add_system_message("room-a", "bonjour")
+    reaper.chat_manager.add_system_message("gone", "bonjour")
+
+    reaper.sweep()
+
+    assert list(reaper.chat_manager.messages) == ["room-a"]
+
+
+def test_sweeps_are_bounded_by_batch_size():
+    reaper = make_reaper(batch_size=100, room_idle_ttl=10.0, room_empty_ttl=10.0)
+    create_rooms(reaper, 250)
+
+    # Toutes les rooms sont expirées, mais un passage n'en ferme que 100
+    reaper.sweep(1000.0)
+    assert len(reaper.room_manager.rooms) == 150
+    assert len(reaper.sizes) == 100
+
+    reaper.room_idle_ttl = reaper.room_empty_ttl = float("inf")
+    reaper.sweep(1000.0)
+    assert len(reaper.sizes) == 150
@@ -0,0 +1,76 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.managers.backplane import InMemoryBackplane, InMemoryBus
+from app.managers.room_directory import RoomDirectory
+from app.managers.room_manager import RoomManager
+from app.managers.scheduler import TimerScheduler
+
+
+def make_worker(bus: InMemoryBus, events: list):
+    """Un worker simulé: ses rooms, son annuaire et son backplane."""
+    directory = RoomDirectory(RoomManager(), TimerScheduler())
+    backplane = InMemoryBackplane(bus)
+    directory.attach(backplane)
+
+    async def on_message(message):
+        if message["type"] == "claim":
+            await directory.claimed(message)
+        else:
+            await directory.released(message)
+
+    async def on_lost(room_id):
+        events.append(("lost", backplane.address, room_id))
+
+    async def on_released(room_id):
+        events.append(("released", backplane.address, room_id))
+
+    backplane.on_message = on_message
+    directory.on_lost = on_lost
+    directory.on_released = on_released
+    return directory, backplane
+
+
+def test_each_room_has_one_owner_across_workers():
+    bus, events = InMemoryBus(), []
+    directory_a, backplane_a = make_worker(bus, events)
+    directory_b, backplane_b = make_worker(bus, events)
+    a, b = backplane_a.address, backplane_b.address
+
+    async def scenario():
+        # Room créée avant l'arrivée de b: annoncée quand b rejoint le maillage
+        directory_a.room_manager.create_room(room_id="ancienne")
+        await backplane_a.start(lambda *frame: 0)
+        await backplane_b.start(lambda *frame: 0)
+        owners = {"ancienne": directory_b.owner("ancienne")}
+
+        # Même room créée des deux côtés: la plus ancienne (b) l'emporte partout
+        directory_b.room_manager.create_room(room_id="disputée")
+        directory_a.room_manager.create_room(room_id="disputée")
+        directory_b.room_manager.get_room("disputée").created_at -= timedelta(seconds=1)
+        await directory_a.claim("disputée")
+        await directory_b.claim("disputée")
+        owners["disputée"] = (directory_a.owner("disputée"), directory_b.owner("disputée"))
+
+        # Room supprimée par son propriétaire: oubliée par les autres
+        directory_a.room_manager.delete_room("ancienne")
+        await asyncio.sleep(0.01)
+        owners["supprimée"] = directory_b.owner("ancienne")
+        return owners
+
+    owners = asyncio.run(scenario())
+    assert owners == {"ancienne": a, "disputée": (b, None), "supprimée": None}
+    assert events == [("lost", a, "disputée"), ("released", b, "ancienne")]
+
+
+def test_rooms_of_a_lost_worker_are_forgotten():
+    directory = RoomDirectory(RoomManager(), TimerScheduler())
+    created = datetime.now().timestamp()
+
+    async def scenario():
+        await directory.claimed({"worker": "a", "rooms": [["r1", created], ["r2", created]]})
+        await directory.claimed({"worker": "b", "rooms": [["r3", created]]})
+
+    asyncio.run(scenario())
+    assert sorted(directory.peer_lost("a")) == ["r1", "r2"]
+    assert directory.owners == {"r3": (created, "b")}
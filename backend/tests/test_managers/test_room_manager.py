@@ -0,0 +1,95 @@
+from app.managers.room_manager import Room
+
+
+def apply_patch(state: dict, patch: dict):
+    """Applique un JSON merge patch, comme le ferait un client."""
+    for key, value in patch.items():
+        if value is None:
+            state.pop(key, None)
+        elif isinstance(value, dict) and isinstance(state.get(key), dict):
+            apply_patch(state[key], value)
+        else:
+            state[key] = value
+
+
+def test_deltas_replay_to_the_full_state():
+    room = Room("room-a")
+    client_state = room.get_full_state()
+    version = client_state["version"]
+
+    room.add_player("alice", None)
+    room.add_player("bob", None)
+    room.start_game()
+    room.reset_buzzer()
+    room.register_buzz("alice")
+
+    delta = room.pop_delta()
+    assert delta["from_version"] == version
+    apply_patch(client_state, delta["patch"])
+
+    result = room.validate_answer(True)
+    assert result == {
+        "player_id": "alice",
+        "is_correct": True,
+        "score": 1,
+        "rank": 1,
+        "previous_rank": 1,
+    }
+    room.remove_connection("bob")
+    room.update_config({"clipDuration": "30"})
+
+    delta = room.pop_delta()
+    assert delta["patch"]["players"] == {"alice": {"score": 1}, "bob": None}
+    # Seuls les rangs modifiés: bob est passé 2e avant de partir
+    assert delta["patch"]["ranks"] == {"0": None, "1": 1}
+    apply_patch(client_state, delta["patch"])
+    client_state["version"] = delta["version"]
+
+    # null dans un patch supprime la clé: une clé absente vaut null côté client
+    def without_nulls(state):
+        return {k: v for k, v in state.items() if v is not None}
+
+    assert without_nulls(client_state) == without_nulls(room.get_full_state())
+    assert room.pop_delta() is None
+
+
+def test_null_config_values_remove_the_key_like_the_delta():
+    room = Room("room-a")
+    client_state = room.get_full_state()
+
+    room.update_config({"clipDuration": None, "rounds": 5})
+    delta = room.pop_delta()
+    apply_patch(client_state, delta["patch"])
+    client_state["version"] = delta["version"]
+
+    assert "clipDuration" not in room.config
+    assert client_state == room.get_full_state()
+
+
+def test_version_only_changes_on_visible_mutations():
+    room = Room("room-a")
+    room.register_buzz("alice")  # Refusé: la partie n'a pas commencé
+    room.set_host(None, "host")
+    assert room.version == 0
+    assert room.validate_answer(True) is None
+    assert room.pop_delta() is None
+
+
+def test_ranking_follows_scores():
+    room = Room("room-a")
+    for player_id in ("alice", "bob", "carol"):
+        room.add_player(player_id, None, player_id.title())
+    room.start_game()
+    room.reset_buzzer()
+    for player_id in ("carol", "bob", "carol"):
+        room.register_buzz(player_id)
+        room.validate_answer(True)
+
+    assert list(room.get_player_list()) == ["carol", "bob", "alice"]
+    assert room.get_ranking(2) == [
+        {"id": "carol", "name": "Carol", "score": 2, "rank": 1},
+        {"id": "bob", "name": "Bob", "score": 1, "rank": 2},
+    ]
+    assert room.get_full_state()["ranks"] == {"2": 1, "1": 2, "0": 3}
+    # Un joueur restauré retrouve son rang
+    assert Room.from_record(room.to_record()).leaderboard.rank("bob") == 2
@@ -0,0 +1,53 @@
+import asyncio
+
+from app.managers.scheduler import TimerScheduler
+
+
+def test_timers_fire_in_deadline_order_and_cancelled_ones_are_skipped():
+    scheduler = TimerScheduler()
+    fired = []
+
+    async def scenario():
+        scheduler.schedule(0.03, fired.append, "c")
+        scheduler.schedule(0.01, fired.append, "a")
+        cancelled = scheduler.schedule(0.02, fired.append, "cancelled")
+        scheduler.schedule(0.02, fired.append, "b")
+        cancelled.cancel()
+        assert len(scheduler) == 3
+        await asyncio.sleep(0.06)
+
+    asyncio.run(scenario())
+
+    assert fired == ["a", "b", "c"]
+    assert len(scheduler) == 0
+
+
+def test_coroutine_callbacks_run_in_tasks():
+    scheduler = TimerScheduler()
+    done = []
+
+    async def callback(value):
+        await asyncio.sleep(0)
+        done.append(value)
+
+    async def scenario():
+        scheduler.schedule(0, callback, 1)
+        await asyncio.sleep(0.02)
+
+    asyncio.run(scenario())
+
+    assert done == [1]
+
+
+def test_cancelled_timers_are_compacted():
+    scheduler = TimerScheduler()
+
+    async def scenario():
+        timers = [scheduler.schedule(60 + i, print) for i in range(200)]
+        for timer in timers[:150]:
+            timer.cancel()
+        return len(scheduler.heap)
+
+    # Le tas est reconstruit dès que les minuteries annulées y sont majoritaires
+    assert asyncio.run(scenario()) < 200
+    assert len(scheduler) == 50
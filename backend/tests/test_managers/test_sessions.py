@@ -0,0 +1,76 @@
+import asyncio
+
+from app.managers.scheduler import TimerScheduler
+from app.managers.sessions import EventLog, SessionManager
+from app.utils.events import encode_event, loads
+
+
+def test_event_log_replays_missed_events_in_order():
+    log = EventLog(capacity=3)
+    first = log.append(encode_event("chat_message", n=1))
+    assert loads(first) == {"type": "chat_message", "n": 1, "seq": 1, "epoch": log.epoch}
+    log.append(encode_event("player_joined", player="bob"), exclude_client="bob")
+    log.append(encode_event("buzz", player="alice"))
+
+    missed = log.since(1, log.epoch, "alice")
+    assert [loads(event)["seq"] for event in missed] == [2, 3]
+    # bob avait reçu l'état complet à la place de son propre player_joined
+    assert [loads(event)["seq"] for event in log.since(1, log.epoch, "bob")] == [3]
+    assert log.since(3, log.epoch, "alice") == []
+
+    log.append(encode_event("round_ended"))
+    assert log.since(0, log.epoch, "alice") is None  # Journal dépassé
+    assert log.since(3, "autre-epoch", "alice") is None  # Autre journal
+    assert log.since(None, log.epoch, "alice") is None
+
+
+def test_event_log_replays_the_own_version_to_the_excluded_client():
+    log = EventLog()
+    log.append(
+        encode_event("chat_message", message={"content": "salut"}),
+        exclude_client="alice",
+        personal=encode_event("chat_message", message={"content": "salut", "is_self": True}),
+    )
+
+    [own] = log.since(0, log.epoch, "alice")
+    assert loads(own) == {
+        "type": "chat_message",
+        "message": {"content": "salut", "is_self": True},
+        "seq": 1,
+        "epoch": log.epoch,
+    }
+    assert loads(log.since(0, log.epoch, "bob")[0])["message"] == {"content": "salut"}
+
+
+def test_seat_is_kept_during_the_grace_period():
+    sessions = SessionManager(TimerScheduler(), grace_period=0.03)
+    expired = []
+
+    async def on_expire(client_id, room_id):
+        expired.append((client_id, room_id))
+
+    sessions.on_expire = on_expire
+
+    async def scenario():
+        await sessions.hold("alice", "room-a")
+        await sessions.hold("bob", "room-a")
+        await asyncio.sleep(0.01)
+        assert sessions.resume("alice", "room-a")
+        assert not sessions.resume("bob", "room-b")
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert expired == [("bob", "room-a")]
+    assert sessions.held == {}
+
+
+def test_without_grace_period_the_player_leaves_at_once():
+    sessions = SessionManager(TimerScheduler(), grace_period=0)
+    expired = []
+
+    async def on_expire(client_id, room_id):
+        expired.append(client_id)
+
+    sessions.on_expire = on_expire
+    asyncio.run(sessions.hold("alice", "room-a"))
+    assert expired == ["alice"]
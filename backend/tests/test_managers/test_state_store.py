@@ -0,0 +1,95 @@
+import asyncio
+
+from app.managers.chat_manager import ChatManager
+from app.managers.room_manager import RoomManager
+from app.managers.state_store import (
+    InMemoryStateStore,
+    SQLiteStateStore,
+    StatePersistence,
+)
+
+
+def play(room_manager: RoomManager, chat_manager: ChatManager):
+    room_manager.create_room("room-a", "Salon", "secret")
+    room = room_manager.get_room("room-a")
+    room.add_player("alice", None, "Alice")
+    room.add_player("bob", None, "Bob")
+    room.update_config({"clipDuration": "30"})
+    room.start_game()
+    room.reset_buzzer()
+    room.register_buzz("alice")
+    room.validate_answer(True)
+    for i in range(5):
+        chat_manager.add_message("room-a", "bob", "Bob", f"message {i}")
+    chat_manager.add_system_message("room-a", "Alice a trouvé")
+    return room
+
+
+def restart(store_factory):
+    room_manager, chat_manager = RoomManager(), ChatManager()
+    persistence = StatePersistence(store_factory(), room_manager, chat_manager)
+    asyncio.run(persistence.restore())
+    return room_manager, chat_manager, persistence
+
+
+def test_sqlite_store_survives_a_restart(tmp_path):
+    path = str(tmp_path / "state.db")
+    room_manager, chat_manager, persistence = restart(lambda: SQLiteStateStore(path))
+    room = play(room_manager, chat_manager)
+    room_manager.create_room("room-b")
+    room_manager.delete_room("room-b")
+    asyncio.run(persistence.close())
+
+    room_manager, chat_manager, persistence = restart(lambda: SQLiteStateStore(path))
+    assert list(room_manager.rooms) == ["room-a"]
+    restored = room_manager.get_room("room-a")
+    assert restored.get_full_state() == room.get_full_state()
+    assert restored.password == "secret"
+    assert restored.created_at == room.created_at
+    assert [m["content"] for m in chat_manager.get_chat_history("room-a")] == [
+        *(f"message {i}" for i in range(5)),
+        "Alice a trouvé",
+    ]
+
+    # La séquence du chat reprend après le dernier message sauvegardé
+    message = chat_manager.add_message("room-a", "alice", "Alice", "re")
+    assert message.seq == 7
+
+    # Un joueur qui se reconnecte retrouve son score
+    restored.add_player("alice", None, "Alice")
+    assert restored.players["alice"]["score"] == 1
+    asyncio.run(persistence.close())
+
+
+def test_only_changes_are_written():
+    store = InMemoryStateStore()
+    room_manager, chat_manager, persistence = restart(lambda: store)
+    play(room_manager, chat_manager)
+    room_manager.create_room("room-b")
+
+    batch = persistence.collect()
+    assert {record["id"] for record in batch.rooms} == {"room-a", "room-b"}
+    assert len(batch.messages) == 6
+    assert persistence.collect() is None
+
+    room_manager.get_room("room-b").update_config({"playlist": "Rock"})
+    batch = persistence.collect()
+    assert [record["id"] for record in batch.rooms] == ["room-b"]
+    assert batch.messages == []
+
+
+def test_old_messages_are_pruned(tmp_path):
+    path = str(tmp_path / "state.db")
+    room_manager, chat_manager, persistence = restart(lambda: SQLiteStateStore(path))
+    chat_manager.max_history = 10
+    room_manager.create_room("room-a")
+    for i in range(25):
+        chat_manager.add_message("room-a", "bob", "Bob", f"message {i}")
+        if i % 7 == 0:
+            asyncio.run(persistence.flush())
+    asyncio.run(persistence.close())
+
+    store = SQLiteStateStore(path)
+    _, messages = store.load()
+    assert [m["seq"] for m in messages] == list(range(16, 26))
+    store.close()
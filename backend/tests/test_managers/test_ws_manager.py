@@ -0,0 +1,208 @@
+import asyncio
+import json
+
+from app.managers.ws_manager import ConnectionManager
+
+
+def test_room_index_follows_connect_and_disconnect(fake_websocket):
+    manager = ConnectionManager()
+
+    async def scenario():
+        await manager.connect(fake_websocket(), "host", "room-a", role="host")
+        await manager.connect(fake_websocket(), "p1", "room-a")
+        await manager.connect(fake_websocket(), "p2", "room-b")
+
+    asyncio.run(scenario())
+
+    assert sorted(manager.get_clients_in_room("room-a")) == ["host", "p1"]
+    assert manager.get_clients_by_role("room-a", "host") == ["host"]
+    assert manager.count_clients_in_room("room-b") == 1
+
+    assert manager.disconnect("p2") == "room-b"
+    assert manager.is_room_empty("room-b")
+    assert "room-b" not in manager.room_index
+
+    manager.disconnect("host")
+    assert manager.room_index == {"room-a": {"player": {"p1"}}}
+
+
+def test_reconnect_moves_client_between_rooms(fake_websocket):
+    manager = ConnectionManager()
+
+    async def scenario():
+        await manager.connect(fake_websocket(), "p1", "room-a")
+        await manager.connect(fake_websocket(), "p1", "room-b")
+
+    asyncio.run(scenario())
+
+    assert manager.get_clients_in_room("room-a") == []
+    assert manager.get_clients_in_room("room-b") == ["p1"]
+
+
+def test_broadcast_only_reaches_target_room(fake_websocket):
+    manager = ConnectionManager()
+    sockets = {cid: fake_websocket() for cid in ("p1", "p2", "other")}
+
+    async def scenario():
+        await manager.connect(sockets["p1"], "p1", "room-a")
+        await manager.connect(sockets["p2"], "p2", "room-a")
+        await manager.connect(sockets["other"], "other", "room-b")
+        count = await manager.broadcast_to_room(
+            "hello", "room-a", exclude_client="p1"
+        )
+        await asyncio.sleep(0)
+        return count
+
+    assert asyncio.run(scenario()) == 1
+    assert sockets["p2"].sent == ["hello"]
+    assert sockets["p1"].sent == []
+    assert sockets["other"].sent == []
+
+
+def test_slow_client_does_not_delay_healthy_clients(fake_websocket):
+    manager = ConnectionManager(send_timeout=0.05)
+    evicted = []
+
+    async def on_evict(client_id, room_id):
+        evicted.append((client_id, room_id))
+
+    manager.on_evict = on_evict
+    slow, fast = fake_websocket(delay=1.0), fake_websocket()
+
+    async def scenario():
+        await manager.connect(slow, "slow", "room-a")
+        await manager.connect(fast, "fast", "room-a")
+        await manager.broadcast_to_room("buzz", "room-a")
+        await asyncio.sleep(0.01)
+        delivered_early = list(fast.sent)
+        await asyncio.sleep(0.1)
+        return delivered_early
+
+    assert asyncio.run(scenario()) == ["buzz"]
+    assert evicted == [("slow", "room-a")]
+    assert slow.closed
+    assert manager.get_clients_in_room("room-a") == ["fast"]
+
+
+def test_queue_overflow_evicts_client(fake_websocket):
+    manager = ConnectionManager(max_queue_size=2)
+    evicted = []
+
+    async def on_evict(client_id, room_id):
+        evicted.append(client_id)
+
+    manager.on_evict = on_evict
+
+    async def scenario():
+        await manager.connect(fake_websocket(delay=1.0), "stuck", "room-a")
+        # Le premier message est pris par la tâche d'écriture, les deux suivants
+        # remplissent la file, le quatrième déborde.
+        await manager.send_personal_message("m0", "stuck")
+        await asyncio.sleep(0)
+        results = [
+            await manager.send_personal_message(f"m{i}", "stuck") for i in (1, 2, 3)
+        ]
+        await asyncio.sleep(0.01)
+        return results
+
+    assert asyncio.run(scenario()) == [True, True, False]
+    assert evicted == ["stuck"]
+    assert manager.get_connection("stuck") is None
+
+
+def test_pong_updates_the_smoothed_rtt(fake_websocket):
+    manager = ConnectionManager()
+    websocket = fake_websocket()
+
+    async def scenario():
+        await manager.connect(websocket, "p1", "room-a")
+        assert manager.get_rtt("p1") is None
+
+        manager.ping("p1")
+        await asyncio.sleep(0)
+        ping_id = json.loads(websocket.sent[-1])["id"]
+        # Un pong pour un autre ping est ignoré
+        assert manager.record_pong("p1", ping_id - 1) is None
+        await asyncio.sleep(0.02)
+        first = manager.record_pong("p1", ping_id)
+        assert 0.02 <= first < 0.1
+        # Un second pong pour le même ping aussi
+        assert manager.record_pong("p1", ping_id) is None
+
+        manager.ping_all()
+        await asyncio.sleep(0)
+        second = manager.record_pong("p1", json.loads(websocket.sent[-1])["id"])
+        assert second < first
+        manager.disconnect("p1")
+
+    asyncio.run(scenario())
+
+
+def test_flush_tick_batches_events_but_not_urgent_ones(fake_websocket):
+    from app.managers.scheduler import TimerScheduler
+
+    manager = ConnectionManager(flush_interval=0.02, scheduler=TimerScheduler())
+    sockets = {cid: fake_websocket() for cid in ("p1", "p2")}
+
+    async def scenario():
+        for client_id, websocket in sockets.items():
+            await manager.connect(websocket, client_id, "room-a")
+        for i in range(5):
+            await manager.broadcast_to_room(f'{{"n":{i}}}', "room-a")
+        await manager.send_personal_message('{"n":"own"}', "p1")
+        await asyncio.sleep(0.005)
+        # Rien n'est parti avant la fin de l'intervalle
+        assert sockets["p1"].sent == []
+        await asyncio.sleep(0.04)
+
+        # Un événement urgent part aussitôt, après ceux qui attendaient déjà
+        await manager.broadcast_to_room('{"n":"chat"}', "room-a")
+        await manager.broadcast_to_room('{"type":"buzz"}', "room-a", urgent=True)
+        await asyncio.sleep(0.04)
+
+    asyncio.run(scenario())
+
+    first, *rest = sockets["p1"].sent
+    assert json.loads(first) == [{"n": 0}, {"n": 1}, {"n": 2}, {"n": 3}, {"n": 4}, {"n": "own"}]
+    assert rest == ['{"n":"chat"}', '{"type":"buzz"}']
+    assert json.loads(sockets["p2"].sent[0]) == [{"n": i} for i in range(5)]
+    assert manager._flush_timers == {}
+
+
+def test_spectators_get_coalesced_frames_after_players(fake_websocket):
+    from app.managers.scheduler import TimerScheduler
+
+    manager = ConnectionManager(
+        scheduler=TimerScheduler(), spectator_interval=0.02, spectator_max_batch=4
+    )
+    player = fake_websocket()
+    spectators = [fake_websocket() for _ in range(3)]
+
+    async def scenario():
+        await manager.connect(player, "p1", "room-a")
+        for i, websocket in enumerate(spectators):
+            await manager.connect(websocket, f"s{i}", "room-a", role="spectator")
+        await asyncio.sleep(0)
+
+        for i in range(3):
+            assert await manager.broadcast_to_room(f'{{"n":{i}}}', "room-a") == 4
+        await manager.broadcast_to_room('{"type":"buzz"}', "room-a", urgent=True)
+        await asyncio.sleep(0.005)
+        # Les joueurs ont déjà tout reçu, les spectateurs attendent leur envoi
+        assert len(player.sent) == 4
+        assert all(websocket.sent == [] for websocket in spectators)
+        await asyncio.sleep(0.03)
+
+        # Lot trop long: remplacé par l'état complet
+        manager.spectator_snapshot = lambda room_id: '{"type":"room_state"}'
+        for i in range(10):
+            await manager.broadcast_to_room(f'{{"n":{i}}}', "room-a")
+        await asyncio.sleep(0.04)
+
+    asyncio.run(scenario())
+
+    for websocket in spectators:
+        first, snapshot = websocket.sent
+        assert json.loads(first) == [{"n": 0}, {"n": 1}, {"n": 2}, {"type": "buzz"}]
+        assert snapshot == '{"type":"room_state"}'
+    assert manager._spectator_pending == {}
@@ -0,0 +1,20 @@
+def test_metrics_endpoint_exposes_websocket_activity(test_app):
+    with test_app.websocket_connect("/ws/test-metrics?client_id=alice") as websocket:
+        for _ in range(3):
+            websocket.receive_json()
+        websocket.send_json({"type": "chat_message", "content": "salut"})
+        websocket.receive_json()
+
+        response = test_app.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    assert "# TYPE blindotesto_ws_message_seconds histogram" in lines
+    assert any(
+        line.startswith('blindotesto_ws_message_seconds_count{type="chat_message"} ')
+        for line in lines
+    )
+    assert any(line.startswith("blindotesto_broadcast_recipients_count ") for line in lines)
+    assert "blindotesto_connections 1" in lines
+    assert any(line.startswith("blindotesto_rooms ") for line in lines)
@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.routers import oauth
+from app.utils.token_cache import TokenCache
+
+
+def test_playlist_tracks_streams_every_page(fake_spotify, monkeypatch):
+    server, base_url = fake_spotify
+    server.track_count = 250
+    monkeypatch.setattr(settings, "api_base_url", f"{base_url}/")
+    headers = {"Authorization": "Bearer alice"}
+
+    with TestClient(app) as client:
+        response = client.get("/spotify/playlists/p1/tracks", headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 250
+        assert [item["track"]["id"] for item in data["items"]] == [
+            f"t{i}" for i in range(250)
+        ]
+
+        response = client.get(
+            "/spotify/playlists/p1/tracks?format=ndjson", headers=headers
+        )
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert len(lines) == 250
+        assert lines[-1] == {"track": {"id": "t249"}}
+
+        # Chaque page téléchargée est comptée sous l'endpoint playlist_tracks
+        metrics = client.get("/metrics").text
+        assert 'blindotesto_spotify_responses_total{endpoint="playlist_tracks",status="200"}' in metrics
+        assert 'blindotesto_spotify_request_seconds_count{endpoint="playlist_tracks"}' in metrics
+
+
+def test_playlist_tracks_requires_token(test_app):
+    response = test_app.get("/spotify/playlists/p1/tracks")
+    assert response.status_code == 401
+
+
+def test_refresh_token_is_coalesced_and_cached(fake_spotify, monkeypatch):
+    server, base_url = fake_spotify
+    server.page_delay = 0.05
+    monkeypatch.setattr(settings, "token_url", f"{base_url}/api/token")
+    monkeypatch.setattr(oauth, "token_cache", TokenCache(margin=60))
+
+    with TestClient(app) as client:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            responses = list(pool.map(
+                lambda _: client.post("/auth/refresh-token", json={"refresh_token": "r1"}),
+                range(8),
+            ))
+        assert all(response.status_code == 200 for response in responses)
+        assert {response.json()["access_token"] for response in responses} == {"access-1"}
+
+        response = client.post("/auth/refresh-token", json={"refresh_token": "r1"})
+        assert response.json()["access_token"] == "access-1"
+
+    assert server.token_requests == 1
+
+
+def test_refresh_token_errors_keep_spotify_status(fake_spotify, monkeypatch):
+    server, base_url = fake_spotify
+    monkeypatch.setattr(settings, "token_url", f"{base_url}/api/token")
+    monkeypatch.setattr(oauth, "token_cache", TokenCache())
+
+    with TestClient(app) as client:
+        response = client.post("/auth/refresh-token", json={"refresh_token": "revoked"})
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Refresh token revoked"}
+
+        # Spotify injoignable
+        monkeypatch.setattr(settings, "token_url", "http://127.0.0.1:1/api/token")
+        response = client.post("/auth/refresh-token", json={"refresh_token": "r2"})
+        assert response.status_code == 502
@@ -0,0 +1,56 @@
+import json
+import os
+import random
+import time
+
+import pytest
+
+from app.utils.audio_analysis import ClipPoints, analyze, clip_offset
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fixtures", "audio_analysis")
+
+
+def load_fixture(name: str) -> dict:
+    with open(os.path.join(FIXTURES, f"{name}.json")) as fixture:
+        return json.load(fixture)
+
+
+@pytest.mark.parametrize(
+    "name, refrain",
+    [
+        # intro, couplet, pré-refrain, refrain (46-68 s)...
+        ("verse-chorus", (46.0, 68.0)),
+        # Refrain dès la fin de l'intro (8-26 s), répété quatre fois
+        ("chorus-first", (8.0, 26.0)),
+    ],
+)
+def test_refrain_is_the_first_repeated_loud_section(name, refrain):
+    points = analyze(name, load_fixture(name))
+    assert (points.refrain_start, points.refrain_end) == refrain
+    assert points.repeats >= 3
+
+
+def test_missing_analysis_falls_back_to_an_estimate():
+    points = analyze("t1", {"track": {"duration": 200.0}, "sections": [], "segments": []})
+    assert points.repeats == 0
+    assert points.refrain_start == 60.0
+
+
+def test_clip_offsets_by_moment():
+    points = ClipPoints("t1", 180.0, 46.0, 68.0, 3)
+    assert clip_offset(points, "refrain", 15) == 46.0
+    assert clip_offset(points, "pre_refrain", 15) == 38.5
+    assert clip_offset(points, "opening", 15) == 0.0
+    assert clip_offset(points, "ending", 15) == 160.0
+    offset = clip_offset(points, "random", 15, random.Random(1))
+    assert 0 <= offset <= 165
+    # L'extrait tient toujours dans le morceau
+    assert clip_offset(ClipPoints("t2", 20.0, 12.0, 18.0, 2), "refrain", 15) == 5.0
+
+
+def test_500_track_playlist_is_analyzed_well_under_a_second():
+    analyses = [load_fixture("verse-chorus"), load_fixture("chorus-first")]
+    start = time.perf_counter()
+    for i in range(500):
+        analyze(f"t{i}", analyses[i % 2])
+    assert time.perf_counter() - start < 1.0
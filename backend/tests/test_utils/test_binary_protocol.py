@@ -0,0 +1,103 @@
+import msgpack
+import pytest
+
+from app.utils.binary_protocol import (
+    SUBPROTOCOL,
+    BinaryCodec,
+    decode_client_frame,
+    decode_frame,
+    negotiate,
+)
+from app.utils.events import encode, encode_event, loads
+
+
+def answer_result() -> str:
+    delta = {
+        "from_version": 7,
+        "version": 8,
+        "patch": {"players": {"alice": {"score": 3}}, "buzzer_state": "active"},
+    }
+    message = {
+        "id": "m1",
+        "seq": 12,
+        "sender_id": "system",
+        "sender_name": "Système",
+        "content": "La réponse de alice était correcte!",
+        "room_id": "room-a",
+        "sender_role": "system",
+        "is_system": True,
+        "timestamp": "2025-01-01T12:00:00",
+    }
+    return encode_event(
+        "answer_result",
+        result={"player_id": "alice", "is_correct": True, "score": 3},
+        system_message=encode(message),
+        delta=delta,
+    )
+
+
+def test_frames_round_trip_without_room_id():
+    codec = BinaryCodec()
+    ids = []
+    frame, ids_frame = codec.encode("room-a", answer_result())
+
+    announced = decode_frame(ids_frame, ids)
+    assert announced == {"type": "player_ids", "from": 0, "ids": ["alice", "system"]}
+    decoded = decode_frame(frame, ids)
+    expected = loads(answer_result())
+    del expected["system_message"]["room_id"]
+    assert decoded == expected
+    assert len(frame) < len(answer_result().encode()) / 2
+
+
+def test_player_ids_are_announced_once_per_room():
+    codec = BinaryCodec()
+    assert codec.encode("room-a", encode_event("player_joined", player="alice"))[1] is not None
+    assert codec.encode("room-a", encode_event("buzz", player="alice", rejected=[]))[1] is None
+
+    _, ids_frame = codec.encode("room-a", encode_event("buzz", player="bob", rejected=["alice"]))
+    ids = ["alice"]
+    assert decode_frame(ids_frame, ids)["from"] == 1
+    assert ids == ["alice", "bob"]
+
+    # Un nouveau client reçoit toute la table; une autre room a la sienne
+    late = []
+    decode_frame(codec.hello("room-a"), late)
+    assert late == ["alice", "bob"]
+    assert codec.hello("room-b") is None
+    codec.forget("room-a")
+    assert codec.hello("room-a") is None
+
+
+def test_ping_frames_do_not_use_room_tables():
+    codec = BinaryCodec()
+    frame, ids_frame = codec.encode(None, encode_event("ping", id=3))
+    assert ids_frame is None
+    assert decode_frame(frame, []) == {"type": "ping", "id": 3}
+
+
+def test_client_frames_accept_compact_and_plain_events():
+    compact = msgpack.packb([21, {49: "salut"}])  # chat_message, content
+    plain = msgpack.packb({"type": "pong", "id": 4})
+    batch = msgpack.packb([[14, {}], {"type": "get_room_state"}])
+
+    assert decode_client_frame(compact) == {"type": "chat_message", "content": "salut"}
+    assert decode_client_frame(plain) == {"type": "pong", "id": 4}
+    assert decode_client_frame(batch) == [{"type": "buzz"}, {"type": "get_room_state"}]
+    with pytest.raises(ValueError):
+        decode_client_frame(b"\xc1")
+
+
+def test_negotiation_keeps_json_by_default():
+    assert negotiate([]) is None
+    assert negotiate(["other", SUBPROTOCOL]) == SUBPROTOCOL
+
+
+def test_batches_reuse_encoded_frames():
+    from app.utils.binary_protocol import decode_frames, pack_batch
+
+    codec = BinaryCodec()
+    frames = [codec.encode(None, encode_event("ping", id=i))[0] for i in range(20)]
+    events = decode_frames(pack_batch(frames), [])
+    assert [event["id"] for event in events] == list(range(20))
+    assert decode_frames(frames[0], []) == [{"type": "ping", "id": 0}]
@@ -0,0 +1,36 @@
+import json
+
+from app.managers.chat_manager import ChatMessage
+from app.managers.room_manager import Room
+from app.utils.events import add_fields, encode, encode_event
+
+
+def test_encode_event_inlines_raw_fragments():
+    fragment = encode({"a": 1, "b": "é"})
+    text = encode_event("demo", payload=fragment, count=2)
+    assert json.loads(text) == {"type": "demo", "payload": {"a": 1, "b": "é"}, "count": 2}
+
+
+def test_add_fields_extends_encoded_object():
+    message = ChatMessage("alice", "alice", "salut", "room-a")
+    encoded = message.to_json()
+
+    assert json.loads(add_fields(encoded, is_self=True)) == {
+        **message.to_dict(),
+        "is_self": True,
+    }
+    assert json.loads(add_fields(encode({}), is_self=True)) == {"is_self": True}
+    # Le message n'est encodé qu'une fois
+    assert message.to_json() is encoded
+
+
+def test_room_state_json_cache_is_invalidated_on_change():
+    room = Room("room-a")
+    room.add_player("alice", None)
+    first = room.get_full_state_json()
+    assert room.get_full_state_json() is first
+
+    room.update_config({"clipDuration": "30"})
+    state = json.loads(room.get_full_state_json())
+    assert state["config"]["clipDuration"] == "30"
+    assert state == room.get_full_state()
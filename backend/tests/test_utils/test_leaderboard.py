@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from app.utils.leaderboard import Leaderboard
+
+
+def test_ties_share_a_rank_and_top_keeps_arrival_order():
+    board = Leaderboard()
+    for player_id in ("alice", "bob", "carol", "dave"):
+        board.add(player_id)
+    assert board.rank_table() == {"0": 1}
+
+    # Une bonne réponse: seuls le score quitté et le score atteint changent
+    assert board.set_score("carol", 1) == {"1": 1, "0": 2}
+    assert board.set_score("alice", 1) == {"1": 1, "0": 3}
+    assert board.set_score("carol", 2) == {"2": 1, "1": 2}
+
+    assert [board.rank(p) for p in ("carol", "alice", "bob", "dave")] == [1, 2, 3, 3]
+    assert board.top(3) == [("carol", 2, 1), ("alice", 1, 2), ("bob", 0, 3)]
+    assert board.remove("alice") == {"1": None, "0": 2}
+    assert board.rank_table() == {"2": 1, "0": 2}
+
+
+def test_rank_changes_replay_to_the_rank_table():
+    board = Leaderboard()
+    table = {}
+    rng = random.Random(7)
+    for _ in range(2000):
+        player_id = f"p{rng.randrange(30)}"
+        roll = rng.random()
+        if roll < 0.3:
+            changes = board.add(player_id, rng.randrange(4))
+        elif roll < 0.4:
+            changes = board.remove(player_id)
+        else:
+            # Grands écarts aussi: l'arbre doit s'agrandir
+            step = rng.choice((1, 1, 1, -1, 40))
+            changes = board.set_score(player_id, max(0, board.scores.get(player_id, 0) + step))
+        for score, rank in changes.items():
+            if rank is None:
+                table.pop(score, None)
+            else:
+                table[score] = rank
+
+        assert table == board.rank_table()
+        scores = list(board.scores.values())
+        for player_id, score in board.scores.items():
+            assert board.rank(player_id) == 1 + sum(other > score for other in scores)
+
+
+def test_negative_scores_are_refused():
+    with pytest.raises(ValueError):
+        Leaderboard().add("alice", -1)
@@ -0,0 +1,29 @@
+from app.utils.metrics import Metric
+
+
+def test_histogram_renders_cumulative_buckets():
+    metric = Metric("histogram", "test_seconds", "Durée", ("type",), buckets=(0.1, 1.0))
+    buzz = metric.labels("buzz")
+    assert metric.labels("buzz") is buzz
+
+    for value in (0.05, 0.1, 0.5, 3.0):
+        buzz.observe(value)
+
+    assert list(metric.render()) == [
+        "# HELP test_seconds Durée",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{type="buzz",le="0.1"} 2',
+        'test_seconds_bucket{type="buzz",le="1.0"} 3',
+        'test_seconds_bucket{type="buzz",le="+Inf"} 4',
+        'test_seconds_sum{type="buzz"} 3.65',
+        'test_seconds_count{type="buzz"} 4',
+    ]
+
+
+def test_counter_labels_are_escaped_once():
+    metric = Metric("counter", "test_total", "Compteur", ("endpoint", "status"))
+    child = metric.labels('a"b', 200)
+    child.inc()
+    child.inc(2)
+
+    assert list(metric.render())[-1] == 'test_total{endpoint="a\\"b",status="200"} 3'
@@ -0,0 +1,156 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.utils import spotify_requests
+from app.utils.response_cache import ResponseCache, parse_cache_control
+from app.utils.spotify_requests import (
+    close_http_client,
+    get_request_helper,
+    iter_pages,
+    start_http_client,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    cache = ResponseCache(max_entries=16, max_bytes=1024 * 1024)
+    monkeypatch.setattr(spotify_requests, "response_cache", cache)
+    return cache
+
+
+def with_shared_client(coroutine_function):
+    """Exécute un scénario avec le client partagé ouvert puis fermé."""
+
+    async def scenario():
+        start_http_client()
+        try:
+            return await coroutine_function()
+        finally:
+            await close_http_client()
+
+    return asyncio.run(scenario())
+
+
+def test_shared_client_reuses_connection(fake_spotify):
+    server, base_url = fake_spotify
+
+    async def scenario():
+        for i in range(5):
+            result = await get_request_helper(f"{base_url}/me/{i}", {})
+            assert result["path"] == f"/me/{i}"
+
+    with_shared_client(scenario)
+    assert server.connections == 1
+    assert spotify_requests._http_client is None
+
+
+def test_shared_client_is_faster_than_client_per_call(fake_spotify):
+    server, base_url = fake_spotify
+    requests_count = 5
+
+    async def per_call():
+        for _ in range(requests_count):
+            async with httpx.AsyncClient() as client:
+                (await client.get(f"{base_url}/me")).raise_for_status()
+
+    async def pooled():
+        for _ in range(requests_count):
+            await get_request_helper(f"{base_url}/me", {})
+
+    start = time.perf_counter()
+    asyncio.run(per_call())
+    per_call_duration = time.perf_counter() - start
+    per_call_connections = server.connections
+
+    start = time.perf_counter()
+    with_shared_client(pooled)
+    pooled_duration = time.perf_counter() - start
+
+    assert per_call_connections == requests_count
+    assert server.connections - per_call_connections == 1
+    assert pooled_duration < per_call_duration / 2
+
+
+def test_etag_revalidation_serves_from_memory(fake_spotify, fresh_cache):
+    server, base_url = fake_spotify
+
+    async def scenario():
+        headers = {"Authorization": "Bearer alice"}
+        first = await get_request_helper(f"{base_url}/me/playlists", headers)
+        second = await get_request_helper(f"{base_url}/me/playlists", headers)
+        # Un autre utilisateur a sa propre entrée
+        await get_request_helper(
+            f"{base_url}/me/playlists", {"Authorization": "Bearer bob"}
+        )
+        return first, second
+
+    first, second = with_shared_client(scenario)
+
+    assert second is first
+    assert server.full_responses == 2
+    assert server.not_modified == 1
+    stats = fresh_cache.stats()
+    assert (stats["misses"], stats["revalidations"], stats["hits"]) == (2, 1, 0)
+
+
+def test_fresh_entries_skip_upstream(fake_spotify, fresh_cache):
+    server, base_url = fake_spotify
+    server.cache_control = "max-age=60"
+
+    async def scenario():
+        for _ in range(3):
+            await get_request_helper(f"{base_url}/me/playlists", {})
+
+    with_shared_client(scenario)
+
+    assert server.full_responses == 1
+    assert server.not_modified == 0
+    assert fresh_cache.hits == 2
+
+
+def test_cache_is_bounded_by_entries_and_bytes():
+    cache = ResponseCache(max_entries=2, max_bytes=100)
+    cache.put(("t", "a"), "a", None, 60, 10)
+    cache.put(("t", "b"), "b", None, 60, 10)
+    cache.get(("t", "a"))  # "a" devient la plus récente
+    cache.put(("t", "c"), "c", None, 60, 10)
+    assert list(cache.entries) == [("t", "a"), ("t", "c")]
+
+    cache.put(("t", "d"), "d", None, 60, 95)
+    assert list(cache.entries) == [("t", "d")]
+    assert cache.total_bytes == 95
+    assert cache.evictions == 3
+
+    cache.put(("t", "e"), "e", None, 60, 500)  # Trop gros pour le cache
+    assert ("t", "e") not in cache.entries
+
+
+def test_parse_cache_control():
+    assert parse_cache_control(None, 60) == 60
+    assert parse_cache_control("private, max-age=30", 60) == 30
+    assert parse_cache_control("no-cache", 60) == 0
+    assert parse_cache_control("no-store", 60) is None
+
+
+def test_iter_pages_fetches_all_pages_in_order_with_capped_concurrency(fake_spotify, fresh_cache):
+    server, base_url = fake_spotify
+    server.track_count = 950
+    server.page_delay = 0.02
+    url = f"{base_url}/playlists/big/tracks"
+
+    async def scenario():
+        first_page = await get_request_helper(f"{url}?offset=0&limit=100", {})
+        ids = []
+        async for items in iter_pages(url, {}, first_page, concurrency=3):
+            ids.extend(item["track"]["id"] for item in items)
+        return ids
+
+    ids = with_shared_client(scenario)
+
+    assert ids == [f"t{i}" for i in range(950)]
+    assert server.max_in_flight == 3
+    # Seule la première page (lue par l'appelant) passe par le cache
+    assert list(fresh_cache.entries) == [("", f"{url}?offset=0&limit=100")]
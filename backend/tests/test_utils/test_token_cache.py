@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils.token_cache import TokenCache
+
+
+def counting_fetcher(delay: float = 0.01, expires_in: int = 3600, error=None):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return {"access_token": f"access-{len(calls)}", "expires_in": expires_in}
+
+    return fetch, calls
+
+
+def test_concurrent_refreshes_share_one_upstream_call():
+    cache = TokenCache(margin=60)
+    fetch, calls = counting_fetcher()
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get("refresh-a", fetch) for _ in range(20)))
+
+    results = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert {result["access_token"] for result in results} == {"access-1"}
+    assert (cache.misses, cache.coalesced) == (1, 19)
+
+
+def test_token_is_served_from_cache_until_margin(monkeypatch):
+    cache = TokenCache(margin=60)
+    fetch, calls = counting_fetcher(delay=0)
+    now = [1000.0]
+    monkeypatch.setattr("app.utils.token_cache.time.monotonic", lambda: now[0])
+
+    async def scenario():
+        first = await cache.get("refresh-a", fetch)
+        now[0] += 3000
+        second = await cache.get("refresh-a", fetch)
+        now[0] += 541  # Moins de 60 s avant l'expiration
+        third = await cache.get("refresh-a", fetch)
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+
+    assert second["access_token"] == "access-1"
+    assert second["expires_in"] == 600
+    assert third["access_token"] == "access-2"
+    assert len(calls) == 2
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    cache = TokenCache()
+    fetch, calls = counting_fetcher(error=HTTPException(status_code=400, detail="revoked"))
+
+    async def scenario():
+        results = await asyncio.gather(
+            *(cache.get("refresh-a", fetch) for _ in range(5)), return_exceptions=True
+        )
+        with pytest.raises(HTTPException):
+            await cache.get("refresh-a", fetch)
+        return results
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(result, HTTPException) for result in results)
+    assert len(calls) == 2
+    assert cache.entries == {}
+
+
+def test_failed_fetch_is_logged_when_every_caller_left(capsys):
+    cache = TokenCache()
+    fetch, calls = counting_fetcher(delay=0.02, error=HTTPException(400, "invalid_grant"))
+
+    async def scenario():
+        caller = asyncio.create_task(cache.get("refresh", fetch))
+        await asyncio.sleep(0.005)
+        caller.cancel()
+        await asyncio.sleep(0.04)
+
+    asyncio.run(scenario())
+    assert calls == [1]
+    assert "invalid_grant" in capsys.readouterr().out
+    assert cache.in_flight == {}
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from websockets.asyncio.client import connect
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_worker(port: int, directory: str) -> subprocess.Popen:
+    """Un worker uvicorn relié aux autres par le backplane Unix."""
+    env = dict(os.environ, WS_BACKPLANE="unix", WS_BACKPLANE_PATH=directory)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"worker sur le port {port} injoignable")
+
+
+async def next_event(websocket, event_type: str) -> dict:
+    """Premier événement du type demandé (les lots d'événements sont dépliés)."""
+    while True:
+        frame = json.loads(await asyncio.wait_for(websocket.recv(), 5))
+        for event in frame if isinstance(frame, list) else (frame,):
+            if event["type"] == event_type:
+                return event
+
+
+def test_players_on_two_workers_share_the_same_room():
+    with tempfile.TemporaryDirectory() as directory:
+        ports = [free_port(), free_port()]
+        workers = []
+        try:
+            for port in ports:
+                workers.append(start_worker(port, directory))
+            time.sleep(0.5)  # Maillage du backplane
+
+            async def scenario():
+                url = "ws://127.0.0.1:{}/ws/room-partagée?client_id={}"
+                async with connect(url.format(ports[0], "alice")) as alice:
+                    await next_event(alice, "room_state")
+                    async with connect(url.format(ports[1], "bob")) as bob:
+                        state = await next_event(bob, "room_state")
+                        joined = await next_event(alice, "player_joined")
+
+                        await bob.send(json.dumps({"type": "chat_message", "content": "salut"}))
+                        seen_by_alice = await next_event(alice, "chat_message")
+                        seen_by_bob = await next_event(bob, "chat_message")
+                        return state, joined, seen_by_alice, seen_by_bob
+
+            state, joined, seen_by_alice, seen_by_bob = asyncio.run(scenario())
+        finally:
+            for worker in workers:
+                worker.terminate()
+                worker.wait(10)
+
+    # Une seule room, jouée par le worker d'alice: bob y a sa place
+    assert set(state["state"]["players"]) == {"alice", "bob"}
+    assert joined["player"] == "bob" and joined["seq"] == state["seq"] + 1
+    assert seen_by_alice["message"]["sender_id"] == "bob"
+    assert seen_by_bob["message"]["is_self"] is True
+    assert seen_by_alice["seq"] == seen_by_bob["seq"] == joined["seq"] + 1
@@ -0,0 +1,256 @@
+def receive_initial_state(websocket):
+    """
+    Consomme les messages envoyés à la connexion (état de la room, chat,
+    puis premier ping de mesure du RTT) et retourne l'état et le chat.
+    """
+    state, chat_history, ping = [websocket.receive_json() for _ in range(3)]
+    assert ping["type"] == "ping"
+    return state, chat_history
+
+
+def test_join_receives_initial_state(test_app):
+    with test_app.websocket_connect("/ws/test-join?client_id=alice") as websocket:
+        state, chat_history = receive_initial_state(websocket)
+        assert state["type"] == "room_state"
+        assert "alice" in state["state"]["players"]
+        assert state["state"]["version"] >= 1
+        assert chat_history["type"] == "chat_history"
+
+
+def test_chat_message_is_echoed_to_sender(test_app):
+    with test_app.websocket_connect("/ws/test-chat?client_id=alice") as websocket:
+        receive_initial_state(websocket)
+
+        websocket.send_json({"type": "chat_message", "content": "salut"})
+        own = websocket.receive_json()
+        assert own["type"] == "chat_message"
+        assert own["message"]["content"] == "salut"
+        assert own["message"]["is_self"] is True
+
+
+def test_game_events_carry_state_deltas(test_app):
+    with test_app.websocket_connect("/ws/test-delta?client_id=alice") as websocket:
+        state, _ = receive_initial_state(websocket)
+        version = state["state"]["version"]
+
+        websocket.send_json({"type": "start_game"})
+        started = websocket.receive_json()
+        assert started["type"] == "game_started"
+        assert "state" not in started
+        assert started["delta"]["from_version"] == version
+        assert started["delta"]["patch"] == {
+            "game_state": "playing",
+            "buzzer_state": "inactive",
+        }
+
+        # La première manche suit, avec le delta depuis game_started
+        round_started = websocket.receive_json()
+        assert round_started["type"] == "round_started"
+        assert round_started["delta"]["from_version"] == started["delta"]["version"]
+
+        websocket.send_json({"type": "get_room_state"})
+        snapshot = websocket.receive_json()
+        assert snapshot["state"]["version"] == round_started["delta"]["version"]
+        assert snapshot["state"]["game_state"] == "playing"
+        assert snapshot["state"]["round_number"] == 1
+
+
+def test_buzz_decision_is_broadcast_before_the_system_message(test_app):
+    with test_app.websocket_connect("/ws/test-buzz?client_id=alice") as websocket:
+        receive_initial_state(websocket)
+
+        # Partie pas commencée: refus immédiat
+        websocket.send_json({"type": "buzz"})
+        assert websocket.receive_json() == {"type": "buzz_rejected", "current_buzzer": None}
+
+        websocket.send_json({"type": "start_game"})
+        websocket.receive_json()
+        # Le serveur démarre la première manche et arme le buzzer
+        round_started = websocket.receive_json()
+        assert round_started["type"] == "round_started"
+        assert round_started["round"] == 1
+        assert round_started["delta"]["patch"]["buzzer_state"] == "active"
+
+        websocket.send_json({"type": "buzz"})
+        decision = websocket.receive_json()
+        assert decision["type"] == "buzz"
+        assert decision["player"] == "alice"
+        assert decision["rejected"] == []
+        assert decision["delta"]["patch"]["current_buzzer"] == "alice"
+
+        system = websocket.receive_json()
+        assert system["type"] == "system_message"
+        assert system["message"]["content"] == "alice a buzzé!"
+
+
+def test_batched_frame_is_processed_in_order(test_app):
+    with test_app.websocket_connect("/ws/test-batch?client_id=alice") as websocket:
+        receive_initial_state(websocket)
+
+        websocket.send_json(
+            [
+                {"type": "chat_message", "content": "un"},
+                {"type": "get_player_list"},
+                {"type": "chat_message", "content": "deux"},
+            ]
+        )
+        assert websocket.receive_json()["message"]["content"] == "un"
+        assert websocket.receive_json()["type"] == "player_list"
+        assert websocket.receive_json()["message"]["content"] == "deux"
+
+
+def test_malformed_input_is_rejected_without_echo(test_app):
+    secret = "<script>secret</script>"
+    with test_app.websocket_connect("/ws/test-invalid?client_id=alice") as websocket:
+        receive_initial_state(websocket)
+
+        websocket.send_text("pas du json " + secret)
+        assert websocket.receive_json() == {"type": "error", "code": "invalid_json"}
+
+        websocket.send_json({"type": "hack", "payload": secret})
+        assert websocket.receive_json() == {"type": "error", "code": "unknown_type"}
+
+        websocket.send_json(
+            [{"type": "validate_answer", "is_correct": secret}, {"type": "get_player_list"}]
+        )
+        assert websocket.receive_json() == {
+            "type": "error",
+            "code": "invalid_message",
+            "field": "is_correct",
+            "index": 0,
+        }
+        # Le reste du tableau est quand même traité
+        assert websocket.receive_json()["type"] == "player_list"
+
+        websocket.send_json([{"type": "buzz"}] * 100)
+        assert websocket.receive_json()["code"] == "batch_too_large"
+
+
+def test_msgpack_subprotocol_is_negotiated(test_app):
+    import msgpack
+
+    from app.utils.binary_protocol import SUBPROTOCOL, decode_frame
+
+    ids = []
+
+    def receive(websocket) -> dict:
+        # Les trames player_ids complètent la table sans être des événements
+        while True:
+            event = decode_frame(websocket.receive_bytes(), ids)
+            if event["type"] != "player_ids":
+                return event
+
+    with test_app.websocket_connect(
+        "/ws/test-msgpack?client_id=alice", subprotocols=[SUBPROTOCOL]
+    ) as websocket:
+        assert websocket.accepted_subprotocol == SUBPROTOCOL
+        state, chat_history, ping = [receive(websocket) for _ in range(3)]
+        assert state["type"] == "room_state"
+        assert "alice" in state["state"]["players"]
+        assert chat_history["type"] == "chat_history"
+        assert ping["type"] == "ping"
+
+        websocket.send_bytes(msgpack.packb({"type": "pong", "id": ping["id"]}))
+        websocket.send_bytes(msgpack.packb([21, {49: "salut"}]))  # chat_message compact
+        own = receive(websocket)
+        assert own["type"] == "chat_message"
+        assert own["message"]["content"] == "salut"
+        assert own["message"]["sender_id"] == "alice"
+
+        websocket.send_bytes(b"\xc1")
+        assert receive(websocket) == {"type": "error", "code": "invalid_json"}
+
+    # Sans sous-protocole, le client reste en JSON
+    with test_app.websocket_connect("/ws/test-msgpack?client_id=bob") as websocket:
+        state, _ = receive_initial_state(websocket)
+        assert state["type"] == "room_state"
+
+
+def test_lobby_pages_are_revalidated_by_version(test_app):
+    with test_app.websocket_connect("/ws/test-lobby?client_id=alice") as websocket:
+        receive_initial_state(websocket)
+        response = test_app.get("/ws/rooms", params={"min_players": 1, "limit": 50})
+        assert response.status_code == 200
+        assert "test-lobby" in [room["id"] for room in response.json()]
+
+        etag = response.headers["etag"]
+        cached = test_app.get("/ws/rooms", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert test_app.get("/ws/rooms", params={"cursor": "%%%"}).status_code == 400
+
+
+def test_reconnect_within_grace_period_replays_missed_events():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    # Client ouvert (lifespan): toutes les connexions partagent la même boucle
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/test-resume?client_id=alice") as alice:
+            receive_initial_state(alice)
+            with client.websocket_connect("/ws/test-resume?client_id=bob") as bob:
+                state, _ = receive_initial_state(bob)
+                epoch, seq = state["epoch"], state["seq"]
+                assert alice.receive_json()["seq"] == seq + 1  # player_joined de bob
+
+            # bob est parti mais garde sa place: personne n'est prévenu
+            alice.send_json({"type": "chat_message", "content": "tu es là ?"})
+            own = alice.receive_json()
+            assert own["message"]["is_self"] is True
+            assert own["seq"] == seq + 2  # Même numéro que la version diffusée
+
+            with client.websocket_connect(
+                f"/ws/test-resume?client_id=bob&resume_seq={seq}&epoch={epoch}"
+            ) as bob:
+                missed, resumed = bob.receive_json(), bob.receive_json()
+                assert missed["type"] == "chat_message"
+                assert missed["seq"] == seq + 2
+                assert resumed == {
+                    "type": "session_resumed",
+                    "seq": seq + 2,
+                    "epoch": epoch,
+                    "missed": 1,
+                }
+                assert bob.receive_json()["type"] == "ping"
+
+            alice.send_json({"type": "get_player_list"})
+            assert set(alice.receive_json()["players"]) == {"alice", "bob"}
+
+
+def test_spectators_watch_without_playing():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/test-watch?client_id=alice") as alice:
+            receive_initial_state(alice)
+            with client.websocket_connect(
+                "/ws/test-watch?client_id=viewer&role=spectator"
+            ) as viewer:
+                state, _ = receive_initial_state(viewer)
+                assert set(state["state"]["players"]) == {"alice"}
+
+                viewer.send_json({"type": "buzz"})
+                assert viewer.receive_json() == {"type": "error", "code": "spectator_forbidden"}
+
+                # Les joueurs n'ont rien vu arriver; le chat leur part tout de suite,
+                # et aux spectateurs au prochain envoi de leur tier
+                alice.send_json({"type": "chat_message", "content": "salut"})
+                assert alice.receive_json()["message"]["content"] == "salut"
+                assert viewer.receive_json()["message"]["content"] == "salut"
+
+
+def test_server_driven_events_keep_the_room_active():
+    import asyncio
+    import time
+
+    from app.managers.room_manager import room_manager
+    from app.routers.websockets import announce_game_event
+
+    room = room_manager.get_room(room_manager.create_room("test-server-driven"))
+    room.last_activity = time.monotonic() - 3600
+
+    asyncio.run(announce_game_event(room, "round_started", {"round": 1}))
+    assert time.monotonic() - room.last_activity < 60
+    room_manager.delete_room(room.room_id)
@@ -200,6 +200,8 @@ export default function RoomPage() {
         buzzerOffDuration: newConfig.buzzerOffDuration,
         cutMusicAfterBuzz: newConfig.cutMusicAfterBuzz,
       },
+      // Permet au serveur de préparer les manches de la playlist choisie
+      spotify_token: localStorage.getItem("spotify_access_token"),
     });
 
     // Mettre à jour l'état local
@@ -139,6 +139,7 @@ const RoomConfigDialog: React.FC<RoomConfigDialogProps> = ({
               >
                 <option value="opening">opening</option>
                 <option value="refrain">refrain</option>
+                <option value="pre_refrain">avant le refrain</option>
                 <option value="ending">ending</option>
                 <option value="random">aléatoire</option>
               </select>
@@ -28,7 +28,8 @@ interface ClientMessage extends BaseMessage {
 // Define the WebSocket context type
 interface WebSocketContextType {
   // Connection management
-  connect: (roomId: string, clientId: string) => void;
+  // role "spectator": regarde la partie sans y jouer
+  connect: (roomId: string, clientId: string, role?: "player" | "spectator") => void;
   disconnect: () => void;
   isConnected: boolean;
 
@@ -67,9 +68,18 @@ export function WebSocketProvider({
   const listeners = useRef<MessageListener[]>([]);
   const nextListenerId = useRef<number>(1);
 
+  // Dernier événement reçu de la room: permet de reprendre la session après
+  // une coupure sans recevoir à nouveau tout l'état
+  const resume = useRef<{
+    roomId: string;
+    clientId: string;
+    epoch: string;
+    seq: number;
+  } | null>(null);
+
   // Connect to a room
   const connect = useCallback(
-    (roomId: string, clientId: string) => {
+    (roomId: string, clientId: string, role: "player" | "spectator" = "player") => {
       // Close existing connection if any
       if (wsRef.current) {
         wsRef.current.close();
@@ -77,8 +87,17 @@ export function WebSocketProvider({
 
       try {
         // Create new WebSocket connection
+        const session = resume.current;
+        const resumeQuery =
+          role === "player" &&
+          session &&
+          session.roomId === roomId &&
+          session.clientId === clientId
+            ? `&resume_seq=${session.seq}&epoch=${session.epoch}`
+            : "";
+        const roleQuery = role === "spectator" ? "&role=spectator" : "";
         const ws = new WebSocket(
-          `${serverUrl}/${roomId}?client_id=${clientId}`
+          `${serverUrl}/${roomId}?client_id=${clientId}${resumeQuery}${roleQuery}`
         );
 
         // Set up event handlers
@@ -89,18 +108,44 @@ export function WebSocketProvider({
 
         ws.onmessage = (event) => {
           try {
-            const data = JSON.parse(event.data) as ServerMessage;
-            // Update last message
-            setLastMessage(data);
-
-            // Notify all listeners
-            listeners.current.forEach((listener) => {
-              try {
-                listener.callback(data);
-              } catch (error) {
-                console.error("Error in message listener:", error);
+            const payload = JSON.parse(event.data) as ServerMessage | ServerMessage[];
+            // Le serveur peut regrouper plusieurs événements dans une trame (tableau)
+            const messages = Array.isArray(payload) ? payload : [payload];
+            for (const data of messages) {
+              // Heartbeat: le serveur coupe les clients qui ne répondent plus
+              if (data.type === "ping") {
+                ws.send(JSON.stringify({ type: "pong", id: data.id }));
+                continue;
+              }
+              // Numéro du dernier événement de la room reçu (et epoch du journal)
+              if (data.type === "room_state" && typeof data.epoch === "string") {
+                resume.current = {
+                  roomId,
+                  clientId,
+                  epoch: data.epoch,
+                  seq: Number(data.seq) || 0,
+                };
+              } else if (
+                resume.current &&
+                typeof data.seq === "number" &&
+                data.epoch === resume.current.epoch
+              ) {
+                // Seuls les numéros du journal suivi comptent (pas ceux d'un
+                // autre worker ou d'un journal recréé)
+                resume.current.seq = data.seq;
               }
-            });
+              // Update last message
+              setLastMessage(data);
+
+              // Notify all listeners
+              listeners.current.forEach((listener) => {
+                try {
+                  listener.callback(data);
+                } catch (error) {
+                  console.error("Error in message listener:", error);
+                }
+              });
+            }
           } catch (error) {
             console.error("Error parsing message:", error);
           }